@@ -0,0 +1,135 @@
+"""Insurer authorization registry: the jurisdictions each insurer may operate in.
+
+data/insurers/<provider>/insurer_facts.json records, for one insurer, the
+jurisdictions it is (or is not) authorized in, with evidence. The
+registry indexes every file once by provider; Dataset then projects each
+entry into specs.jurisdiction_facts of every product from that insurer,
+where the authorization rules read it.
+
+Precedence, per jurisdiction: a registry entry that decides the question
+(authorized true or false) overrides the product's own fact, so one
+registry edit reaches all of the insurer's products. An undecided entry
+(authorized null) only fills a jurisdiction the product does not decide
+itself; it never turns a product's evidenced answer into UNKNOWN.
+
+The engine evaluates the product dict it is given. Products read through
+tools.dataset carry the registry facts; a product file read any other way
+is pre-registry until passed through apply() (dataset.load_authorizations
+builds the registry for such callers).
+
+    py tools/authorizations.py
+    py tools/authorizations.py --provider DKV --jurisdiction ES
+"""
+import argparse
+import hashlib
+import json
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+# Names used in rule reasons for jurisdictions a visa does not belong to
+JURISDICTION_NAMES = {
+    "AT": "Austria", "BE": "Belgium", "BG": "Bulgaria", "CH": "Switzerland", "CY": "Cyprus",
+    "CZ": "Czechia", "DE": "Germany", "DK": "Denmark", "EE": "Estonia", "ES": "Spain",
+    "FI": "Finland", "FR": "France", "GR": "Greece", "HR": "Croatia", "HU": "Hungary",
+    "IE": "Ireland", "IS": "Iceland", "IT": "Italy", "LI": "Liechtenstein", "LT": "Lithuania",
+    "LU": "Luxembourg", "LV": "Latvia", "MT": "Malta", "NL": "Netherlands", "NO": "Norway",
+    "PL": "Poland", "PT": "Portugal", "RO": "Romania", "SE": "Sweden", "SI": "Slovenia",
+    "SK": "Slovakia",
+}
+
+
+def provider_key(name) -> str:
+    """Registry key for a provider name: case and spacing do not matter."""
+    return " ".join(str(name or "").split()).casefold()
+
+
+class AuthorizationRegistry:
+    """provider -> jurisdiction -> {"authorized", "evidence"}, built once from insurer facts."""
+
+    def __init__(self, insurers: List[dict]):
+        self.by_provider: Dict[str, Dict[str, dict]] = {}
+        for data in insurers:
+            entries = self.by_provider.setdefault(provider_key(data.get("provider")), {})
+            for code, fact in (data.get("authorizations") or {}).items():
+                entries[code.upper()] = fact
+        # Stands in for the registry in the cache keys of each provider's products
+        self.digests = {
+            key: hashlib.sha256(json.dumps(entries, sort_keys=True).encode("utf-8")).hexdigest()
+            for key, entries in self.by_provider.items()
+        }
+
+    def entries(self, provider) -> Dict[str, dict]:
+        return self.by_provider.get(provider_key(provider), {})
+
+    def lookup(self, provider, jurisdiction: str) -> Optional[dict]:
+        """The registry fact for provider in jurisdiction, or None when it has none."""
+        return self.entries(provider).get(jurisdiction.upper())
+
+    def authorized_in(self, provider) -> set:
+        """Jurisdictions where the registry records provider as authorized."""
+        return {code for code, fact in self.entries(provider).items() if fact.get("authorized") is True}
+
+    def digest(self, provider) -> Optional[str]:
+        return self.digests.get(provider_key(provider))
+
+    def apply(self, product: dict) -> dict:
+        """product with the registry facts of its provider in specs.jurisdiction_facts.
+
+        Returns product itself when the registry has nothing for its
+        provider; otherwise a copy, so cached file data is never changed.
+        See the module docstring for which fact wins.
+        """
+        entries = self.entries(product.get("provider"))
+        if not entries:
+            return product
+        specs = product.get("specs")
+        specs = dict(specs) if isinstance(specs, dict) else {}
+        facts = specs.get("jurisdiction_facts")
+        facts = dict(facts) if isinstance(facts, dict) else {}
+        for code, fact in entries.items():
+            own = facts.get(code)
+            if fact.get("authorized") is None and isinstance(own, dict) and own.get("authorized") is not None:
+                continue
+            facts[code] = fact
+        specs["jurisdiction_facts"] = facts
+        return {**product, "specs": specs}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--provider", help="Only this provider")
+    parser.add_argument("--jurisdiction", help="Only this jurisdiction code")
+    parser.add_argument("--json", action="store_true", help="Print the registry as JSON")
+    args = parser.parse_args()
+
+    from tools.dataset import load_dataset
+
+    dataset = load_dataset()
+    registry = dataset.authorizations
+    selected = {}
+    for data in dataset.insurers:
+        if args.provider and provider_key(data.get("provider")) != provider_key(args.provider):
+            continue
+        entries = registry.entries(data.get("provider"))
+        if args.jurisdiction:
+            entries = {code: fact for code, fact in entries.items() if code == args.jurisdiction.upper()}
+        products = sorted(p["id"] for p in dataset.products if provider_key(p.get("provider")) == provider_key(data.get("provider")))
+        selected[data.get("provider")] = {
+            "authorizations": {code: fact.get("authorized") for code, fact in sorted(entries.items())},
+            "products": products,
+        }
+    if args.json:
+        print(json.dumps(selected, indent=2))
+        return
+    for provider, entry in selected.items():
+        codes = ", ".join(f"{code}={'yes' if value else 'no' if value is False else '?'}" for code, value in entry["authorizations"].items())
+        count = len(entry["products"])
+        print(f"{provider}: {codes or 'no entries'} ({count} product{'' if count == 1 else 's'})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+"""Benchmark the rule engine and build pipeline on a synthetic catalogue.
+
+Copies tools/ and schemas/ into a scratch workspace, fills it with a seeded
+catalogue from tools/synth_catalogue.py, then times each pipeline stage as
+a subprocess (so every stage pays its real startup and load costs) plus an
+in-process evaluate() loop. Results, throughput and peak RSS go to JSON and
+are compared against a stored baseline of the same scale, catalogue and
+hardware. tools/benchmark_baseline.json is the default 50 x 5000 run on
+the machine recorded in it; on other hardware, write a local baseline
+with --update-baseline --baseline <path> and compare against that.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Windows: peak RSS is not reported
+    resource = None
+
+ROOT = Path(__file__).parent.parent
+BASELINE = ROOT / "tools" / "benchmark_baseline.json"
+
+# Stage name -> (script and args, throughput unit). Run in this order.
+STAGES = [
+    ("validate", ["tools/validate.py"], "files"),
+    ("build_mappings", ["tools/build_mappings.py", "--force"], "pairs"),
+    ("build_mappings_cached", ["tools/build_mappings.py"], "pairs"),
+    ("build_mappings_batch", ["tools/build_mappings.py", "--force", "--batch"], "pairs"),
+    ("build_index", ["tools/build_index.py"], "pairs"),
+    ("build_snapshot", ["tools/build_snapshot.py"], "pairs"),
+]
+
+
+def max_rss_mb(ru_maxrss: int) -> float:
+    """ru_maxrss in MB (kilobytes on Linux, bytes on macOS)."""
+    scale = 1 if sys.platform == "darwin" else 1024
+    return round(ru_maxrss * scale / (1024 * 1024), 1)
+
+
+def hardware() -> dict:
+    """The machine a report was measured on; reports compare only on the same one."""
+    cpu = platform.processor()
+    try:
+        for line in Path("/proc/cpuinfo").read_text(encoding="utf-8").splitlines():
+            if line.startswith("model name"):
+                cpu = line.split(":", 1)[1].strip()
+                break
+    except OSError:
+        pass
+    return {"machine": platform.machine(), "cpu": cpu or None, "cpus": os.cpu_count()}
+
+
+def prepare_workspace(work: Path, visas: int, products: int, seed: int) -> dict:
+    """Copy the tools into work and generate the catalogue next to them."""
+    ignore = shutil.ignore_patterns("__pycache__", "tests")
+    shutil.copytree(ROOT / "tools", work / "tools", ignore=ignore)
+    shutil.copytree(ROOT / "schemas", work / "schemas")
+    sys.path.insert(0, str(ROOT))
+    from tools.synth_catalogue import generate
+    return generate(work, visas, products, seed)
+
+
+def run_stage(work: Path, args: list) -> dict:
+    """Run one pipeline script in work; return wall time and the child's peak RSS."""
+    env = dict(os.environ, SNAPSHOT_ID="benchmark", SNAPSHOT_ROOT=str(work / "data" / "snapshots"))
+    env.pop("DATASET_CACHE", None)
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, *args], cwd=work, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+    )
+    if hasattr(os, "wait4"):
+        # wait4 reports this child's own rusage, not the max over all children
+        _, status, usage = os.wait4(proc.pid, 0)
+        seconds = time.perf_counter() - start
+        returncode = os.waitstatus_to_exitcode(status)
+        proc.returncode = returncode
+        stderr = proc.stderr.read().decode("utf-8", errors="replace")
+        peak = max_rss_mb(usage.ru_maxrss)
+    else:
+        _, stderr = proc.communicate()
+        seconds = time.perf_counter() - start
+        returncode = proc.returncode
+        stderr = stderr.decode("utf-8", errors="replace")
+        peak = None
+    proc.stderr.close()
+    if returncode != 0:
+        raise RuntimeError(f"{' '.join(args)} exited {returncode}:\n{stderr}")
+    return {"seconds": seconds, "peak_rss_mb": peak}
+
+
+def time_evaluate(work: Path, repeat: int) -> dict:
+    """In-process evaluate() and compiled-plan throughput over every pair."""
+    sys.path.insert(0, str(ROOT))
+    from tools.dataset import FileCache, load_authorizations, scan
+    from tools.engine import compile_visa, evaluate
+
+    cache = FileCache(work / "data" / ".cache" / "benchmark.pickle")
+    registry = load_authorizations(cache, work / "data" / "insurers")
+    visas = [r.data for r in scan(cache, work / "data" / "visas")]
+    products = [registry.apply(r.data) for r in scan(cache, work / "data" / "products")]
+    pairs = len(visas) * len(products)
+
+    def best(fn):
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - start)
+        return min(times)
+
+    def scalar():
+        for visa in visas:
+            for product in products:
+                evaluate(visa, product)
+
+    def planned():
+        for visa in visas:
+            plan = compile_visa(visa)
+            for product in products:
+                plan.evaluate(product)
+
+    results = {
+        "evaluate": {"seconds": best(scalar), "count": pairs, "unit": "pairs"},
+        "evaluate_plan": {"seconds": best(planned), "count": pairs, "unit": "pairs"},
+    }
+    # Process-wide high-water mark, so it includes the loaded catalogue
+    peak = max_rss_mb(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss) if resource else None
+    for stage in results.values():
+        stage["peak_rss_mb"] = peak
+    return results
+
+
+def run(visas: int, products: int, seed: int, repeat: int, keep: bool) -> dict:
+    work = Path(tempfile.mkdtemp(prefix="visafact-bench-"))
+    try:
+        counts = prepare_workspace(work, visas, products, seed)
+        pairs = visas * products
+        # Visa, product and insurer facts plus the offers file
+        files = visas + products + counts["insurers"] + 1
+        results = time_evaluate(work, repeat)
+        for name, args, unit in STAGES:
+            if name == "validate" and not _has_jsonschema():
+                print("SKIP: validate (jsonschema not installed)")
+                continue
+            stage = min((run_stage(work, args) for _ in range(repeat)), key=lambda r: r["seconds"])
+            stage.update(count=files if unit == "files" else pairs, unit=unit)
+            results[name] = stage
+        for stage in results.values():
+            stage["seconds"] = round(stage["seconds"], 4)
+            stage["throughput"] = round(stage["count"] / stage["seconds"], 1) if stage["seconds"] else None
+    finally:
+        if keep:
+            print(f"Workspace kept at {work}")
+        else:
+            shutil.rmtree(work, ignore_errors=True)
+    return {
+        "scale": {"visas": visas, "products": products, "seed": seed},
+        "catalogue": counts,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "hardware": hardware(),
+        "stages": results,
+    }
+
+
+def _has_jsonschema() -> bool:
+    try:
+        import jsonschema  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def compare(report: dict, baseline: dict, threshold: float) -> list:
+    """Stages slower than baseline by more than threshold, as (name, ratio).
+
+    Timings are only comparable for the same catalogue on the same
+    hardware; any other baseline is reported and skipped.
+    """
+    for key in ("scale", "catalogue", "hardware"):
+        if baseline.get(key) != report[key]:
+            print(f"Baseline {key} {baseline.get(key)} differs from {report[key]}; not compared")
+            return []
+    regressions = []
+    for name, stage in report["stages"].items():
+        base = baseline.get("stages", {}).get(name)
+        if not base or not base.get("seconds"):
+            continue
+        ratio = stage["seconds"] / base["seconds"]
+        stage["baseline_ratio"] = round(ratio, 3)
+        if ratio > 1 + threshold:
+            regressions.append((name, ratio))
+    return regressions
+
+
+def print_report(report: dict) -> None:
+    print(f"{'stage':<24}{'seconds':>10}{'throughput':>16}{'peak MB':>10}{'vs base':>10}")
+    for name, stage in report["stages"].items():
+        ratio = stage.get("baseline_ratio")
+        print(
+            f"{name:<24}{stage['seconds']:>10.3f}"
+            f"{(stage['throughput'] or 0):>10.0f} {stage['unit']:<5}"
+            f"{(stage['peak_rss_mb'] if stage['peak_rss_mb'] is not None else '-'):>10}"
+            f"{(f'{ratio:.2f}x' if ratio else '-'):>10}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--visas", type=int, default=50)
+    parser.add_argument("--products", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per stage; the fastest is kept")
+    parser.add_argument("--output", default="", help="Write the JSON report here")
+    parser.add_argument("--baseline", default=str(BASELINE))
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed slowdown vs baseline (0.25 = 25%%)")
+    parser.add_argument("--update-baseline", action="store_true", help="Store this run as the new baseline")
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch workspace")
+    args = parser.parse_args()
+
+    report = run(args.visas, args.products, args.seed, args.repeat, args.keep)
+    baseline_path = Path(args.baseline)
+
+    regressions = []
+    if args.update_baseline:
+        baseline_path.write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+        print(f"Baseline written to {baseline_path}")
+    elif baseline_path.exists():
+        baseline = json.loads(baseline_path.read_text(encoding="utf-8"))
+        regressions = compare(report, baseline, args.threshold)
+
+    print_report(report)
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+
+    if regressions:
+        for name, ratio in regressions:
+            print(f"ERROR: {name} is {ratio:.2f}x the baseline (threshold {1 + args.threshold:.2f}x)")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,24 @@
 #!/usr/bin/env python3
-"""Generate visa content hubs from visa_facts.json data."""
+"""Generate visa content hubs from visa_facts.json data.
+
+Pages are rendered in memory and written only when their text changed;
+pages for visas that no longer exist are removed. Hugo and Pagefind then
+only see the pages an edit actually affected.
+"""
 
 from pathlib import Path
+import argparse
 import json
 import re
 import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timezone
+from itertools import repeat
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from tools.dataset import FileCache, scan, sources_by_id
 
 ROOT = Path(__file__).parent.parent
 VISAS = ROOT / "data" / "visas"
@@ -140,18 +153,9 @@ def slugify(value: str) -> str:
     return value or "unknown"
 
 
-def load_sources() -> dict:
+def load_sources(cache: FileCache) -> dict:
     """Load all source metadata from sources/*.meta.json."""
-    sources = {}
-    for p in SOURCES.rglob("*.meta.json"):
-        try:
-            meta = json.loads(p.read_text(encoding="utf-8"))
-            source_id = meta.get("source_id")
-            if source_id:
-                sources[source_id] = meta
-        except (json.JSONDecodeError, IOError):
-            continue
-    return sources
+    return sources_by_id(scan(cache, SOURCES, "*.meta.json"))
 
 
 def get_lint_required_blocks(visa_id: str, visa_name: str, snapshot_id: str) -> str:
@@ -270,11 +274,12 @@ def render_root_index(groups: dict, snapshot_id: str) -> str:
     return "\n".join(lines)
 
 
-def render_detail(visa: dict, sources: dict, snapshot_id: str) -> None:
+def detail_path(visa: dict) -> Path:
+    return OUT / slugify(visa["country"]) / slugify(visa["visa_name"]) / slugify(visa["route"]) / "index.md"
+
+
+def render_detail(visa: dict, sources: dict, snapshot_id: str) -> str:
     """Render a detail page for a specific visa route."""
-    country_slug = slugify(visa["country"])
-    visa_slug = slugify(visa["visa_name"])
-    authority_slug = slugify(visa["route"])
     visa_id = visa["id"]
 
     # Get source IDs from visa sources array
@@ -383,30 +388,73 @@ def render_detail(visa: dict, sources: dict, snapshot_id: str) -> None:
     lines.append(f'{{{{< checker_cta visa="{visa_id}" snapshot="{snapshot_id}" >}}}}')
     lines.append("")
 
-    # Write file
-    out_dir = OUT / country_slug / visa_slug / authority_slug
-    out_dir.mkdir(parents=True, exist_ok=True)
-    (out_dir / "index.md").write_text("\n".join(lines), encoding="utf-8")
-    print(f"Generated: {out_dir / 'index.md'}")
+    return "\n".join(lines)
+
+
+def write_if_changed(path: Path, content: str) -> bool:
+    """Write content unless path already holds it. Returns True if written."""
+    try:
+        if path.read_text(encoding="utf-8") == content:
+            return False
+    except (OSError, UnicodeDecodeError):
+        pass
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content, encoding="utf-8")
+    return True
+
+
+def remove_orphans(pages: set) -> list:
+    """Delete generated pages (index.md/_index.md under OUT) not in pages."""
+    removed = []
+    if not OUT.exists():
+        return removed
+    for path in sorted(OUT.rglob("*.md")):
+        if path.name in {"index.md", "_index.md"} and path not in pages:
+            path.unlink()
+            removed.append(path)
+    # Drop directories the removals left empty, deepest first
+    for folder in sorted((p for p in OUT.rglob("*") if p.is_dir()), key=lambda p: len(p.parts), reverse=True):
+        if not any(folder.iterdir()):
+            folder.rmdir()
+    return removed
+
+
+def render_details(visas: list, sources: dict, snapshot_id: str, jobs: int) -> list:
+    """Detail page text for each visa, in a process pool when jobs > 1."""
+    if jobs <= 1 or len(visas) <= 1:
+        return [render_detail(visa, sources, snapshot_id) for visa in visas]
+    chunksize = max(1, len(visas) // (jobs * 4))
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        return list(pool.map(render_detail, visas, repeat(sources), repeat(snapshot_id), chunksize=chunksize))
 
 
 def main():
     """Main entry point."""
-    sources = load_sources()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--jobs", type=int, default=1, help="Render detail pages in this many processes")
+    args = parser.parse_args()
+
+    cache = FileCache()
+    sources = load_sources(cache)
     snapshot_id = os.environ.get("SNAPSHOT_ID") or datetime.now(timezone.utc).date().isoformat()
     visas = []
 
-    for p in VISAS.rglob("visa_facts.json"):
-        try:
-            visas.append(json.loads(p.read_text(encoding="utf-8")))
-        except (json.JSONDecodeError, IOError) as e:
-            print(f"Warning: Failed to load {p}: {e}")
+    for record in scan(cache, VISAS, "visa_facts.json"):
+        if record.error is not None:
+            print(f"Warning: Failed to load {record.path}: {record.error}")
             continue
+        visas.append(record.data)
+    cache.save()
 
     if not visas:
         print("No visa_facts.json files found.")
         return
 
+    # Every page for this run, by path
+    pages = {}
+    for visa, content in zip(visas, render_details(visas, sources, snapshot_id, args.jobs)):
+        pages[detail_path(visa)] = content
+
     # Group visas by country+visa_name for overview pages
     grouped = {}
     for visa in visas:
@@ -425,27 +473,29 @@ def main():
             "visa_id": visa["id"],
         })
 
-        # Render detail page
-        render_detail(visa, sources, snapshot_id)
-
-    # Render overview pages
+    # Overview pages
     for (country_slug, visa_slug), routes in grouped.items():
         country_name = routes[0]["country"]
         visa_name = routes[0]["visa_name"]
-        out_dir = OUT / country_slug / visa_slug
-        out_dir.mkdir(parents=True, exist_ok=True)
-
         content = render_overview(country_slug, visa_slug, visa_name, country_name, routes, snapshot_id)
-        (out_dir / "_index.md").write_text(content, encoding="utf-8")
-        print(f"Generated: {out_dir / '_index.md'}")
-
-    # Render root visas index
-    OUT.mkdir(parents=True, exist_ok=True)
-    (OUT / "_index.md").write_text(render_root_index(grouped, snapshot_id), encoding="utf-8")
-    print(f"Generated: {OUT / '_index.md'}")
-
-    print(f"\nGenerated {len(visas)} detail pages and {len(grouped)} overview pages.")
-
+        pages[OUT / country_slug / visa_slug / "_index.md"] = content
+
+    # Root visas index
+    pages[OUT / "_index.md"] = render_root_index(grouped, snapshot_id)
+
+    written = 0
+    for path, content in pages.items():
+        if write_if_changed(path, content):
+            written += 1
+            print(f"Generated: {path}")
+    removed = remove_orphans(set(pages))
+    for path in removed:
+        print(f"Removed: {path}")
+
+    print(
+        f"\n{len(visas)} detail pages and {len(grouped)} overview pages: "
+        f"{written} written, {len(pages) - written} unchanged, {len(removed)} removed."
+    )
 
 if __name__ == "__main__":
     main()
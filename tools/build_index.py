@@ -1,48 +1,30 @@
 import json
 import os
+import re
 import subprocess
+import sys
 from pathlib import Path
 from datetime import datetime, timezone
 
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from tools.dataset import load_dataset
+from tools.index_format import dumps, expand_index, intern_index, intern_mappings
+from tools.source_deps import build_source_deps
+from tools.static_assets import hashed_name
+from tools.status_buckets import build_status_buckets, empty_buckets, status_counts
+
 ROOT = Path(__file__).parent.parent
-VISAS = ROOT / "data" / "visas"
-PRODUCTS = ROOT / "data" / "products"
 MAPPINGS = ROOT / "data" / "mappings"
-OFFERS = ROOT / "data" / "offers"
-SOURCES = ROOT / "sources"
 OUT = ROOT / "data" / "ui_index.json"
+SHARDS = ROOT / "data" / "ui_index"
 SOURCE_STATUS = ROOT / "data" / "source_status.json"
+LAST_VERIFIED_CACHE = ROOT / "data" / ".cache" / "last_verified.json"
 
-
-def load_all(folder):
-    files = []
-    for p in sorted(folder.rglob("*.json")):
-        if p.name.startswith("."):
-            continue
-        files.append(json.loads(p.read_text(encoding="utf-8")))
-    return files
-
-
-def load_offers(folder):
-    offers = []
-    for p in sorted(folder.rglob("*.json")):
-        if p.name.startswith("."):
-            continue
-        data = json.loads(p.read_text(encoding="utf-8"))
-        offers.extend(data.get("offers", []))
-    return offers
-
-
-def load_sources(folder):
-    sources = {}
-    for p in sorted(folder.rglob("*.meta.json")):
-        if p.name.startswith("."):
-            continue
-        meta = json.loads(p.read_text(encoding="utf-8"))
-        source_id = meta.get("source_id")
-        if source_id:
-            sources[source_id] = meta
-    return sources
+# Builds whose shards stay on disk. A client may hold an older manifest for
+# as long as it caches current.json, and must still be able to fetch its shards.
+KEEP_GENERATIONS = 3
 
 
 def load_source_status(path: Path) -> dict:
@@ -54,41 +36,214 @@ def load_source_status(path: Path) -> dict:
         return {"checked_at": None, "needs_review_source_ids": []}
 
 
-def last_verified_for_mapping(path: Path) -> str:
+def git(*args: str):
+    """Run git in ROOT and return stdout, or None if git is unavailable or fails."""
     try:
         result = subprocess.run(
-            ["git", "log", "-1", "--format=%cs", "--", str(path)],
+            ["git", "-c", "core.quotePath=false", *args],
             cwd=ROOT,
             capture_output=True,
             text=True,
+            encoding="utf-8",
             check=False,
         )
-        date_str = result.stdout.strip()
-        return date_str or ""
     except Exception:
-        return ""
+        return None
+    if result.returncode != 0:
+        return None
+    return result.stdout
+
+
+def mapping_commit_dates() -> dict:
+    """Map each file under data/mappings to its last commit date in one git log pass.
+
+    Cached in LAST_VERIFIED_CACHE until HEAD (or the clone depth) changes.
+    """
+    head = (git("rev-parse", "HEAD") or "").strip()
+    if not head:
+        return {}
+    shallow = (git("rev-parse", "--is-shallow-repository") or "").strip() == "true"
+    key = {"head": head, "shallow": shallow}
+
+    if LAST_VERIFIED_CACHE.exists():
+        try:
+            cached = json.loads(LAST_VERIFIED_CACHE.read_text(encoding="utf-8"))
+            if cached.get("key") == key:
+                return cached.get("dates", {})
+        except Exception:
+            pass
+
+    rel = MAPPINGS.relative_to(ROOT).as_posix()
+    out = git("log", "--name-only", "--relative", "--format=%x00%cs", "--", rel)
+    if out is None:
+        return {}
+    if shallow:
+        print("[WARN] Shallow clone: last_verified may show the clone boundary date.")
+
+    # Newest commits come first, so the first date seen for a path is its latest
+    dates = {}
+    current = ""
+    for line in out.splitlines():
+        if line.startswith("\x00"):
+            current = line[1:]
+        elif line and line not in dates:
+            dates[line] = current
+
+    try:
+        LAST_VERIFIED_CACHE.parent.mkdir(parents=True, exist_ok=True)
+        LAST_VERIFIED_CACHE.write_text(json.dumps({"key": key, "dates": dates}), encoding="utf-8")
+    except OSError:
+        pass
+    return dates
+
+
+def shard_name(value: str) -> str:
+    """File-name and URL safe stem for a shard."""
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", value) or "_"
+
+
+def manifest_files(out_dir: Path, rel: str) -> set:
+    """Paths of a manifest and every shard it names; empty when it cannot be read."""
+    try:
+        manifest = json.loads((out_dir / rel).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return set()
+    files = {rel, manifest.get("source_deps")}
+    for visa in manifest.get("visa_list", []):
+        files.update((visa.get("shard"), visa.get("buckets")))
+    files.update(manifest.get("source_shards", {}).values())
+    return {out_dir / f for f in files if f}
+
+
+def write_shards(index: dict, out_dir: Path, source_deps: dict, status_buckets: dict) -> None:
+    """Write the index as a small manifest plus per-visa and per-source shards.
+
+    The UI loads the manifest up front and fetches a visa shard only when
+    that visa is selected, and a source shard only when its evidence opens.
+    Manifest and shards have content-hashed names so they can be cached
+    immutably; current.json is the only mutable file and names the manifest.
+    The source_id reverse dependency index is one more shard, and each visa
+    has a status buckets shard for the "compatible products" view.
+
+    current.json also lists the manifests of the previous builds; files no
+    manifest of the last KEEP_GENERATIONS builds names are deleted.
+    """
+    written = set()
+
+    def write(folder: str, stem: str, payload) -> str:
+        data = dumps(payload).encode("utf-8")
+        rel = f"{folder}/{hashed_name(stem, data)}" if folder else hashed_name(stem, data)
+        path = out_dir / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+        written.add(path)
+        return rel
+
+    mappings_by_visa = {}
+    for m in index["mappings"]:
+        mappings_by_visa.setdefault(m.get("visa_id", ""), {})[m.get("product_id", "")] = m
+
+    visa_list = []
+    for visa in index["visas"]:
+        by_product = mappings_by_visa.get(visa.get("id", ""), {})
+        interned, evidence_table, excerpt_table = intern_mappings(list(by_product.values()))
+        rel = write("visas", shard_name(visa.get("id", "")), {
+            "visa": visa,
+            "mappings": dict(zip(by_product, interned)),
+            "evidence_table": evidence_table,
+            "excerpt_table": excerpt_table,
+        })
+        buckets = status_buckets.get(visa.get("id", ""), empty_buckets())
+        visa_list.append({
+            "id": visa.get("id"),
+            "country": visa.get("country"),
+            "visa_name": visa.get("visa_name"),
+            "route": visa.get("route"),
+            "authority": visa.get("authority"),
+            "last_verified": visa.get("last_verified"),
+            "shard": rel,
+            "buckets": write("buckets", shard_name(visa.get("id", "")), buckets),
+            "status_counts": status_counts(buckets),
+        })
+
+    source_shards = {}
+    for source_id, meta in index["sources_by_id"].items():
+        rel = write("sources", shard_name(source_id), meta)
+        source_shards[source_id] = rel
+
+    manifest = write("", "manifest", {
+        # built_at goes in current.json: the manifest's hash changes only with its content
+        "format": "sharded",
+        "snapshot_id": index["snapshot_id"],
+        "source_status": index["source_status"],
+        "visa_list": visa_list,
+        "product_list": [
+            {
+                "id": p.get("id"),
+                "provider": p.get("provider"),
+                "product_name": p.get("product_name"),
+                "policy_version": p.get("policy_version"),
+                "effective_date": p.get("effective_date"),
+            }
+            for p in index["products"]
+        ],
+        "offers_by_product": index["offers_by_product"],
+        "source_shards": source_shards,
+        "source_deps": write("", "source_deps", source_deps),
+    })
+
+    pointer = out_dir / "current.json"
+    try:
+        old = json.loads(pointer.read_text(encoding="utf-8"))
+        history = [old.get("manifest")] + list(old.get("previous_manifests", []))
+    except (OSError, ValueError, AttributeError):
+        history = []
+    keep = set(written)
+    previous = []
+    for rel in dict.fromkeys(history):
+        if len(previous) == KEEP_GENERATIONS - 1:
+            break
+        files = manifest_files(out_dir, rel) if rel and rel != manifest else set()
+        if files:
+            previous.append(rel)
+            keep |= files
+    pointer.write_text(json.dumps({
+        "manifest": manifest,
+        "built_at": index["built_at"],
+        "snapshot_id": index["snapshot_id"],
+        "previous_manifests": previous,
+    }, indent=2), encoding="utf-8")
+    keep.add(pointer)
+
+    # Drop shards no recent build refers to (visas/sources that no longer exist)
+    for path in out_dir.rglob("*.json"):
+        if path not in keep:
+            path.unlink()
 
 
 print("Loading data...")
-visas = sorted(load_all(VISAS), key=lambda v: v.get("id", ""))
-products = sorted(load_all(PRODUCTS), key=lambda p: p.get("id", ""))
+dataset = load_dataset()
+visas = dataset.visas
+products = dataset.products
+
+commit_dates = mapping_commit_dates()
 
 mappings = []
 for path in sorted(MAPPINGS.rglob("*.json")):
     if path.name.startswith("."):
         continue
     data = json.loads(path.read_text(encoding="utf-8"))
-    data["last_verified"] = last_verified_for_mapping(path)
+    data["last_verified"] = commit_dates.get(path.relative_to(ROOT).as_posix(), "")
     mappings.append(data)
 
 mappings = sorted(mappings, key=lambda m: (m.get("visa_id", ""), m.get("product_id", "")))
 
-sources_by_id = load_sources(SOURCES)
+sources_by_id = dataset.sources_by_id
 
 print(f"Loaded {len(visas)} visas, {len(products)} products, {len(mappings)} mappings.")
 
-offers = load_offers(OFFERS) if OFFERS.exists() else []
-offers_by_product = {o.get("product_id"): o for o in offers if o.get("product_id")}
+offers = dataset.offers
+offers_by_product = dataset.offers_by_product
 
 source_status = load_source_status(SOURCE_STATUS)
 
@@ -104,5 +259,14 @@ data = {
     "source_status": source_status,
 }
 
-OUT.write_text(json.dumps(data, indent=2), encoding="utf-8")
+interned = intern_index(data)
+if expand_index(json.loads(dumps(interned))) != data:
+    print("ERROR: interned ui_index does not expand back to the source index")
+    raise SystemExit(1)
+
+OUT.write_text(dumps(interned), encoding="utf-8")
 print(f"Index written to {OUT}")
+
+source_deps = build_source_deps(visas, dataset.product_files, mappings, dataset.insurers)
+write_shards(data, SHARDS, source_deps, build_status_buckets(mappings))
+print(f"Sharded index written to {SHARDS}")
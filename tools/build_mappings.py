@@ -1,40 +1,201 @@
 """Build compliance mappings between visas and products."""
+import argparse
+import hashlib
 import json
 import sys
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
 # Add parent directory to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from tools.engine import evaluate
+from tools import instrumentation
+from tools.dataset import load_dataset
+from tools.engine import compile_visa
 
 ROOT = Path(__file__).parent.parent
-VISAS = ROOT / "data" / "visas"
-PRODUCTS = ROOT / "data" / "products"
 MAPPINGS = ROOT / "data" / "mappings"
+CACHE = ROOT / "data" / ".cache" / "mappings.json"
+
+# Sources whose changes can alter any mapping
+ENGINE_SOURCES = [ROOT / "tools" / "engine.py", ROOT / "tools" / "matrix.py", ROOT / "tools" / "authorizations.py"]
+RULES_DIR = ROOT / "tools" / "rules"
 
 MAPPINGS.mkdir(exist_ok=True)
 
 
-def load_all(folder):
-    """Load all JSON files from a folder."""
-    files = []
-    for p in folder.rglob("*.json"):
-        files.append(json.loads(p.read_text(encoding="utf-8")))
-    return files
+def engine_version() -> str:
+    """Content hash of the rule engine sources."""
+    digest = hashlib.sha256()
+    for path in ENGINE_SOURCES + sorted(RULES_DIR.glob("*.py")):
+        if path.exists():
+            digest.update(path.name.encode("utf-8"))
+            digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+def load_cache(path: Path) -> dict:
+    if not path.exists():
+        return {}
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except Exception:
+        return {}
+
+
+def file_stamp(path: Path):
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def mapping_path(visa_id: str, product_id: str) -> Path:
+    return MAPPINGS / f"{visa_id}__{product_id}.json"
+
+
+def select_shards(visas, products, dirty=None):
+    """Group the pairs selected by dirty(visa, product) into one shard per visa.
+
+    Shards hold indexes into visas/products and follow their order.
+    """
+    shards = []
+    for vi, visa in enumerate(visas):
+        subset = [pi for pi, product in enumerate(products) if dirty is None or dirty(visa, product)]
+        if subset:
+            shards.append((vi, subset))
+    return shards
+
+
+def build_shard(visas, products, shard, batch=False, columns=None):
+    """Evaluate one shard and serialize each result to (visa_id, product_id, bytes)."""
+    vi, subset = shard
+    visa = visas[vi]
+    if batch:
+        # Columnar NumPy evaluator; needs numpy (see requirements.txt)
+        from tools.matrix import ProductColumns, evaluate_columns
+        key = tuple(subset)
+        cols = columns.get(key) if columns is not None else None
+        if cols is None:
+            cols = ProductColumns([products[pi] for pi in subset])
+            if columns is not None:
+                columns[key] = cols
+        results = evaluate_columns(visa, cols)
+    else:
+        plan = compile_visa(visa)
+        results = [plan.evaluate(products[pi]) for pi in subset]
+    return [
+        (r["visa_id"], r["product_id"], json.dumps(r, indent=2).encode("utf-8"))
+        for r in results
+    ]
+
+
+# Per-process state for --jobs workers, set once by _init_worker
+_WORKER = {}
+
+
+def _init_worker(visas, products, batch):
+    _WORKER.update(visas=visas, products=products, batch=batch, columns={})
+
+
+def _build_shard_in_worker(shard):
+    return build_shard(
+        _WORKER["visas"], _WORKER["products"], shard, _WORKER["batch"], _WORKER["columns"]
+    )
+
+
+def build_all(visas, products, shards, batch=False, jobs=1):
+    """Yield serialized results shard by shard, in shard order regardless of jobs."""
+    if jobs <= 1 or len(shards) <= 1:
+        columns = {}
+        for shard in shards:
+            yield from build_shard(visas, products, shard, batch, columns)
+        return
+    with ProcessPoolExecutor(
+        max_workers=jobs, initializer=_init_worker, initargs=(visas, products, batch)
+    ) as pool:
+        # map() returns in submission order, so output is independent of scheduling
+        for results in pool.map(_build_shard_in_worker, shards):
+            yield from results
 
 
 def main():
-    """Build all visa/product mappings."""
-    visas = load_all(VISAS)
-    products = load_all(PRODUCTS)
-    
-    for visa in visas:
-        for product in products:
-            result = evaluate(visa, product)
-            out = MAPPINGS / f"{visa['id']}__{product['id']}.json"
-            out.write_text(json.dumps(result, indent=2), encoding="utf-8")
+    """Build visa/product mappings whose inputs changed since the last run."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batch", action="store_true", help="Evaluate the full matrix with the columnar evaluator")
+    parser.add_argument("--force", action="store_true", help="Ignore the build cache and re-evaluate every pair")
+    parser.add_argument("--jobs", type=int, default=1, help="Evaluate visa shards across N worker processes")
+    parser.add_argument("--profile-rules", default="", help="Write per-rule timings and outcomes here (.prom for Prometheus text, else JSON)")
+    args = parser.parse_args()
+
+    if args.profile_rules:
+        if args.jobs > 1:
+            print("[WARN] --profile-rules evaluates in-process; ignoring --jobs")
+            args.jobs = 1
+        # Profile every pair, not just the ones the cache would rebuild
+        args.force = True
+        instrumentation.enable()
+
+    dataset = load_dataset()
+    visa_hashes = {r.data["id"]: r.sha256 for r in dataset.visa_records}
+    product_hashes = {r.data["id"]: r.sha256 for r in dataset.product_records}
+
+    version = engine_version()
+    cache = {} if args.force else load_cache(CACHE)
+    if cache.get("engine") != version:
+        cache = {}
+    cached_visas = cache.get("visas", {})
+    cached_products = cache.get("products", {})
+    cached_mappings = cache.get("mappings", {})
+
+    def dirty(visa, product):
+        if cached_visas.get(visa["id"]) != visa_hashes[visa["id"]]:
+            return True
+        if cached_products.get(product["id"]) != product_hashes[product["id"]]:
+            return True
+        out = mapping_path(visa["id"], product["id"])
+        return cached_mappings.get(out.name) != file_stamp(out)
+
+    # Keep stamps only for pairs that still exist
+    live = {mapping_path(v, p).name for v in visa_hashes for p in product_hashes}
+    mappings = {name: stamp for name, stamp in cached_mappings.items() if name in live}
+    built = unchanged = 0
+    visa_list = dataset.visas
+    product_list = dataset.products
+    shards = select_shards(visa_list, product_list, dirty)
+    for visa_id, product_id, data in build_all(
+        visa_list, product_list, shards, batch=args.batch, jobs=args.jobs
+    ):
+        out = mapping_path(visa_id, product_id)
+        if out.exists() and out.read_bytes() == data:
+            unchanged += 1
+        else:
+            out.write_bytes(data)
+            built += 1
             print("Built", out)
+        mappings[out.name] = file_stamp(out)
+
+    CACHE.parent.mkdir(parents=True, exist_ok=True)
+    CACHE.write_text(
+        json.dumps(
+            {
+                "engine": version,
+                "visas": visa_hashes,
+                "products": product_hashes,
+                "mappings": mappings,
+            },
+            indent=2,
+            sort_keys=True,
+        ),
+        encoding="utf-8",
+    )
+    skipped = len(visa_list) * len(product_list) - built - unchanged
+    print(f"Mappings: {built} written, {unchanged} unchanged, {skipped} cached")
+
+    if instrumentation.ACTIVE is not None:
+        instrumentation.ACTIVE.write(args.profile_rules)
+        print(f"Rule profile written to {args.profile_rules}")
 
 
 if __name__ == "__main__":
@@ -19,6 +19,7 @@ def main() -> None:
     env = os.environ.copy()
     env["SNAPSHOT_ID"] = release_id
     env["SNAPSHOT_ROOT"] = str(release_root)
+    env["SNAPSHOT_OBJECTS"] = str(ROOT / "data" / "snapshots" / "objects")
 
     subprocess.run([sys.executable, "tools/build_index.py"], check=True, env=env, cwd=ROOT)
     subprocess.run([sys.executable, "tools/build_snapshot.py"], check=True, env=env, cwd=ROOT)
@@ -1,33 +1,27 @@
-import hashlib
+import argparse
 import json
 import os
-import shutil
+import sys
 from datetime import datetime
 from pathlib import Path
 
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from tools.snapshot_store import RESERVED, ObjectStore, tree_inputs
+
 ROOT = Path(__file__).parent.parent
 DATA = ROOT / "data"
 SNAPSHOTS = Path(os.environ.get("SNAPSHOT_ROOT", DATA / "snapshots"))
+# Shared by every snapshot root that points here (releases use the main store)
+OBJECTS = Path(os.environ.get("SNAPSHOT_OBJECTS", SNAPSHOTS / "objects"))
 
 VISAS = DATA / "visas"
 PRODUCTS = DATA / "products"
+INSURERS = DATA / "insurers"
 MAPPINGS = DATA / "mappings"
 UI_INDEX = DATA / "ui_index.json"
-
-
-def sha256(path: Path) -> str:
-    return hashlib.sha256(path.read_bytes()).hexdigest()
-
-
-def copy_tree(src: Path, dst: Path) -> None:
-    if dst.exists():
-        shutil.rmtree(dst)
-    shutil.copytree(src, dst)
-
-
-def copy_file(src: Path, dst: Path) -> None:
-    dst.parent.mkdir(parents=True, exist_ok=True)
-    shutil.copy2(src, dst)
+UI_INDEX_SHARDS = DATA / "ui_index"
 
 
 def resolve_snapshot_id() -> str:
@@ -44,19 +38,8 @@ def resolve_snapshot_id() -> str:
     return datetime.utcnow().date().isoformat()
 
 
-def build_manifest(snapshot_dir: Path, snapshot_id: str) -> None:
-    files = []
-    for path in sorted(snapshot_dir.rglob("*")):
-        if path.is_dir():
-            continue
-        rel = path.relative_to(snapshot_dir).as_posix()
-        files.append(
-            {
-                "path": rel,
-                "sha256": sha256(path),
-                "size": path.stat().st_size,
-            }
-        )
+def build_manifest(snapshot_dir: Path, snapshot_id: str, files: list) -> None:
+    """Write manifest.json from entries the object store already hashed."""
     manifest = {
         "snapshot_id": snapshot_id,
         "built_at": datetime.utcnow().isoformat() + "Z",
@@ -68,20 +51,39 @@ def build_manifest(snapshot_dir: Path, snapshot_id: str) -> None:
 
 
 def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--prune", action="store_true", help="Delete objects no snapshot manifest references")
+    args = parser.parse_args()
+
     snapshot_id = resolve_snapshot_id()
+    if snapshot_id in RESERVED:
+        raise SystemExit(f"Snapshot id {snapshot_id!r} is reserved")
     snapshot_dir = SNAPSHOTS / snapshot_id
-    snapshot_dir.mkdir(parents=True, exist_ok=True)
-
-    copy_tree(VISAS, snapshot_dir / "visas")
-    copy_tree(PRODUCTS, snapshot_dir / "products")
-    copy_tree(MAPPINGS, snapshot_dir / "mappings")
 
     if not UI_INDEX.exists():
         raise FileNotFoundError(f"Missing {UI_INDEX}")
-    copy_file(UI_INDEX, snapshot_dir / "ui_index.json")
+    inputs = [
+        *tree_inputs(VISAS, "visas"),
+        *tree_inputs(PRODUCTS, "products"),
+        *tree_inputs(INSURERS, "insurers"),
+        *tree_inputs(MAPPINGS, "mappings"),
+        (UI_INDEX, "ui_index.json"),
+        *tree_inputs(UI_INDEX_SHARDS, "ui_index"),
+    ]
+
+    store = ObjectStore(OBJECTS)
+    files = store.build(snapshot_dir, inputs)
+    build_manifest(snapshot_dir, snapshot_id, files)
+    print(
+        f"Snapshot written to {snapshot_dir}: {len(files)} files, "
+        f"{store.stats['stored']} new objects, {store.stats['hashed']} hashed, "
+        f"{store.stats['copied']} copied instead of linked"
+    )
 
-    build_manifest(snapshot_dir, snapshot_id)
-    print(f"Snapshot written to {snapshot_dir}")
+    if args.prune:
+        # Every snapshot root sharing this store lives under its parent
+        manifests = [p for p in OBJECTS.parent.rglob("manifest.json") if OBJECTS not in p.parents]
+        print(f"Pruned {store.prune(manifests)} unreferenced objects")
 
 
 if __name__ == "__main__":
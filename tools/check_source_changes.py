@@ -1,36 +1,201 @@
+"""Check every source URL for changes against the sha256 in its .meta.json.
+
+Sources are fetched on a thread pool, at most --per-host at a time for one
+host, with retries and exponential backoff for timeouts and 429/5xx. The
+ETag and Last-Modified of each response are kept in a state file and sent
+back as If-None-Match/If-Modified-Since, so an unchanged page answers 304
+and is not downloaded again. Bodies are hashed as they stream in.
+
+--fixture-dir hashes local <source_id>.txt/.bin files instead of fetching.
+"""
 import argparse
 import hashlib
+import http.client
 import json
+import os
 import sys
+import threading
+import time
+import urllib.error
 import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
+from urllib.parse import urlsplit
 
+sys.path.insert(0, str(Path(__file__).parent.parent))
 
-def sha256_bytes(data: bytes) -> str:
-    return hashlib.sha256(data).hexdigest()
+from tools.dataset import ROOT, load_records
+from tools.hashing import CHUNK_SIZE, sha256_file
 
+STATE = ROOT / "data" / ".cache" / "source_validators.json"
+USER_AGENT = "VisaFactSourceMonitor/1"
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+MAX_RETRY_AFTER = 60
 
-def fetch_bytes(url: str) -> bytes:
-    with urllib.request.urlopen(url, timeout=20) as resp:
-        return resp.read()
 
+class HostLimiter:
+    """At most per_host concurrent requests to any one host."""
 
-def load_sources(sources_dir: Path) -> list[dict]:
-    items = []
-    for path in sources_dir.rglob("*.meta.json"):
+    def __init__(self, per_host: int):
+        self.per_host = max(1, per_host)
+        self._slots = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def slot(self, url: str):
+        host = urlsplit(url).netloc.lower()
+        with self._lock:
+            semaphore = self._slots.get(host)
+            if semaphore is None:
+                semaphore = self._slots[host] = threading.BoundedSemaphore(self.per_host)
+        with semaphore:
+            yield
+
+
+def retry_delay(attempt: int, backoff: float, error=None) -> float:
+    """Exponential backoff, or the server's Retry-After seconds when it sent one."""
+    headers = getattr(error, "headers", None)
+    retry_after = headers.get("Retry-After") if headers is not None else None
+    if retry_after and retry_after.strip().isdigit():
+        return min(float(retry_after), MAX_RETRY_AFTER)
+    return backoff * (2 ** attempt)
+
+
+def fetch_digest(url: str, validators: dict = None, limiter: HostLimiter = None,
+                 timeout: float = 20, retries: int = 3, backoff: float = 0.5) -> dict:
+    """Fetch url and hash the body as it streams.
+
+    validators holds the etag/last_modified/sha256 from the previous fetch;
+    when the server answers 304 its sha256 is reused. Returns
+    {"sha256", "etag", "last_modified", "not_modified"}.
+    """
+    limiter = limiter or HostLimiter(1)
+    headers = {"User-Agent": USER_AGENT}
+    if validators and validators.get("sha256"):
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
+    conditional = "If-None-Match" in headers or "If-Modified-Since" in headers
+
+    for attempt in range(retries + 1):
+        error = None
         try:
-            items.append(json.loads(path.read_text(encoding="utf-8")))
-        except Exception:
-            continue
-    return items
+            with limiter.slot(url):
+                request = urllib.request.Request(url, headers=headers)
+                with urllib.request.urlopen(request, timeout=timeout) as resp:
+                    digest = hashlib.sha256()
+                    while True:
+                        chunk = resp.read(CHUNK_SIZE)
+                        if not chunk:
+                            break
+                        digest.update(chunk)
+                    return {
+                        "sha256": digest.hexdigest(),
+                        "etag": resp.headers.get("ETag"),
+                        "last_modified": resp.headers.get("Last-Modified"),
+                        "not_modified": False,
+                    }
+        except urllib.error.HTTPError as e:
+            if e.code == 304 and conditional:
+                return {
+                    "sha256": validators["sha256"],
+                    "etag": e.headers.get("ETag") or validators.get("etag"),
+                    "last_modified": e.headers.get("Last-Modified") or validators.get("last_modified"),
+                    "not_modified": True,
+                }
+            if e.code not in RETRY_STATUSES or attempt == retries:
+                raise
+            error = e
+        except (urllib.error.URLError, http.client.HTTPException, OSError):
+            if attempt == retries:
+                raise
+        # Back off outside the host slot so other requests can use it
+        time.sleep(retry_delay(attempt, backoff, error))
+
+
+def load_sources(sources_dir: Path) -> list[dict]:
+    return [r.data for r in load_records(sources_dir, "*.meta.json") if r.error is None]
 
 
-def resolve_fixture_bytes(fixture_dir: Path, source_id: str) -> bytes:
+def resolve_fixture_path(fixture_dir: Path, source_id: str) -> Path:
     path = fixture_dir / f"{source_id}.txt"
     if not path.exists():
         path = fixture_dir / f"{source_id}.bin"
-    return path.read_bytes()
+    return path
+
+
+def load_state(path: Path) -> dict:
+    """Validators from the previous run, by source_id."""
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def save_state(path: Path, state: dict) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(state, indent=2, sort_keys=True), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def check_sources(sources: list, fixture_dir: Path = None, state: dict = None, jobs: int = 16,
+                  per_host: int = 4, timeout: float = 20, retries: int = 3, backoff: float = 0.5):
+    """Compare each source's current sha256 with its meta.
+
+    state (source_id -> validators) is read and updated in place.
+    Returns (changed, counts), changed in source order.
+    """
+    state = {} if state is None else state
+    limiter = HostLimiter(per_host)
+    work = [
+        meta for meta in sources
+        if meta.get("source_id") and meta.get("url") and meta.get("sha256")
+    ]
+
+    def check(meta):
+        source_id, url = meta["source_id"], meta["url"]
+        if fixture_dir:
+            return {"sha256": sha256_file(resolve_fixture_path(fixture_dir, source_id)), "not_modified": False}
+        previous = state.get(source_id)
+        validators = previous if previous and previous.get("url") == url else None
+        return fetch_digest(url, validators, limiter, timeout, retries, backoff)
+
+    def attempt(meta):
+        try:
+            return check(meta)
+        except Exception as exc:  # one failing source must not stop the rest
+            return exc
+
+    if jobs <= 1 or len(work) <= 1:
+        results = [attempt(meta) for meta in work]
+    else:
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            results = list(pool.map(attempt, work))
+
+    changed = []
+    counts = {"checked": 0, "not_modified": 0, "errors": 0}
+    for meta, result in zip(work, results):
+        source_id, url = meta["source_id"], meta["url"]
+        if isinstance(result, Exception):
+            counts["errors"] += 1
+            print(f"[WARN] {source_id}: {result}")
+            continue
+        counts["checked"] += 1
+        counts["not_modified"] += result["not_modified"]
+        if not fixture_dir:
+            state[source_id] = {
+                "url": url,
+                "etag": result.get("etag"),
+                "last_modified": result.get("last_modified"),
+                "sha256": result["sha256"],
+            }
+        if result["sha256"].lower() != str(meta["sha256"]).lower():
+            changed.append({"source_id": source_id, "url": url, "sha256": result["sha256"]})
+    return changed, counts
 
 
 def main() -> None:
@@ -40,25 +205,30 @@ def main() -> None:
     parser.add_argument("--output", default="")
     parser.add_argument("--write-status", default="")
     parser.add_argument("--report-md", default="")
+    parser.add_argument("--state", default=str(STATE), help="ETag/Last-Modified store for conditional requests")
+    parser.add_argument("--jobs", type=int, default=16, help="Concurrent fetches")
+    parser.add_argument("--per-host", type=int, default=4, help="Concurrent fetches per host")
+    parser.add_argument("--timeout", type=float, default=20)
+    parser.add_argument("--retries", type=int, default=3, help="Retries for timeouts and 429/5xx responses")
     args = parser.parse_args()
 
     sources_dir = Path(args.sources_dir)
     fixture_dir = Path(args.fixture_dir) if args.fixture_dir else None
+    state_path = Path(args.state)
+    state = {} if fixture_dir else load_state(state_path)
 
-    changed = []
-    for meta in load_sources(sources_dir):
-        source_id = meta.get("source_id")
-        url = meta.get("url")
-        expected = str(meta.get("sha256") or "")
-        if not source_id or not url or not expected:
-            continue
-        try:
-            data = resolve_fixture_bytes(fixture_dir, source_id) if fixture_dir else fetch_bytes(url)
-            actual = sha256_bytes(data)
-            if actual.lower() != expected.lower():
-                changed.append({"source_id": source_id, "url": url, "sha256": actual})
-        except Exception as exc:
-            print(f"[WARN] {source_id}: {exc}")
+    start = time.perf_counter()
+    changed, counts = check_sources(
+        load_sources(sources_dir), fixture_dir, state,
+        jobs=args.jobs, per_host=args.per_host, timeout=args.timeout, retries=args.retries,
+    )
+    if not fixture_dir:
+        save_state(state_path, state)
+    print(
+        f"Checked {counts['checked']} sources in {time.perf_counter() - start:.1f}s "
+        f"({counts['not_modified']} not modified, {counts['errors']} errors)",
+        file=sys.stderr,
+    )
 
     checked_at = datetime.utcnow().isoformat() + "Z"
     report = {"checked_at": checked_at, "changed": changed}
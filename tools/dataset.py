@@ -0,0 +1,192 @@
+"""Shared loader for visas, products, offers, insurers and source metadata.
+
+Every tool reads the same JSON through this module. Parsed files are kept
+in an on-disk pickle cache keyed by path, size and mtime, so a pipeline run
+parses each file once no matter how many tools read it.
+"""
+import hashlib
+import json
+import os
+import pickle
+import time
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from tools.authorizations import AuthorizationRegistry
+
+ROOT = Path(__file__).parent.parent
+VISAS = ROOT / "data" / "visas"
+PRODUCTS = ROOT / "data" / "products"
+OFFERS = ROOT / "data" / "offers"
+INSURERS = ROOT / "data" / "insurers"
+SOURCES = ROOT / "sources"
+CACHE = Path(os.environ.get("DATASET_CACHE", ROOT / "data" / ".cache" / "dataset.pickle"))
+
+# Bump when the cached entry layout changes
+CACHE_VERSION = 1
+
+# Files modified this recently are parsed but not cached: a same-size rewrite
+# within the filesystem's mtime granularity would otherwise look unchanged.
+RACY_WINDOW_NS = 2_000_000_000
+
+
+class Record(NamedTuple):
+    """One JSON file: parsed data and raw-content hash, or the parse error."""
+    path: Path
+    data: Any
+    sha256: str
+    error: Optional[str] = None
+
+
+class FileCache:
+    """Parsed JSON keyed by absolute path, valid while size and mtime match."""
+
+    def __init__(self, path: Path = CACHE):
+        self.path = path
+        self.entries: Dict[str, tuple] = {}
+        self.dirty = False
+        try:
+            with path.open("rb") as fh:
+                cached = pickle.load(fh)
+            if cached.get("version") == CACHE_VERSION:
+                self.entries = cached["entries"]
+        except Exception:
+            pass
+
+    def read(self, path: Path) -> Record:
+        key = str(path.resolve())
+        try:
+            stat = path.stat()
+        except OSError as e:
+            return Record(path, None, "", str(e))
+        stamp = (stat.st_size, stat.st_mtime_ns)
+        entry = self.entries.get(key)
+        if entry is not None and entry[0] == stamp:
+            return Record(path, entry[2], entry[1])
+        try:
+            raw = path.read_bytes()
+            data = json.loads(raw.decode("utf-8"))
+        except (OSError, ValueError) as e:
+            return Record(path, None, "", str(e))
+        digest = hashlib.sha256(raw).hexdigest()
+        if time.time_ns() - stat.st_mtime_ns > RACY_WINDOW_NS:
+            self.entries[key] = (stamp, digest, data)
+            self.dirty = True
+        elif self.entries.pop(key, None) is not None:
+            self.dirty = True
+        return Record(path, data, digest)
+
+    def save(self) -> None:
+        """Write the cache back, dropping entries for files that are gone."""
+        live = {k: v for k, v in self.entries.items() if Path(k).exists()}
+        if not self.dirty and len(live) == len(self.entries):
+            return
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_name(self.path.name + ".tmp")
+            with tmp.open("wb") as fh:
+                pickle.dump({"version": CACHE_VERSION, "entries": live}, fh, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self.path)
+        except OSError:
+            pass
+        self.entries = live
+        self.dirty = False
+
+
+def scan(cache: FileCache, folder: Path, pattern: str = "*.json") -> List[Record]:
+    """Records for every file matching pattern under folder, in path order."""
+    if not folder.exists():
+        return []
+    return [
+        cache.read(p)
+        for p in sorted(folder.rglob(pattern))
+        if p.is_file() and not p.name.startswith(".")
+    ]
+
+
+def load_records(folder: Path, pattern: str = "*.json") -> List[Record]:
+    """Scan one folder through the shared cache."""
+    cache = FileCache()
+    records = scan(cache, folder, pattern)
+    cache.save()
+    return records
+
+
+def sources_by_id(records: List[Record]) -> Dict[str, dict]:
+    """Index *.meta.json records by source_id. Unreadable files are skipped."""
+    sources = {}
+    for record in records:
+        if isinstance(record.data, dict) and record.data.get("source_id"):
+            sources[record.data["source_id"]] = record.data
+    return sources
+
+
+def _parsed(records: List[Record]) -> List[Record]:
+    for record in records:
+        if record.error is not None:
+            raise ValueError(f"Failed to load {record.path}: {record.error}")
+    return records
+
+
+def load_authorizations(cache: FileCache, folder: Path = INSURERS) -> AuthorizationRegistry:
+    """The insurer registry, for callers that read product files without a Dataset."""
+    return AuthorizationRegistry([r.data for r in _parsed(scan(cache, folder))])
+
+
+def _authorized(record: Record, registry: AuthorizationRegistry) -> Record:
+    """record with its provider's registry facts applied; sha256 covers both."""
+    digest = registry.digest(record.data.get("provider"))
+    if digest is None:
+        return record
+    combined = hashlib.sha256(f"{record.sha256}:{digest}".encode("utf-8")).hexdigest()
+    return record._replace(data=registry.apply(record.data), sha256=combined)
+
+
+class Dataset:
+    """Visas, products, offers, insurers and sources, indexed by id.
+
+    Products carry the authorization registry's facts for their provider
+    (see tools/authorizations.py); product_files holds them as written.
+    """
+
+    def __init__(
+        self,
+        visas: List[Record],
+        products: List[Record],
+        offers: List[Record],
+        sources: List[Record],
+        insurers: List[Record] = (),
+    ):
+        self.insurer_records = _parsed(insurers)
+        self.insurers = [r.data for r in self.insurer_records]
+        self.authorizations = AuthorizationRegistry(self.insurers)
+
+        self.visa_records = sorted(_parsed(visas), key=lambda r: r.data.get("id", ""))
+        product_files = sorted(_parsed(products), key=lambda r: r.data.get("id", ""))
+        self.product_records = [_authorized(r, self.authorizations) for r in product_files]
+        self.offer_records = _parsed(offers)
+        self.source_records = sources
+
+        self.visas = [r.data for r in self.visa_records]
+        self.products = [r.data for r in self.product_records]
+        self.product_files = [r.data for r in product_files]  # as written, without the registry facts
+        self.offers = [o for r in self.offer_records for o in r.data.get("offers", [])]
+
+        self.visas_by_id = {v.get("id"): v for v in self.visas}
+        self.products_by_id = {p.get("id"): p for p in self.products}
+        self.offers_by_product = {o.get("product_id"): o for o in self.offers if o.get("product_id")}
+        self.sources_by_id = sources_by_id(sources)
+
+
+def load_dataset() -> Dataset:
+    """Load the full dataset in one pass over data/ and sources/."""
+    cache = FileCache()
+    dataset = Dataset(
+        scan(cache, VISAS),
+        scan(cache, PRODUCTS),
+        scan(cache, OFFERS),
+        scan(cache, SOURCES, "*.meta.json"),
+        scan(cache, INSURERS),
+    )
+    cache.save()
+    return dataset
@@ -0,0 +1,222 @@
+"""Report the visa/product mappings whose verdict changed between two snapshots.
+
+Compares the manifests written by build_snapshot.py, loads only the visa
+and product facts whose sha256 differs (plus the unchanged facts they must
+be paired with), and evaluates just the affected pairs on both sides with
+the current engine. No mappings, indexes or unchanged pairs are touched.
+An edited insurer authorization file changes every product from that
+insurer (see tools/authorizations.py).
+
+    py tools/diff_snapshots.py 2026-01-20 2026-01-27
+    py tools/diff_snapshots.py data/snapshots/releases/r1 data/snapshots/releases/r2 --json
+"""
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from tools.authorizations import AuthorizationRegistry, provider_key
+from tools.engine import compile_visa
+
+ROOT = Path(__file__).parent.parent
+SNAPSHOTS = Path(os.environ.get("SNAPSHOT_ROOT", ROOT / "data" / "snapshots"))
+
+FACTS = {"visas": "visa_facts.json", "products": "product_facts.json", "insurers": "insurer_facts.json"}
+# Field identifying one facts file of each kind
+KEYS = {"visas": "id", "products": "id", "insurers": "provider"}
+
+
+def resolve_snapshot(ref: str) -> Path:
+    """A snapshot directory given either its id or a path."""
+    path = Path(ref)
+    if (path / "manifest.json").exists():
+        return path
+    return SNAPSHOTS / ref
+
+
+def facts_hashes(snapshot_dir: Path, kind: str) -> dict:
+    """path -> sha256 of the kind's facts files listed in the manifest."""
+    manifest_path = snapshot_dir / "manifest.json"
+    if not manifest_path.exists():
+        raise SystemExit(f"Missing manifest: {manifest_path}")
+    manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+    return {
+        entry["path"]: entry["sha256"]
+        for entry in manifest.get("files", [])
+        if entry["path"].startswith(kind + "/") and entry["path"].endswith("/" + FACTS[kind])
+    }
+
+
+class Side:
+    """Facts of one kind for both snapshots, loaded lazily by path."""
+
+    def __init__(self, kind: str, old_dir: Path, new_dir: Path):
+        self.old_dir, self.new_dir = old_dir, new_dir
+        self.key = KEYS[kind]
+        self.old = facts_hashes(old_dir, kind)
+        self.new = facts_hashes(new_dir, kind)
+        self.old_changed = [p for p in self.old if self.new.get(p) != self.old[p]]
+        self.new_changed = [p for p in self.new if self.old.get(p) != self.new[p]]
+        self._loaded = {}
+
+    def load(self, snapshot_dir: Path, rel: str) -> dict:
+        key = (snapshot_dir, rel)
+        if key not in self._loaded:
+            self._loaded[key] = json.loads((snapshot_dir / rel).read_text(encoding="utf-8"))
+        return self._loaded[key]
+
+    def changed_ids(self) -> set:
+        """Ids whose facts were added, removed or edited (moves included)."""
+        ids = {self.load(self.old_dir, p)[self.key] for p in self.old_changed}
+        ids.update(self.load(self.new_dir, p)[self.key] for p in self.new_changed)
+        return ids
+
+    def all_facts(self) -> tuple:
+        """(old id -> facts, new id -> facts). Unchanged files are read once."""
+        old = {}
+        new = {}
+        for rel, digest in self.old.items():
+            # Identical content: read it from the new snapshot and share it
+            source = self.new_dir if self.new.get(rel) == digest else self.old_dir
+            facts = self.load(source, rel)
+            old[facts[self.key]] = facts
+        for rel in self.new:
+            facts = self.load(self.new_dir, rel)
+            new[facts[self.key]] = facts
+        return old, new
+
+    def changed_facts(self) -> tuple:
+        """(old id -> facts, new id -> facts) for the changed files only."""
+        old = {f[self.key]: f for f in (self.load(self.old_dir, p) for p in self.old_changed)}
+        new = {f[self.key]: f for f in (self.load(self.new_dir, p) for p in self.new_changed)}
+        return old, new
+
+
+def transition(old, new) -> str:
+    return f"{old['status'] if old else 'NONE'}->{new['status'] if new else 'NONE'}"
+
+
+def diff(old_dir: Path, new_dir: Path) -> dict:
+    visas = Side("visas", old_dir, new_dir)
+    products = Side("products", old_dir, new_dir)
+    insurers = Side("insurers", old_dir, new_dir)
+    changed_visas = visas.changed_ids()
+    changed_products = products.changed_ids()
+    changed_providers = {provider_key(provider) for provider in insurers.changed_ids()}
+
+    # A changed visa pairs with every product, and a changed product with
+    # every visa, so the other side is loaded in full only when needed.
+    # Products of a changed insurer can only be found among all products.
+    old_products, new_products = (
+        products.all_facts() if changed_visas or changed_providers else products.changed_facts()
+    )
+    for side in (old_products, new_products):
+        changed_products.update(
+            product_id for product_id, product in side.items()
+            if provider_key(product.get("provider")) in changed_providers
+        )
+    old_visas, new_visas = visas.all_facts() if changed_products else visas.changed_facts()
+
+    # Every registry entry applies, whichever files changed
+    old_insurers, new_insurers = insurers.all_facts()
+    old_registry = AuthorizationRegistry(list(old_insurers.values()))
+    new_registry = AuthorizationRegistry(list(new_insurers.values()))
+    old_products = {product_id: old_registry.apply(p) for product_id, p in old_products.items()}
+    new_products = {product_id: new_registry.apply(p) for product_id, p in new_products.items()}
+
+    pairs = set()
+    for visa_id in changed_visas:
+        pairs.update((visa_id, p) for p in set(old_products) | set(new_products))
+    for product_id in changed_products:
+        pairs.update((v, product_id) for v in set(old_visas) | set(new_visas))
+
+    plans = {}
+
+    def evaluate(side_visas, side_products, tag, visa_id, product_id):
+        visa = side_visas.get(visa_id)
+        product = side_products.get(product_id)
+        if visa is None or product is None:
+            return None
+        key = (tag, visa_id)
+        if key not in plans:
+            plans[key] = compile_visa(visa)
+        return plans[key].evaluate(product)
+
+    changes = []
+    summary = {}
+    for visa_id, product_id in sorted(pairs):
+        old = evaluate(old_visas, old_products, "old", visa_id, product_id)
+        new = evaluate(new_visas, new_products, "new", visa_id, product_id)
+        old_missing = set(old["missing"]) if old else set()
+        new_missing = set(new["missing"]) if new else set()
+        if old and new and old["status"] == new["status"] and old_missing == new_missing:
+            continue
+        change = {
+            "visa_id": visa_id,
+            "product_id": product_id,
+            "old_status": old["status"] if old else None,
+            "new_status": new["status"] if new else None,
+            "new_missing": sorted(new_missing - old_missing),
+            "resolved_missing": sorted(old_missing - new_missing),
+            "reasons": new["reasons"] if new else [],
+        }
+        changes.append(change)
+        label = transition(old, new)
+        summary[label] = summary.get(label, 0) + 1
+
+    return {
+        "old": old_dir.name,
+        "new": new_dir.name,
+        "changed_visas": sorted(changed_visas),
+        "changed_products": sorted(changed_products),
+        "evaluated_pairs": len(pairs),
+        "summary": dict(sorted(summary.items())),
+        "changes": changes,
+    }
+
+
+def print_text(report: dict) -> None:
+    print(
+        f"{report['old']} -> {report['new']}: {len(report['changed_visas'])} visas and "
+        f"{len(report['changed_products'])} products changed, {report['evaluated_pairs']} pairs evaluated"
+    )
+    for label, count in report["summary"].items():
+        print(f"  {label}: {count}")
+    for change in report["changes"]:
+        detail = []
+        if change["new_missing"]:
+            detail.append("new UNKNOWN fields: " + ", ".join(change["new_missing"]))
+        if change["resolved_missing"]:
+            detail.append("resolved: " + ", ".join(change["resolved_missing"]))
+        suffix = f" ({'; '.join(detail)})" if detail else ""
+        print(
+            f"{change['visa_id']} x {change['product_id']}: "
+            f"{change['old_status'] or 'NONE'} -> {change['new_status'] or 'NONE'}{suffix}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("old", help="Old snapshot id or directory")
+    parser.add_argument("new", help="New snapshot id or directory")
+    parser.add_argument("--json", action="store_true", help="Print the delta as JSON")
+    parser.add_argument("--output", default="", help="Also write the JSON delta here")
+    args = parser.parse_args()
+
+    report = diff(resolve_snapshot(args.old), resolve_snapshot(args.new))
+    if args.output:
+        out_path = Path(args.output)
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        out_path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_text(report)
+
+
+if __name__ == "__main__":
+    main()
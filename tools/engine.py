@@ -1,77 +1,119 @@
-"""Compliance evaluation engine."""
-from tools.rules import (
-    MandatoryInsuranceRule,
-    TravelInsuranceAcceptedRule,
-    AuthorizedInSpainRule,
-    NoDeductibleRule,
-    ComprehensiveCoverageRule,
-    CoversPublicHealthSystemRisksRule,
-    UnlimitedCoverageRule,
-    NoCopaymentRule,
-    NoMoratoriumRule,
-    MinimumCoverageRule,
-    MonthlyPaymentsAcceptedRule,
-    MustCoverFullPeriodRule,
-)
+"""Compliance evaluation engine.
+
+Products are evaluated as given. Insurer authorization facts are applied
+when products are loaded (tools/dataset.py, tools/authorizations.py), not here.
+"""
+from tools.rules import TABLE_BY_NAME, TableRule, UnlimitedCoverageRule, compile_evaluator
+from tools import instrumentation
+from tools.rules.base import STATUS_RANK, RuleResult, index_requirements
+
+
+def _table(name: str) -> TableRule:
+    return TableRule(TABLE_BY_NAME[name])
+
 
 # Rule order matters - terminal rules first
 RULES = [
-    MandatoryInsuranceRule(),
-    TravelInsuranceAcceptedRule(),
-    AuthorizedInSpainRule(),
-    NoDeductibleRule(),
-    ComprehensiveCoverageRule(),
-    CoversPublicHealthSystemRisksRule(),
+    _table("MandatoryInsurance"),
+    _table("TravelInsuranceAccepted"),
+    _table("AuthorizedInSpain"),
+    _table("AuthorizedIn"),
+    _table("NoDeductible"),
+    _table("ComprehensiveCoverage"),
+    _table("CoversPublicHealthSystemRisks"),
     UnlimitedCoverageRule(),
-    NoCopaymentRule(),
-    NoMoratoriumRule(),
-    MinimumCoverageRule(),
-    MonthlyPaymentsAcceptedRule(),
-    MustCoverFullPeriodRule(),
+    _table("NoCopayment"),
+    _table("NoMoratorium"),
+    _table("MinimumCoverage"),
+    _table("MonthlyPaymentsAccepted"),
+    _table("MustCoverFullPeriod"),
 ]
 
 
-def evaluate(visa: dict, product: dict) -> dict:
-    """Evaluate visa/product compliance using all rules."""
+class VisaPlan:
+    """A visa compiled against RULES: only the applicable rules, pre-bound."""
+
+    def __init__(self, visa: dict, checks: list, evaluator=None):
+        self.visa_id = visa["id"]
+        self.checks = checks  # [(rule, bound_check), ...] in RULES order
+        if evaluator is not None:
+            # Generated straight-line code (rules.table.compile_evaluator) replaces the combine() below
+            self.evaluate = evaluator
+
+    def evaluate(self, product: dict) -> dict:
+        """Evaluate one product against this visa plan."""
+        # Lazy: checks after a terminal result are never run
+        return combine(self.visa_id, product["id"], (check(product) for _rule, check in self.checks))
+
+
+def merge(status: str, result: RuleResult, reasons: list, missing: list) -> str:
+    """Fold one non-terminal rule result into reasons and missing; returns the new status.
+
+    The merge step of every evaluator: combine(), and the code
+    compile_evaluator() generates for rules it calls through a bound check.
+    """
+    reasons.extend(result.reasons)
+    missing.extend(result.missing)
+    if STATUS_RANK.get(result.status, 0) > STATUS_RANK[status]:
+        return result.status
+    return status
+
+
+def combine(visa_id: str, product_id: str, results) -> dict:
+    """Merge rule results, in plan order, into one mapping.
+
+    results may be lazy: nothing after a terminal result is consumed.
+    """
     reasons = []
     missing = []
     status = "GREEN"
-    
-    for rule in RULES:
-        result = rule.check(visa, product)
+    for result in results:
         if result is None:
             continue
-        
         # Terminal rule (e.g., NOT_REQUIRED)
         if result.terminal:
             return {
-                "visa_id": visa["id"],
-                "product_id": product["id"],
+                "visa_id": visa_id,
+                "product_id": product_id,
                 "status": result.status,
                 "reasons": result.reasons,
                 "missing": result.missing
             }
-        
-        # Merge results
-        reasons.extend(result.reasons)
-        missing.extend(result.missing)
-        
-        # Status priority: RED > UNKNOWN > YELLOW > GREEN
-        if result.status == "RED":
-            status = "RED"
-        elif result.status == "UNKNOWN" and status not in ("RED",):
-            status = "UNKNOWN"
-        elif result.status == "YELLOW" and status == "GREEN":
-            status = "YELLOW"
-    
+        status = merge(status, result, reasons, missing)
     # Final check: missing evidence means UNKNOWN
     if status == "GREEN" and missing:
         status = "UNKNOWN"
-    
     return {
-        "visa_id": visa["id"],
-        "product_id": product["id"],
+        "visa_id": visa_id,
+        "product_id": product_id,
         "status": status,
         "reasons": reasons,
         "missing": missing
     }
+
+
+def compile_visa(visa: dict, generate: bool = True) -> VisaPlan:
+    """Compile a visa into a plan of the rules that apply to it.
+
+    With generate, plan.evaluate is one generated function for the visa,
+    which pays off from a few dozen products. Profiling keeps the per-rule
+    loop so every check can be timed.
+    """
+    reqs = index_requirements(visa)
+    inst = instrumentation.ACTIVE
+    checks = []
+    for rule in RULES:
+        bound = rule.bind(visa, reqs)
+        if inst is not None:
+            inst.record_bind(rule, bound is not None)
+            if bound is not None:
+                bound = inst.wrap(rule, bound)
+        if bound is not None:
+            checks.append((rule, bound))
+    evaluator = compile_evaluator(visa, reqs, RULES, merge) if generate and inst is None else None
+    return VisaPlan(visa, checks, evaluator)
+
+
+def evaluate(visa: dict, product: dict) -> dict:
+    """Evaluate visa/product compliance using all rules."""
+    return compile_visa(visa, generate=False).evaluate(product)
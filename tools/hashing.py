@@ -0,0 +1,113 @@
+"""Shared SHA-256 service: streaming, memoized and thread-pooled.
+
+Files are hashed in fixed-size chunks, so memory stays flat for large PDFs.
+Digests are memoized per (path, size, mtime_ns, mode) for the life of the
+process, so a file referenced many times is read once. digest_many() hashes
+on a thread pool; hashlib releases the GIL while it hashes a chunk.
+"""
+import codecs
+import hashlib
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, Union
+
+CHUNK_SIZE = 1 << 20
+
+# Sources hashed as text with normalized line endings (see sha256_text)
+TEXT_SUFFIXES = {".md", ".txt", ".json"}
+
+
+def sha256_file(path: Path) -> str:
+    """SHA-256 of the file's bytes, read in chunks."""
+    digest = hashlib.sha256()
+    buffer = bytearray(CHUNK_SIZE)
+    view = memoryview(buffer)
+    with open(path, "rb", buffering=0) as fh:
+        while True:
+            n = fh.readinto(buffer)
+            if not n:
+                break
+            digest.update(view[:n])
+    return digest.hexdigest()
+
+
+def sha256_text(path: Path) -> str:
+    """SHA-256 of the file decoded as UTF-8 (invalid bytes replaced), CRLF/CR -> LF.
+
+    Streams the same digest as hashing
+    read_text(errors="replace").replace("\\r\\n", "\\n").replace("\\r", "\\n").encode().
+    """
+    digest = hashlib.sha256()
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    pending_cr = False
+    with open(path, "rb") as fh:
+        while True:
+            chunk = fh.read(CHUNK_SIZE)
+            text = decoder.decode(chunk, final=not chunk)
+            if pending_cr:
+                text = "\r" + text
+            # Hold back a trailing CR: the next chunk may start with its LF
+            pending_cr = bool(chunk) and text.endswith("\r")
+            if pending_cr:
+                text = text[:-1]
+            digest.update(text.replace("\r\n", "\n").replace("\r", "\n").encode("utf-8"))
+            if not chunk:
+                break
+    return digest.hexdigest()
+
+
+def source_digest(path: Path) -> str:
+    """Digest used for source files: text-normalized for TEXT_SUFFIXES, raw bytes otherwise."""
+    if path.suffix.lower() in TEXT_SUFFIXES:
+        return sha256_text(path)
+    return sha256_file(path)
+
+
+class HashService:
+    """Memoized digests with a thread pool for batches."""
+
+    def __init__(self, workers: int = 0):
+        self.workers = workers or min(32, (os.cpu_count() or 1) + 4)
+        self._memo: Dict[tuple, str] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, path: Path, text: bool) -> tuple:
+        stat = path.stat()
+        return (str(path.resolve()), stat.st_size, stat.st_mtime_ns, text)
+
+    def digest(self, path: Union[str, Path], text: bool = False) -> str:
+        """Digest of one file. text=True applies source_digest's text rules."""
+        path = Path(path)
+        key = self._key(path, text)
+        with self._lock:
+            cached = self._memo.get(key)
+        if cached is not None:
+            return cached
+        value = source_digest(path) if text else sha256_file(path)
+        with self._lock:
+            self._memo[key] = value
+        return value
+
+    def digest_many(self, paths: Iterable[Union[str, Path]], text: bool = False) -> Dict[Path, Union[str, Exception]]:
+        """Digest every path in parallel; unique files are hashed once.
+
+        Returns path -> digest, or the exception raised for that path.
+        """
+        unique = list(dict.fromkeys(Path(p) for p in paths))
+
+        def one(path):
+            try:
+                return self.digest(path, text)
+            except Exception as e:  # reported per path, like a failed read
+                return e
+
+        if len(unique) <= 1 or self.workers <= 1:
+            return {path: one(path) for path in unique}
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            return dict(zip(unique, pool.map(one, unique)))
+
+
+# Process-wide service shared by the tools
+HASHES = HashService()
@@ -0,0 +1,129 @@
+"""Interned ui_index format: evidence and excerpts stored once, referenced by id.
+
+Mapping evidence repeats the same visa excerpts for every product. The
+interned form moves each distinct evidence record into evidence_table and
+each distinct excerpt string into excerpt_table; reasons[].evidence then
+holds integer ids. expand_index() restores the denormalized form exactly.
+
+load_manifest() and load_shard() read the sharded build: current.json
+names the manifest, and the manifest names each shard.
+"""
+import copy
+import json
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+FORMAT = "interned"
+COMPACT_SEPARATORS = (",", ":")
+
+
+def dumps(payload) -> str:
+    """Serialise an index payload without pretty-printing whitespace."""
+    return json.dumps(payload, separators=COMPACT_SEPARATORS)
+
+
+class _Interner:
+    def __init__(self):
+        self.evidence_table: List[dict] = []
+        self.excerpt_table: List[str] = []
+        self._evidence_ids: Dict[str, int] = {}
+        self._excerpt_ids: Dict[str, int] = {}
+
+    def excerpt(self, text: str) -> int:
+        eid = self._excerpt_ids.get(text)
+        if eid is None:
+            eid = self._excerpt_ids[text] = len(self.excerpt_table)
+            self.excerpt_table.append(text)
+        return eid
+
+    def evidence(self, ev: dict) -> int:
+        key = json.dumps(ev, sort_keys=True)
+        eid = self._evidence_ids.get(key)
+        if eid is None:
+            record = dict(ev)
+            if isinstance(record.get("excerpt"), str):
+                record["excerpt"] = self.excerpt(record["excerpt"])
+            eid = self._evidence_ids[key] = len(self.evidence_table)
+            self.evidence_table.append(record)
+        return eid
+
+
+def intern_mappings(mappings: List[dict]) -> Tuple[List[dict], List[dict], List[str]]:
+    """Return (mappings with evidence ids, evidence_table, excerpt_table)."""
+    interner = _Interner()
+    out = []
+    for m in mappings:
+        m = dict(m)
+        if m.get("reasons"):
+            reasons = []
+            for reason in m["reasons"]:
+                reason = dict(reason)
+                if isinstance(reason.get("evidence"), list):
+                    reason["evidence"] = [interner.evidence(ev) for ev in reason["evidence"]]
+                reasons.append(reason)
+            m["reasons"] = reasons
+        out.append(m)
+    return out, interner.evidence_table, interner.excerpt_table
+
+
+def expand_mappings(mappings: List[dict], evidence_table: List[dict], excerpt_table: List[str]) -> List[dict]:
+    """Inverse of intern_mappings()."""
+    evidence = []
+    for record in evidence_table:
+        record = dict(record)
+        if isinstance(record.get("excerpt"), int):
+            record["excerpt"] = excerpt_table[record["excerpt"]]
+        evidence.append(record)
+
+    out = []
+    for m in mappings:
+        m = dict(m)
+        if m.get("reasons"):
+            reasons = []
+            for reason in m["reasons"]:
+                reason = dict(reason)
+                if isinstance(reason.get("evidence"), list):
+                    reason["evidence"] = [
+                        copy.deepcopy(evidence[ev]) if isinstance(ev, int) else ev
+                        for ev in reason["evidence"]
+                    ]
+                reasons.append(reason)
+            m["reasons"] = reasons
+        out.append(m)
+    return out
+
+
+def intern_index(index: dict) -> dict:
+    """Interned copy of a denormalized ui_index payload."""
+    mappings, evidence_table, excerpt_table = intern_mappings(index["mappings"])
+    out = {"format": FORMAT}
+    out.update(index)
+    out["mappings"] = mappings
+    out["evidence_table"] = evidence_table
+    out["excerpt_table"] = excerpt_table
+    return out
+
+
+def expand_index(index: dict) -> dict:
+    """Denormalized copy of an index. Indexes without format are returned as-is."""
+    if index.get("format") != FORMAT:
+        return index
+    out = {k: v for k, v in index.items() if k not in ("format", "evidence_table", "excerpt_table")}
+    out["mappings"] = expand_mappings(index["mappings"], index["evidence_table"], index["excerpt_table"])
+    return out
+
+
+def load_manifest(shards: Path) -> dict:
+    """The manifest current.json names in a sharded build directory."""
+    pointer = shards / "current.json"
+    if not pointer.exists():
+        raise SystemExit(f"Missing {pointer}. Run py tools/build_index.py first.")
+    rel = json.loads(pointer.read_text(encoding="utf-8"))["manifest"]
+    return json.loads((shards / rel).read_text(encoding="utf-8"))
+
+
+def load_shard(shards: Path, rel: Optional[str], what: str):
+    """A shard the manifest names; rel is None when the build has no such shard."""
+    if not rel:
+        raise SystemExit(f"The current index has no {what}. Run py tools/build_index.py.")
+    return json.loads((shards / rel).read_text(encoding="utf-8"))
@@ -0,0 +1,151 @@
+"""Opt-in per-rule profiling for the evaluation engine.
+
+When enabled, compile_visa() and Rule.check() wrap each bound rule in a
+timing closure that records calls, time spent and outcomes. When disabled
+(the default) plans hold the unwrapped closures, so evaluation pays nothing.
+
+    from tools import instrumentation
+    stats = instrumentation.enable()
+    ...evaluate...
+    print(stats.to_prometheus())
+"""
+import json
+import time
+from typing import Callable, Dict, Optional
+
+# Outcome label for a rule that returned None (product passes the rule)
+PASS = "PASS"
+
+
+class RuleStats:
+    """Counters for one rule."""
+
+    def __init__(self):
+        self.binds = 0  # visas the rule applied to
+        self.skipped_binds = 0  # visas the rule did not apply to
+        self.calls = 0
+        self.seconds = 0.0
+        self.outcomes: Dict[str, int] = {}
+        self.terminal = 0  # results that ended evaluation early
+
+    def record(self, seconds: float, result) -> None:
+        self.calls += 1
+        self.seconds += seconds
+        outcome = PASS if result is None else result.status
+        self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+        if result is not None and result.terminal:
+            self.terminal += 1
+
+    def to_dict(self) -> dict:
+        return {
+            "binds": self.binds,
+            "skipped_binds": self.skipped_binds,
+            "calls": self.calls,
+            "seconds": self.seconds,
+            "mean_us": (self.seconds / self.calls * 1e6) if self.calls else 0.0,
+            "outcomes": dict(sorted(self.outcomes.items())),
+            "terminal": self.terminal,
+        }
+
+
+class Instrumentation:
+    """Per-rule statistics, keyed by Rule.name."""
+
+    def __init__(self):
+        self.rules: Dict[str, RuleStats] = {}
+
+    def stats(self, rule) -> RuleStats:
+        stats = self.rules.get(rule.name)
+        if stats is None:
+            stats = self.rules[rule.name] = RuleStats()
+        return stats
+
+    def record_bind(self, rule, applies: bool) -> None:
+        stats = self.stats(rule)
+        if applies:
+            stats.binds += 1
+        else:
+            stats.skipped_binds += 1
+
+    def wrap(self, rule, bound: Callable) -> Callable:
+        """Bound check that records each call against rule."""
+        stats = self.stats(rule)
+        clock = time.perf_counter
+
+        def timed(product):
+            start = clock()
+            result = bound(product)
+            stats.record(clock() - start, result)
+            return result
+
+        return timed
+
+    def record_columns(self, rule, seconds: float, rows: int, outcomes: Dict[str, int], terminal: int) -> None:
+        """Record one columnar bind_columns() pass over rows products."""
+        stats = self.stats(rule)
+        stats.calls += rows
+        stats.seconds += seconds
+        for outcome, count in outcomes.items():
+            stats.outcomes[outcome] = stats.outcomes.get(outcome, 0) + count
+        stats.terminal += terminal
+
+    def reset(self) -> None:
+        self.rules.clear()
+
+    def to_dict(self) -> dict:
+        return {name: stats.to_dict() for name, stats in self.rules.items()}
+
+    def to_json(self) -> str:
+        return json.dumps({"rules": self.to_dict()}, indent=2)
+
+    def to_prometheus(self) -> str:
+        """Prometheus text exposition format."""
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                label_text = ",".join(f'{k}="{v}"' for k, v in labels)
+                lines.append(f"{name}{{{label_text}}} {value}")
+
+        rules = sorted(self.rules.items())
+        binds = []
+        for name, stats in rules:
+            binds.append(((("rule", name), ("applies", "true")), stats.binds))
+            binds.append(((("rule", name), ("applies", "false")), stats.skipped_binds))
+        metric("visafact_rule_binds_total", "counter", "Visas each rule was bound to, by whether it applied.", binds)
+        metric("visafact_rule_calls_total", "counter", "Products checked by each rule.",
+               [((("rule", name),), stats.calls) for name, stats in rules])
+        metric("visafact_rule_seconds_total", "counter", "Time spent in each rule.",
+               [((("rule", name),), repr(stats.seconds)) for name, stats in rules])
+        metric("visafact_rule_outcomes_total", "counter", "Rule results by outcome (PASS means no finding).", [
+            ((("rule", name), ("outcome", outcome)), count)
+            for name, stats in rules for outcome, count in sorted(stats.outcomes.items())
+        ])
+        metric("visafact_rule_terminal_total", "counter", "Results that ended evaluation before later rules ran.",
+               [((("rule", name),), stats.terminal) for name, stats in rules])
+        return "\n".join(lines) + "\n"
+
+    def write(self, path) -> None:
+        """Write to path as Prometheus text for *.prom, JSON otherwise."""
+        text = self.to_prometheus() if str(path).endswith(".prom") else self.to_json()
+        with open(path, "w", encoding="utf-8") as fh:
+            fh.write(text)
+
+
+# The active collector, or None when instrumentation is off
+ACTIVE: Optional[Instrumentation] = None
+
+
+def enable() -> Instrumentation:
+    """Turn instrumentation on for plans compiled from now on."""
+    global ACTIVE
+    if ACTIVE is None:
+        ACTIVE = Instrumentation()
+    return ACTIVE
+
+
+def disable() -> None:
+    global ACTIVE
+    ACTIVE = None
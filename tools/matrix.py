@@ -0,0 +1,199 @@
+"""Columnar batch evaluation of the visa x product matrix.
+
+Product specs are loaded once into NumPy columns. Each rule's
+bind_columns() computes its status masks for every product at once, and
+the status-priority merge of engine.merge() becomes an array
+reduction. Output matches tools.engine.evaluate() exactly.
+"""
+import time
+from typing import Callable, List
+
+import numpy as np
+
+from tools import instrumentation
+from tools.engine import RULES
+from tools.rules.base import STATUS_RANK, index_requirements, is_number, spec_at
+
+RANKED_STATUSES = sorted(STATUS_RANK, key=STATUS_RANK.get)
+
+# Tri-state codes for boolean spec columns (OTHER: present, not a bool)
+MISSING, FALSE, TRUE, OTHER = -1, 0, 1, 2
+
+
+class NumberColumn:
+    """Numeric spec column with a presence mask for missing values."""
+
+    def __init__(self, values: np.ndarray, present: np.ndarray):
+        self.values = values
+        self.present = present
+
+
+class ProductColumns:
+    """Product specs loaded lazily into columns, one per spec path."""
+
+    def __init__(self, products: list):
+        self.products = list(products)
+        self.size = len(self.products)
+        self._raw = {}
+        self._columns = {}
+
+    def raw(self, parts: tuple) -> list:
+        """Spec values as Python objects (None when missing)."""
+        col = self._raw.get(parts)
+        if col is None:
+            col = [spec_at(product, parts) for product in self.products]
+            self._raw[parts] = col
+        return col
+
+    def _column(self, kind: str, parts: tuple, build: Callable[[list], object]):
+        key = (kind, parts)
+        col = self._columns.get(key)
+        if col is None:
+            col = build(self.raw(parts))
+            self._columns[key] = col
+        return col
+
+    def tristate(self, parts: tuple) -> np.ndarray:
+        """Boolean spec column as MISSING/FALSE/TRUE/OTHER codes."""
+        def build(raw):
+            codes = [
+                MISSING if v is None else TRUE if v is True else FALSE if v is False else OTHER
+                for v in raw
+            ]
+            return np.array(codes, dtype=np.int8)
+        return self._column("tristate", parts, build)
+
+    def number(self, parts: tuple) -> NumberColumn:
+        """Numeric spec column. A non-numeric value is not present, as in the scalar rules."""
+        def build(raw):
+            present = np.array([is_number(v) for v in raw], dtype=bool)
+            values = np.zeros(self.size, dtype=np.float64)
+            for row in np.flatnonzero(present):
+                values[row] = raw[row]
+            return NumberColumn(values, present)
+        return self._column("number", parts, build)
+
+    def missing(self, parts: tuple) -> np.ndarray:
+        return self.tristate(parts) == MISSING
+
+    def is_true(self, parts: tuple) -> np.ndarray:
+        return self.tristate(parts) == TRUE
+
+    def is_false(self, parts: tuple) -> np.ndarray:
+        return self.tristate(parts) == FALSE
+
+    def matches(self, parts: tuple, predicate: Callable[[object], bool]) -> np.ndarray:
+        """Mask of rows whose present value satisfies predicate.
+
+        The predicate runs once per distinct value, not once per row.
+        """
+        raw = self.raw(parts)
+        seen = {}
+        mask = np.zeros(self.size, dtype=bool)
+        for row, v in enumerate(raw):
+            if v is None:
+                continue
+            try:
+                key = (type(v), v)
+                hit = seen.get(key)
+                if hit is None:
+                    hit = seen[key] = bool(predicate(v))
+            except TypeError:  # unhashable value
+                hit = bool(predicate(v))
+            mask[row] = hit
+        return mask
+
+    def all(self) -> np.ndarray:
+        return np.ones(self.size, dtype=bool)
+
+    def rows(self, rows: List[int]) -> np.ndarray:
+        mask = np.zeros(self.size, dtype=bool)
+        mask[list(rows)] = True
+        return mask
+
+
+def _record_rule(inst, rule, seconds: float, terminated: np.ndarray, hits: list) -> None:
+    """Report one rule's pass to instrumentation with the counts VisaPlan would record."""
+    # Rows already ended by a terminal rule are not checked, as in VisaPlan
+    rows = int((~terminated).sum())
+    counts = {}
+    for mask, outcome in hits:
+        counts[outcome.status] = counts.get(outcome.status, 0) + int(mask.sum())
+    passed = rows - sum(counts.values())
+    if passed:
+        counts[instrumentation.PASS] = passed
+    ended = sum(int(mask.sum()) for mask, outcome in hits if outcome.terminal)
+    inst.record_columns(rule, seconds, rows, counts, ended)
+
+
+def evaluate_columns(visa: dict, cols: ProductColumns) -> List[dict]:
+    """Evaluate every product in cols against one visa."""
+    reqs = index_requirements(visa)
+    rank = np.zeros(cols.size, dtype=np.int8)
+    terminated = np.zeros(cols.size, dtype=bool)
+    terminal = {}  # row -> terminal RuleResult
+    flagged = []  # [(mask, outcome)] in rule order
+
+    inst = instrumentation.ACTIVE
+    for rule in RULES:
+        start = time.perf_counter() if inst is not None else 0.0
+        outcomes = rule.bind_columns(visa, reqs, cols)
+        if inst is not None:
+            inst.record_bind(rule, outcomes is not None)
+        if not outcomes:
+            continue
+        hits = []
+        for outcome in outcomes:
+            mask = outcome.mask & ~terminated
+            if mask.any():
+                hits.append((mask, outcome))
+        if inst is not None:
+            _record_rule(inst, rule, time.perf_counter() - start, terminated, hits)
+        for mask, outcome in hits:
+            if outcome.terminal:
+                # Terminal results replace everything gathered so far
+                for row in np.flatnonzero(mask):
+                    terminal[int(row)] = outcome.result(int(row))
+                terminated |= mask
+            else:
+                rank = np.where(mask, np.maximum(rank, STATUS_RANK.get(outcome.status, 0)), rank)
+                flagged.append((mask, outcome))
+
+    reasons = [[] for _ in range(cols.size)]
+    missing = [[] for _ in range(cols.size)]
+    for mask, outcome in flagged:
+        for row in np.flatnonzero(mask & ~terminated):
+            result = outcome.result(int(row))
+            reasons[row].extend(result.reasons)
+            missing[row].extend(result.missing)
+
+    out = []
+    for row, product in enumerate(cols.products):
+        if row in terminal:
+            result = terminal[row]
+            out.append({
+                "visa_id": visa["id"],
+                "product_id": product["id"],
+                "status": result.status,
+                "reasons": result.reasons,
+                "missing": result.missing
+            })
+            continue
+        status = RANKED_STATUSES[rank[row]]
+        # Final check: missing evidence means UNKNOWN
+        if status == "GREEN" and missing[row]:
+            status = "UNKNOWN"
+        out.append({
+            "visa_id": visa["id"],
+            "product_id": product["id"],
+            "status": status,
+            "reasons": reasons[row],
+            "missing": missing[row]
+        })
+    return out
+
+
+def evaluate_matrix(visas: list, products: list) -> List[List[dict]]:
+    """Evaluate all visa/product pairs. Row i holds visa i against every product."""
+    cols = ProductColumns(products)
+    return [evaluate_columns(visa, cols) for visa in visas]
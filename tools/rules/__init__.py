@@ -1,29 +1,12 @@
 """Compliance rules package."""
-from tools.rules.mandatory import MandatoryInsuranceRule
-from tools.rules.travel_insurance import TravelInsuranceAcceptedRule
-from tools.rules.jurisdiction import AuthorizedInSpainRule
-from tools.rules.deductible import NoDeductibleRule
-from tools.rules.copayment import NoCopaymentRule
-from tools.rules.moratorium import NoMoratoriumRule
-from tools.rules.coverage import (
-    ComprehensiveCoverageRule,
-    CoversPublicHealthSystemRisksRule,
-    UnlimitedCoverageRule,
-    MinimumCoverageRule,
-)
-from tools.rules.payment import MonthlyPaymentsAcceptedRule, MustCoverFullPeriodRule
+from tools.rules.coverage import UnlimitedCoverageRule
+from tools.rules.table import RULE_TABLE, TABLE_BY_NAME, RuleSpec, TableRule, compile_evaluator
 
 __all__ = [
-    "MandatoryInsuranceRule",
-    "TravelInsuranceAcceptedRule",
-    "AuthorizedInSpainRule",
-    "NoDeductibleRule",
-    "NoCopaymentRule",
-    "NoMoratoriumRule",
-    "ComprehensiveCoverageRule",
-    "CoversPublicHealthSystemRisksRule",
     "UnlimitedCoverageRule",
-    "MinimumCoverageRule",
-    "MonthlyPaymentsAcceptedRule",
-    "MustCoverFullPeriodRule",
+    "RULE_TABLE",
+    "TABLE_BY_NAME",
+    "RuleSpec",
+    "TableRule",
+    "compile_evaluator",
 ]
@@ -1,11 +1,30 @@
 """Base classes and utilities for compliance rules."""
 from abc import ABC, abstractmethod
-from typing import Any, Optional, List, Dict
+from typing import Any, Callable, Optional, List, Dict, Tuple
+
+from tools import instrumentation
+
+# A rule pre-bound to one visa: takes a product, returns a result or None.
+BoundCheck = Callable[[dict], Optional["RuleResult"]]
+
+# Trigger value meaning "active whenever the requirement is present".
+ANY_VALUE = object()
+
+# Types a numeric comparison accepts; any other value cannot be compared.
+NUMBER = (int, float)
+
+# Constraint ops for a rule no spec change can satisfy (see Constraint).
+NOT_REQUIRED_OP = "not_required"
+UNREACHABLE_OP = "unreachable"
+
+# Status priority: RED > UNKNOWN > YELLOW > GREEN. A rule result raises the
+# mapping's status only to a higher rank; other statuses never change it.
+STATUS_RANK = {"GREEN": 0, "YELLOW": 1, "UNKNOWN": 2, "RED": 3}
 
 
 class RuleResult:
     """Structured result from a rule check."""
-    
+
     def __init__(
         self,
         status: str = "GREEN",
@@ -19,22 +38,158 @@ class RuleResult:
         self.terminal = terminal  # If True, stop processing other rules
 
 
+class ColumnOutcome:
+    """Vectorized counterpart of RuleResult, for the rows selected by mask."""
+
+    def __init__(
+        self,
+        status: str,
+        mask: Any,
+        result: Callable[[int], RuleResult],
+        terminal: bool = False
+    ):
+        self.status = status
+        self.mask = mask  # Boolean array, one entry per product row
+        self.result = result  # Builds the row's RuleResult (reasons, missing)
+        self.terminal = terminal
+
+
+class Constraint:
+    """What a product must satisfy for one rule to pass, and the change that satisfies it.
+
+    holds(product) is True when the rule returns no result for the product.
+    The change sets field to target (op "set") or raises it to at least
+    target (op "at_least"). reads lists the spec paths holds() looks at. A
+    field of None means no spec change can satisfy the rule; op then says
+    why: NOT_REQUIRED_OP when the rule ends evaluation because the visa
+    does not require insurance, UNREACHABLE_OP otherwise (for example a
+    requirement value the rule cannot compare).
+    """
+
+    def __init__(
+        self,
+        rule: "Rule",
+        field: Optional[str],
+        op: str,
+        target: Any,
+        holds: Callable[[dict], bool],
+        reads: Optional[List[Tuple[str, ...]]] = None
+    ):
+        self.rule = rule.name
+        self.field = field
+        self.op = op
+        self.target = target
+        self.holds = holds
+        self.reads = reads if reads is not None else ([spec_path(field)] if field else [])
+
+    @property
+    def key(self) -> tuple:
+        """Identical keys describe the same condition, whichever visa they came from."""
+        return (self.rule, self.field, self.op, repr(self.target))
+
+    def missing(self, product: dict) -> bool:
+        """True when the product has none of the fields this constraint reads."""
+        return all(spec_at(product, parts) is None for parts in self.reads)
+
+
 class Rule(ABC):
     """Base class for compliance rules."""
-    
+
     # Human-readable name for audit logs
     name: str = "BaseRule"
-    
+
+    # Requirement key this rule reads and the value that activates it
+    requirement: str = ""
+    trigger: Any = True
+
+    def active_req(self, reqs: Dict[str, dict]) -> Optional[dict]:
+        """Return the requirement record if it activates this rule."""
+        req = reqs.get(self.requirement)
+        if not req:
+            return None
+        if self.trigger is not ANY_VALUE and req["value"] is not self.trigger:
+            return None
+        return req
+
     @abstractmethod
+    def bind(self, visa: dict, reqs: Dict[str, dict]) -> Optional[BoundCheck]:
+        """
+        Pre-bind this rule to a visa.
+
+        Args:
+            visa: Visa facts.
+            reqs: Visa requirements indexed by key (see index_requirements).
+
+        Returns:
+            None if rule doesn't apply to this visa (requirement not present).
+            Otherwise a callable taking a product and returning None (pass)
+            or a RuleResult with status, reasons, missing fields.
+        """
+        pass
+
     def check(self, visa: dict, product: dict) -> Optional[RuleResult]:
         """
         Check if visa/product combination passes this rule.
-        
+
         Returns:
             None if rule doesn't apply (requirement not present).
             RuleResult with status, reasons, missing fields.
         """
-        pass
+        bound = self.bind(visa, index_requirements(visa))
+        inst = instrumentation.ACTIVE
+        if inst is not None:
+            inst.record_bind(self, bound is not None)
+            if bound is not None:
+                bound = inst.wrap(self, bound)
+        if bound is None:
+            return None
+        return bound(product)
+
+    def constraints(self, visa: dict, reqs: Dict[str, dict]) -> Optional[List[Constraint]]:
+        """
+        Constraint form of bind(), for explaining what would flip a verdict.
+
+        Returns:
+            None if rule doesn't apply to this visa.
+            Otherwise Constraints that all hold exactly when the bound
+            check passes.
+        """
+        raise NotImplementedError(f"{self.name} has no constraint form")
+
+    def reads(self, visa: dict, reqs: Dict[str, dict]) -> List[Tuple[str, ...]]:
+        """Spec paths the bound check reads, taken from its constraint form."""
+        found = self.constraints(visa, reqs) or []
+        return list(dict.fromkeys(parts for constraint in found for parts in constraint.reads))
+
+    def bind_columns(self, visa: dict, reqs: Dict[str, dict], cols: Any) -> Optional[List[ColumnOutcome]]:
+        """
+        Vectorized counterpart of bind() over a ProductColumns batch.
+
+        Returns:
+            None if rule doesn't apply to this visa.
+            Otherwise ColumnOutcomes with mutually exclusive masks; rows in
+            no mask pass. The default runs the bound check row by row.
+        """
+        bound = self.bind(visa, reqs)
+        if bound is None:
+            return None
+        results = [bound(product) for product in cols.products]
+        groups = {}
+        for row, result in enumerate(results):
+            if result is not None:
+                groups.setdefault((result.status, result.terminal), []).append(row)
+        return [
+            ColumnOutcome(status, cols.rows(rows), results.__getitem__, terminal)
+            for (status, terminal), rows in groups.items()
+        ]
+
+
+def index_requirements(visa: dict) -> Dict[str, dict]:
+    """Index visa requirements by key. First occurrence wins, as in get_req."""
+    reqs = {}
+    for r in visa.get("requirements", []):
+        reqs.setdefault(r["key"], r)
+    return reqs
 
 
 def get_req(visa: dict, key: str) -> Optional[dict]:
@@ -45,11 +200,26 @@ def get_req(visa: dict, key: str) -> Optional[dict]:
     return None
 
 
-def product_spec(product: dict, path: str) -> Any:
-    """Navigate nested product specs by dot-separated path."""
+def spec_path(path: str) -> Tuple[str, ...]:
+    """Tokenise a dot-separated product spec path."""
+    return tuple(path.split("."))
+
+
+def spec_at(product: dict, parts: Tuple[str, ...]) -> Any:
+    """Navigate nested product specs by a pre-tokenised path."""
     cur = product.get("specs")
-    for p in path.split("."):
+    for p in parts:
         if cur is None or not isinstance(cur, dict) or p not in cur:
             return None
         cur = cur[p]
     return cur
+
+
+def is_number(value: Any) -> bool:
+    """True when value can take part in a numeric rule check."""
+    return isinstance(value, NUMBER)
+
+
+def product_spec(product: dict, path: str) -> Any:
+    """Navigate nested product specs by dot-separated path."""
+    return spec_at(product, spec_path(path))
@@ -1,116 +1,94 @@
-"""Coverage-related rules."""
-from tools.rules.base import Rule, RuleResult, get_req, product_spec
-
-
-class ComprehensiveCoverageRule(Rule):
-    """Check if comprehensive coverage is required and provided."""
-    
-    name = "ComprehensiveCoverage"
-    
-    def check(self, visa, product):
-        req = get_req(visa, "insurance.comprehensive")
-        if not req or req["value"] is not True:
-            return None
-        
-        comprehensive = product_spec(product, "comprehensive")
-        if comprehensive is None:
-            return RuleResult(
-                status="UNKNOWN",
-                missing=["specs.comprehensive"]
-            )
-        if comprehensive is False:
-            return RuleResult(
-                status="RED",
-                reasons=[{
-                    "text": "Comprehensive coverage required",
-                    "evidence": req["evidence"]
-                }]
-            )
-        return None
-
-
-class CoversPublicHealthSystemRisksRule(Rule):
-    """Check if product covers risks insured by public health system."""
-    
-    name = "CoversPublicHealthSystemRisks"
-    
-    def check(self, visa, product):
-        req = get_req(visa, "insurance.covers_public_health_system_risks")
-        if not req or req["value"] is not True:
-            return None
-        
-        covers = product_spec(product, "covers_public_health_system_risks")
-        if covers is None:
-            return RuleResult(
-                status="UNKNOWN",
-                missing=["specs.covers_public_health_system_risks"]
-            )
-        if covers is False:
-            return RuleResult(
-                status="RED",
-                reasons=[{
-                    "text": "Visa requires coverage of public health system risks",
-                    "evidence": req["evidence"]
-                }]
-            )
-        return None
+"""Rule: Check unlimited coverage.
+
+It reads two spec paths (unlimited, overall_limit), so it is a class
+rather than a row in table.py.
+"""
+from tools.rules.base import ColumnOutcome, Constraint, Rule, RuleResult, is_number, spec_at, spec_path
+
+OVERALL_LIMIT = spec_path("overall_limit")
+UNLIMITED = spec_path("unlimited")
+
+# Limits at or above this are treated as unlimited
+UNLIMITED_THRESHOLD = 10000000
+
+
+def _unknown(*missing):
+    return RuleResult(
+        status="UNKNOWN",
+        missing=list(missing)
+    )
+
+
+def _red_not_unlimited(req, limit):
+    return RuleResult(
+        status="RED",
+        reasons=[{
+            "text": f"Unlimited coverage required, product has limit of {limit}",
+            "evidence": req["evidence"]
+        }]
+    )
 
 
 class UnlimitedCoverageRule(Rule):
     """Check if unlimited coverage is required."""
-    
+
     name = "UnlimitedCoverage"
-    
-    def check(self, visa, product):
-        req = get_req(visa, "insurance.unlimited_coverage")
-        if not req or req["value"] is not True:
+    requirement = "insurance.unlimited_coverage"
+
+    def bind(self, visa, reqs):
+        req = self.active_req(reqs)
+        if req is None:
             return None
-        
-        limit = product_spec(product, "overall_limit")
-        unlimited = product_spec(product, "unlimited")
-        
-        if unlimited is True:
+
+        def check(product):
+            limit = spec_at(product, OVERALL_LIMIT)
+            unlimited = spec_at(product, UNLIMITED)
+
+            if unlimited is True:
+                return None
+            # A limit that is not a number says nothing about the cover
+            number = limit if is_number(limit) else None
+
+            if number is None and unlimited is None:
+                return _unknown("specs.overall_limit or specs.unlimited")
+
+            if unlimited is False or (number is not None and number < UNLIMITED_THRESHOLD):
+                return _red_not_unlimited(req, limit)
             return None
-        
-        if limit is None and unlimited is None:
-            return RuleResult(
-                status="UNKNOWN",
-                missing=["specs.overall_limit or specs.unlimited"]
-            )
-        
-        if unlimited is False or (limit is not None and limit < 10000000):
-            return RuleResult(
-                status="RED",
-                reasons=[{
-                    "text": f"Unlimited coverage required, product has limit of {limit}",
-                    "evidence": req["evidence"]
-                }]
-            )
-        return None
-
-
-class MinimumCoverageRule(Rule):
-    """Check if minimum coverage requirement is met."""
-    
-    name = "MinimumCoverage"
-    
-    def check(self, visa, product):
-        req = get_req(visa, "insurance.min_coverage")
-        if not req:
+
+        return check
+
+    def constraints(self, visa, reqs):
+        if self.active_req(reqs) is None:
             return None
-        
-        limit = product_spec(product, "overall_limit")
-        if limit is None:
-            return RuleResult(
-                status="UNKNOWN",
-                missing=["specs.overall_limit"]
-            )
-        if limit < req["value"]:
-            return RuleResult(
-                status="RED",
-                reasons=[{
-                    "text": f"Minimum coverage {req['value']} required, product has {limit}",
-                    "evidence": req["evidence"]
-                }]
-            )
-        return None
+
+        def holds(product):
+            # The same branches as the bound check
+            unlimited = spec_at(product, UNLIMITED)
+            if unlimited is True:
+                return True
+            limit = spec_at(product, OVERALL_LIMIT)
+            number = limit if is_number(limit) else None
+            if number is None and unlimited is None:
+                return False
+            return not (unlimited is False or (number is not None and number < UNLIMITED_THRESHOLD))
+
+        # Declaring the cover unlimited passes whatever the stated limit
+        return [Constraint(self, "unlimited", "set", True, holds, reads=[UNLIMITED, OVERALL_LIMIT])]
+
+    def bind_columns(self, visa, reqs, cols):
+        req = self.active_req(reqs)
+        if req is None:
+            return None
+
+        limit = cols.number(OVERALL_LIMIT)
+        raw = cols.raw(OVERALL_LIMIT)
+        limited = ~cols.is_true(UNLIMITED)
+        unknown = limited & ~limit.present & cols.missing(UNLIMITED)
+        red = limited & ~unknown & (
+            cols.is_false(UNLIMITED) | (limit.present & (limit.values < UNLIMITED_THRESHOLD))
+        )
+        return [
+            ColumnOutcome("UNKNOWN", unknown, lambda row: _unknown("specs.overall_limit or specs.unlimited")),
+            ColumnOutcome("RED", red, lambda row: _red_not_unlimited(req, raw[row])),
+        ]
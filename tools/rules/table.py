@@ -0,0 +1,574 @@
+"""Declarative rule table and the evaluator generated from it.
+
+Most rules read one product spec path and follow the same shape: no
+requirement -> not applicable, missing value -> UNKNOWN, failing value ->
+RED (or YELLOW, or a terminal status) with a reason. Such a rule is one
+RuleSpec row in RULE_TABLE, and TableRule gives it the full Rule
+interface: bind, constraints and bind_columns.
+
+compile_evaluator() turns a visa's bound rules into one generated Python
+function: spec paths are read once with inline dict lookups, each table
+rule is an if/elif on the value, and nothing is allocated for a rule the
+product passes. Rules the table cannot express (see coverage.py) stay
+classes; the generated code calls their bound check.
+"""
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from tools.authorizations import JURISDICTION_NAMES
+from tools.rules.base import ANY_VALUE, NOT_REQUIRED_OP, NUMBER, STATUS_RANK, UNREACHABLE_OP, ColumnOutcome, Constraint, Rule, RuleResult, is_number, spec_at, spec_path
+
+MONTHLY_CADENCES = ["monthly", "every_4_weeks"]
+
+
+class Comparator:
+    """How a table rule decides that a present value fails.
+
+    code is a Python expression over {value} and {arg} for the generated
+    evaluator; test(value, arg) is the same check for bound closures and
+    constraints; mask(cols, parts, arg) is its ProductColumns form.
+    A numeric comparator only compares numbers: a value that is not one
+    counts as missing, and an arg that is not one leaves the rule UNKNOWN
+    for every product.
+    """
+
+    def __init__(
+        self,
+        code: str,
+        test: Callable[[Any, Any], bool],
+        mask: Callable[[Any, tuple, Any], Any],
+        numeric: bool = False,
+        numeric_arg: bool = False,
+    ):
+        self.code = code
+        self.test = test
+        self.mask = mask
+        self.numeric = numeric
+        self.numeric_arg = numeric_arg
+
+    def present(self, value: Any) -> bool:
+        """Whether value counts as present (not missing) for this comparator."""
+        return is_number(value) if self.numeric else value is not None
+
+    def comparable(self, arg: Any) -> bool:
+        return not self.numeric_arg or is_number(arg)
+
+    def missing_code(self, value: str) -> str:
+        """Generated-code form of `not present(value)`."""
+        return f"not isinstance({value}, NUMBER)" if self.numeric else f"{value} is None"
+
+    def present_code(self, value: str) -> str:
+        return f"isinstance({value}, NUMBER)" if self.numeric else f"{value} is not None"
+
+
+def _number_mask(compare):
+    def mask(cols, parts, arg):
+        column = cols.number(parts)
+        return column.present & compare(column.values, arg)
+    return mask
+
+
+COMPARATORS: Dict[str, Comparator] = {
+    "always": Comparator("True", lambda value, arg: True, lambda cols, parts, arg: cols.all()),
+    "positive": Comparator(
+        "{value} > 0",
+        lambda value, arg: value > 0,
+        _number_mask(lambda values, arg: values > 0),
+        numeric=True,
+    ),
+    "below": Comparator(
+        "{value} < {arg}",
+        lambda value, arg: value < arg,
+        _number_mask(lambda values, arg: values < arg),
+        numeric=True, numeric_arg=True,
+    ),
+    "is_true": Comparator("{value} is True", lambda value, arg: value is True, lambda cols, parts, arg: cols.is_true(parts)),
+    "is_false": Comparator("{value} is False", lambda value, arg: value is False, lambda cols, parts, arg: cols.is_false(parts)),
+    "one_of": Comparator(
+        "{value} in {arg}",
+        lambda value, arg: value in arg,
+        lambda cols, parts, arg: cols.matches(parts, lambda value: value in arg),
+    ),
+    "mentions": Comparator(
+        "{arg} in str({value}).lower()",
+        lambda value, arg: arg in str(value).lower(),
+        lambda cols, parts, arg: cols.matches(parts, lambda value: arg in str(value).lower()),
+    ),
+}
+
+# Marks a RuleSpec arg or fix target that is the requirement's own value
+REQUIREMENT_VALUE = object()
+
+
+class RuleSpec:
+    """One row of the rule table.
+
+    path may name a jurisdiction as {country}: the visa's own when
+    jurisdictions lists the ones the rule applies to, otherwise the
+    jurisdiction code given as the requirement's value. reason may use
+    {value} (the product's value), {requirement} (the visa's value) and
+    {jurisdiction} (the jurisdiction's name, by default the visa's
+    country). fix is the spec change that satisfies the rule as
+    (op, target), or None when none can.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        requirement: str,
+        path: Optional[str],
+        fails: str,
+        reason: str,
+        status: str = "RED",
+        trigger: Any = True,
+        arg: Any = None,
+        unknown_if_missing: bool = True,
+        terminal: bool = False,
+        fix: Optional[Tuple[str, Any]] = None,
+        jurisdictions: Tuple[str, ...] = (),
+    ):
+        if fails not in COMPARATORS:
+            raise ValueError(f"{name}: unknown comparator {fails}")
+        self.name = name
+        self.requirement = requirement
+        self.path = path
+        self.fails = fails
+        self.reason = reason
+        self.status = status
+        self.trigger = trigger
+        self.arg = arg
+        self.unknown_if_missing = unknown_if_missing
+        self.terminal = terminal
+        self.fix = fix
+        self.jurisdictions = jurisdictions
+
+
+RULE_TABLE: List[RuleSpec] = [
+    RuleSpec(
+        "MandatoryInsurance", "insurance.mandatory", None, "always",
+        "Visa does not require insurance",
+        status="NOT_REQUIRED", trigger=False, terminal=True,
+    ),
+    RuleSpec(
+        "TravelInsuranceAccepted", "insurance.travel_insurance_accepted", "type", "mentions",
+        "Travel insurance is not accepted for this visa",
+        trigger=False, arg="travel", fix=("set", "health insurance"),
+    ),
+    RuleSpec(
+        # The original Spain-only form of AuthorizedIn, kept for visas that state it
+        "AuthorizedInSpain", "insurance.authorized_in_spain", "jurisdiction_facts.{country}.authorized", "is_false",
+        "Insurer not authorized to operate in {jurisdiction}",
+        fix=("set", True), jurisdictions=("ES",),
+    ),
+    RuleSpec(
+        "AuthorizedIn", "insurance.authorized_in", "jurisdiction_facts.{country}.authorized", "is_false",
+        "Insurer not authorized to operate in {jurisdiction}",
+        trigger=ANY_VALUE, fix=("set", True),
+    ),
+    RuleSpec(
+        "NoDeductible", "insurance.no_deductible", "deductible.amount", "positive",
+        "Visa requires zero deductible but product has {value}",
+        fix=("set", 0),
+    ),
+    RuleSpec(
+        "ComprehensiveCoverage", "insurance.comprehensive", "comprehensive", "is_false",
+        "Comprehensive coverage required",
+        fix=("set", True),
+    ),
+    RuleSpec(
+        "CoversPublicHealthSystemRisks", "insurance.covers_public_health_system_risks",
+        "covers_public_health_system_risks", "is_false",
+        "Visa requires coverage of public health system risks",
+        fix=("set", True),
+    ),
+    RuleSpec(
+        "NoCopayment", "insurance.no_copayment", "copay", "is_true",
+        "No co-payments required, product has co-payments",
+        fix=("set", False),
+    ),
+    RuleSpec(
+        "NoMoratorium", "insurance.no_moratorium", "moratorium_days", "positive",
+        "No moratorium required, product has {value} day waiting period",
+        fix=("set", 0),
+    ),
+    RuleSpec(
+        "MinimumCoverage", "insurance.min_coverage", "overall_limit", "below",
+        "Minimum coverage {requirement} required, product has {value}",
+        trigger=ANY_VALUE, arg=REQUIREMENT_VALUE, fix=("at_least", REQUIREMENT_VALUE),
+    ),
+    RuleSpec(
+        "MonthlyPaymentsAccepted", "insurance.monthly_payments_accepted", "payment_cadence", "one_of",
+        "Monthly payments not accepted by visa authority",
+        trigger=False, arg=MONTHLY_CADENCES, fix=("set", "annual"),
+    ),
+    RuleSpec(
+        # A missing cadence is not a reason to doubt the full period
+        "MustCoverFullPeriod", "insurance.must_cover_full_period", "payment_cadence", "one_of",
+        "Visa requires coverage for full legal stay, monthly subscriptions can be cancelled",
+        status="YELLOW", arg=MONTHLY_CADENCES, unknown_if_missing=False, fix=("set", "annual"),
+    ),
+]
+
+TABLE_BY_NAME = {spec.name: spec for spec in RULE_TABLE}
+
+
+# field -> (spec path parts, missing entry), shared by every binding of the field
+_FIELDS: Dict[str, Tuple[tuple, str]] = {}
+
+
+class Binding:
+    """A table rule resolved against one visa."""
+
+    __slots__ = ("spec", "req", "field", "parts", "missing", "arg", "jurisdiction", "comparable")
+
+    def __init__(self, spec: RuleSpec, req: dict, field: Optional[str], arg: Any, jurisdiction: str):
+        self.spec = spec
+        self.req = req
+        self.field = field  # spec path with {country} filled in
+        found = _FIELDS.get(field)
+        if found is None:
+            found = _FIELDS[field] = (spec_path(field), f"specs.{field}") if field else ((), "")
+        self.parts, self.missing = found
+        self.arg = arg
+        self.jurisdiction = jurisdiction
+        # A requirement the comparator cannot use, or that names no
+        # jurisdiction to check, leaves every product UNKNOWN
+        self.comparable = COMPARATORS[spec.fails].comparable(arg) and (field is not None or spec.path is None)
+        if not self.comparable:
+            self.missing = _requirement_missing(spec)
+
+    @property
+    def fields(self) -> dict:
+        """Reason template fields other than {value}."""
+        return {"requirement": self.req["value"], "jurisdiction": self.jurisdiction}
+
+    def result(self, value: Any) -> RuleResult:
+        return _result(self.spec, self.req, self.jurisdiction, value)
+
+    def unknown(self) -> RuleResult:
+        return _unknown(self.missing)
+
+
+def _result(spec: RuleSpec, req: dict, jurisdiction: str, value: Any) -> RuleResult:
+    return RuleResult(
+        status=spec.status,
+        reasons=[{
+            "text": spec.reason.format(value=value, requirement=req["value"], jurisdiction=jurisdiction),
+            "evidence": req["evidence"]
+        }],
+        terminal=spec.terminal
+    )
+
+
+def _unknown(missing: str) -> RuleResult:
+    return RuleResult(
+        status="UNKNOWN",
+        missing=[missing]
+    )
+
+
+def is_country_code(value: Any) -> bool:
+    """True for a two-letter jurisdiction code such as "ES" (any case, surrounding spaces allowed)."""
+    if not isinstance(value, str):
+        return False
+    code = value.strip()
+    return len(code) == 2 and code.isascii() and code.isalpha()
+
+
+def _requirement_missing(spec: RuleSpec) -> str:
+    """missing entry when the visa's requirement value cannot be compared."""
+    return f"requirements.{spec.requirement}"
+
+
+class TableRule(Rule):
+    """A rule defined by a RuleSpec row."""
+
+    def __init__(self, spec: RuleSpec):
+        self.spec = spec
+        self.name = spec.name
+        self.requirement = spec.requirement
+        self.trigger = spec.trigger
+        self.per_country = bool(spec.jurisdictions) or "{country}" in (spec.path or "")
+        self._checks = {}  # field -> generated check factory
+
+    def _field(self, visa: dict, req: dict) -> Optional[Tuple[Optional[str], str]]:
+        """(spec path, jurisdiction name) for the jurisdiction checked, or None when the rule does not cover it.
+
+        The spec path is None when the requirement's value is not a
+        two-letter jurisdiction code: the rule applies but cannot be checked.
+        """
+        if self.spec.jurisdictions:
+            country = visa.get("id", "").upper()[:2]
+            if country not in self.spec.jurisdictions:
+                return None
+            name = visa.get("country", "jurisdiction")
+        else:
+            country = req["value"]
+            if not is_country_code(country):
+                return None, "jurisdiction"
+            country = country.strip().upper()
+            name = JURISDICTION_NAMES.get(country, country)
+        return self.spec.path.format(country=country), name
+
+    def prepare(self, visa: dict, reqs: Dict[str, dict]) -> Optional[Binding]:
+        """The rule's binding for this visa, or None when it does not apply."""
+        req = self.active_req(reqs)
+        if req is None:
+            return None
+        spec = self.spec
+        field = spec.path
+        jurisdiction = visa.get("country", "jurisdiction")
+        if self.per_country:
+            found = self._field(visa, req)
+            if found is None:
+                return None
+            field, jurisdiction = found
+        arg = spec.arg if spec.arg is not REQUIREMENT_VALUE else req["value"]
+        return Binding(spec, req, field, arg, jurisdiction)
+
+    def bind(self, visa, reqs):
+        # prepare(), without the Binding: bind runs once per visa and rule
+        req = reqs.get(self.requirement)
+        if not req or (self.trigger is not ANY_VALUE and req["value"] is not self.trigger):
+            return None
+        field = self.spec.path
+        jurisdiction = visa.get("country", "jurisdiction")
+        if self.per_country:
+            found = self._field(visa, req)
+            if found is None:
+                return None
+            field, jurisdiction = found
+        arg = self.spec.arg if self.spec.arg is not REQUIREMENT_VALUE else req["value"]
+        if not COMPARATORS[self.spec.fails].comparable(arg) or (field is None and self.spec.path is not None):
+            missing = _requirement_missing(self.spec)
+            return lambda product: _unknown(missing)
+        factory = self._checks.get(field)
+        if factory is None:
+            factory = self._checks[field] = _check_factory(self.spec, field)
+        return factory(req, jurisdiction)
+
+    def constraints(self, visa, reqs):
+        binding = self.prepare(visa, reqs)
+        if binding is None:
+            return None
+        if self.spec.fix is None or not binding.comparable:
+            # Nothing the product can change avoids this result
+            not_required = binding.comparable and self.spec.status == "NOT_REQUIRED"
+            op = NOT_REQUIRED_OP if not_required else UNREACHABLE_OP
+            return [Constraint(self, None, op, None, lambda product: False)]
+
+        parts = binding.parts
+        comparator = COMPARATORS[self.spec.fails]
+        test = comparator.test
+        arg = binding.arg
+        unknown_if_missing = self.spec.unknown_if_missing
+
+        def holds(product):
+            value = spec_at(product, parts)
+            if not comparator.present(value):
+                return not unknown_if_missing
+            return not test(value, arg)
+
+        op, target = self.spec.fix
+        if target is REQUIREMENT_VALUE:
+            target = binding.req["value"]
+        return [Constraint(self, binding.field, op, target, holds)]
+
+    def bind_columns(self, visa, reqs, cols):
+        binding = self.prepare(visa, reqs)
+        if binding is None:
+            return None
+
+        if not binding.comparable:
+            return [ColumnOutcome("UNKNOWN", cols.all(), lambda row: binding.unknown())]
+
+        parts = binding.parts
+        comparator = COMPARATORS[self.spec.fails]
+        outcomes = []
+        if parts and self.spec.unknown_if_missing:
+            missing = ~cols.number(parts).present if comparator.numeric else cols.missing(parts)
+            outcomes.append(ColumnOutcome("UNKNOWN", missing, lambda row: binding.unknown()))
+        if parts:
+            raw = cols.raw(parts)
+            result = lambda row: binding.result(raw[row])
+        else:
+            result = lambda row: binding.result(None)
+        mask = comparator.mask(cols, parts, binding.arg)
+        outcomes.append(ColumnOutcome(self.spec.status, mask, result, terminal=self.spec.terminal))
+        return outcomes
+
+
+def _status_update(status: str) -> List[str]:
+    """Lines raising the generated status to status, by STATUS_RANK; the merge step inlined for one known status."""
+    rank = STATUS_RANK.get(status, 0)
+    lower = tuple(s for s, r in STATUS_RANK.items() if r < rank)
+    if not lower:
+        return []
+    if rank == max(STATUS_RANK.values()):
+        return [f"status = {status!r}"]
+    return [f"if status in {lower!r}:", f"    status = {status!r}"]
+
+
+_STATUS_UPDATE = {status: _status_update(status) for status in STATUS_RANK}
+
+
+def _mapping(status: str, reasons: str, missing: str) -> str:
+    return (
+        f'{{"visa_id": VISA_ID, "product_id": product["id"], "status": {status}, '
+        f'"reasons": {reasons}, "missing": {missing}}}'
+    )
+
+
+class _Source:
+    """Lines of the generated evaluator and the constants they refer to."""
+
+    def __init__(self):
+        self.lines = []
+        self.constants = {}
+        self.values = {}  # spec path -> local variable holding its value
+
+    def constant(self, value: Any) -> str:
+        name = f"C{len(self.constants)}"
+        self.constants[name] = value
+        return name
+
+    def emit(self, line: str, depth: int = 1) -> None:
+        self.lines.append("    " * depth + line)
+
+    def value(self, parts: tuple) -> str:
+        """Local variable holding the spec value at parts, read on first use."""
+        name = self.values.get(parts)
+        if name is None:
+            name = self.values[parts] = f"v{len(self.values)}"
+            for line in _read(name, "specs", parts):
+                self.emit(line)
+        return name
+
+    def table_rule(self, binding: Binding) -> bool:
+        """Emit one table rule. Returns False when it always ends evaluation."""
+        spec = binding.spec
+        if not binding.comparable:
+            self.emit(f"# {spec.name}: requirement cannot be compared")
+            self.emit(f"missing.append({binding.missing!r})")
+            for line in _STATUS_UPDATE["UNKNOWN"]:
+                self.emit(line)
+            return True
+        comparator = COMPARATORS[spec.fails]
+        value = self.value(binding.parts) if binding.parts else "None"
+        fails = comparator.code.format(value=value, arg=self.constant(binding.arg))
+        if binding.parts and spec.fails != "always":
+            fails = f"{comparator.present_code(value)} and {fails}" if not spec.unknown_if_missing else fails
+        reason = (
+            f'{{"text": {self.constant(spec.reason)}.format(value={value}, **{self.constant(binding.fields)}), '
+            f'"evidence": {self.constant(binding.req["evidence"])}}}'
+        )
+        self.emit(f"# {spec.name}")
+        branch = "if"
+        if binding.parts and spec.unknown_if_missing:
+            self.emit(f"if {comparator.missing_code(value)}:")
+            self.emit(f"missing.append({binding.missing!r})", 2)
+            for line in _STATUS_UPDATE["UNKNOWN"]:
+                self.emit(line, 2)
+            branch = "elif"
+        if spec.terminal:
+            mapping = _mapping(repr(spec.status), f"[{reason}]", "[]")
+            if fails == "True" and branch == "if":
+                self.emit(f"return {mapping}")
+                return False
+            self.emit(f"{branch} {fails}:")
+            self.emit(f"return {mapping}", 2)
+            return True
+        self.emit(f"{branch} {fails}:")
+        self.emit(f"reasons.append({reason})", 2)
+        for line in _STATUS_UPDATE.get(spec.status, []):
+            self.emit(line, 2)
+        return True
+
+    def bound_check(self, check) -> None:
+        """Emit a call to a rule's bound check and the merge of its result (MERGE, engine.merge)."""
+        self.emit(f"result = {self.constant(check)}(product)")
+        self.emit("if result is not None:")
+        self.emit("if result.terminal:", 2)
+        self.emit(f"return {_mapping('result.status', 'result.reasons', 'result.missing')}", 3)
+        self.emit("status = MERGE(status, result, reasons, missing)", 2)
+
+
+# Generated source -> code object; visas with the same rules share source
+_CODE: Dict[str, Any] = {}
+
+
+def _define(source: str, name: str, namespace: dict, label: str) -> Callable:
+    code = _CODE.get(source)
+    if code is None:
+        code = _CODE[source] = compile(source, label, "exec")
+    exec(code, namespace)
+    return namespace[name]
+
+
+def _read(name: str, start: str, parts: tuple) -> List[str]:
+    """Lines leaving the spec value at parts in name; the same lookups as spec_at."""
+    lines = [f"{name} = {start}.get({parts[0]!r})"]
+    for part in parts[1:]:
+        lines.append(f"{name} = {name}.get({part!r}) if isinstance({name}, dict) else None")
+    return lines
+
+
+def _check_factory(spec: RuleSpec, field: Optional[str]) -> Callable:
+    """make(REQ, JURISDICTION) returning the bound check of one rule and field, specialised by code generation."""
+    lines = []
+    value = "None"
+    if field:
+        value = "value"
+        lines += ['specs = product.get("specs")', "if not isinstance(specs, dict):", "    specs = {}"]
+        lines += _read("value", "specs", spec_path(field))
+        lines += [
+            f"if {COMPARATORS[spec.fails].missing_code('value')}:",
+            "    return _unknown(MISSING)" if spec.unknown_if_missing else "    return None",
+        ]
+    fails = COMPARATORS[spec.fails].code.format(value=value, arg="ARG")
+    lines += [f"if {fails}:", f"    return _result(SPEC, REQ, JURISDICTION, {value})", "return None"]
+    arg = 'REQ["value"]' if spec.arg is REQUIREMENT_VALUE else "SPEC.arg"
+    source = (
+        f"def make(REQ, JURISDICTION):\n    ARG = {arg}\n    def check(product):\n"
+        + "".join(f"        {line}\n" for line in lines)
+        + "    return check\n"
+    )
+    namespace = {"SPEC": spec, "MISSING": f"specs.{field}", "NUMBER": NUMBER, "_result": _result, "_unknown": _unknown}
+    return _define(source, "make", namespace, f"<rule {spec.name}>")
+
+
+def compile_evaluator(visa: dict, reqs: Dict[str, dict], rules: list, merge: Callable) -> Callable[[dict], dict]:
+    """One generated function evaluating a product against all of rules for visa.
+
+    Same output as VisaPlan.evaluate over the rules' bound checks. Table
+    rules are inlined; any other rule is called through its bound check
+    and its result folded in by merge (engine.merge).
+    """
+    source = _Source()
+    source.emit('specs = product.get("specs")')
+    source.emit("if not isinstance(specs, dict):")
+    source.emit("specs = {}", 2)
+    source.emit('status = "GREEN"')
+    source.emit("reasons = []")
+    source.emit("missing = []")
+    reachable = True
+    for rule in rules:
+        if isinstance(rule, TableRule):
+            binding = rule.prepare(visa, reqs)
+            if binding is not None:
+                reachable = source.table_rule(binding)
+        else:
+            check = rule.bind(visa, reqs)
+            if check is not None:
+                source.bound_check(check)
+        if not reachable:
+            break
+    if reachable:
+        source.emit('if status == "GREEN" and missing:')
+        source.emit('status = "UNKNOWN"', 2)
+        source.emit(f"return {_mapping('status', 'reasons', 'missing')}")
+
+    code = "def evaluate(product):\n" + "\n".join(source.lines) + "\n"
+    namespace = {"VISA_ID": visa["id"], "NUMBER": NUMBER, "MERGE": merge, **source.constants}
+    evaluate = _define(code, "evaluate", namespace, "<evaluator>")
+    evaluate.source = code
+    return evaluate
@@ -0,0 +1,396 @@
+"""Local JSON evaluation service with a warm rule engine.
+
+Visas are compiled into plans once and products stay resident, so a request
+costs one plan evaluation (or a cached result) instead of an interpreter
+start, rule imports and a data load. Facts files are polled and reloaded
+in the background when they change.
+
+Endpoints:
+  GET  /evaluate?visa=<id>&product=<id>   one mapping
+  POST /evaluate                          {"pairs": [{"visa": id, "product": id}, ...]}
+  POST /what_if                           {"session"?: id, "base"?: product id, "patch": {spec path: value}}
+  GET  /health                            loaded counts, reload time and the last reload error
+  GET  /stats                             request latency percentiles
+  GET  /metrics                           per-rule Prometheus counters (--profile-rules)
+"""
+import argparse
+import json
+import math
+import sys
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from tools import instrumentation
+from tools.dataset import INSURERS, PRODUCTS, VISAS, load_dataset
+from tools.engine import compile_visa
+from tools.what_if import WhatIf
+
+MAX_BATCH = 10000
+MAX_BODY = 4 * 1024 * 1024
+LATENCY_WINDOW = 10000
+# Draft sessions kept per snapshot; the least recently used is dropped
+MAX_SESSIONS = 64
+ENDPOINTS = {"/evaluate", "/what_if", "/health", "/stats", "/metrics"}
+
+
+def facts_stamps() -> dict:
+    """(size, mtime_ns) of every visa, product and insurer file, by path."""
+    stamps = {}
+    for folder in (VISAS, PRODUCTS, INSURERS):
+        for path in folder.rglob("*.json"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            stamps[str(path)] = (stat.st_size, stat.st_mtime_ns)
+    return stamps
+
+
+class EngineSnapshot:
+    """Compiled plans and products for one version of the facts files."""
+
+    def __init__(self, dataset, stamps: dict):
+        self.stamps = stamps
+        self.visas = list(dataset.visas)
+        self.plans = {visa["id"]: compile_visa(visa) for visa in dataset.visas}
+        self.products = dict(dataset.products_by_id)
+        self.results = {}  # (visa_id, product_id) -> mapping; facts are fixed per snapshot
+        self.sessions = OrderedDict()  # session id -> WhatIf, bound to this snapshot's visas
+        self._sessions_lock = threading.Lock()
+        self.loaded_at = datetime.now(timezone.utc).isoformat()
+
+    def evaluate(self, visa_id: str, product_id: str) -> dict:
+        """Mapping for one pair. Raises KeyError for an unknown id."""
+        key = (visa_id, product_id)
+        result = self.results.get(key)
+        if result is None:
+            plan = self.plans.get(visa_id)
+            if plan is None:
+                raise KeyError(f"Unknown visa: {visa_id}")
+            product = self.products.get(product_id)
+            if product is None:
+                raise KeyError(f"Unknown product: {product_id}")
+            result = self.results.setdefault(key, plan.evaluate(product))
+        return result
+
+    def what_if(self, session_id, base_id, patch: dict) -> dict:
+        """Apply patch to draft session_id, or to a new draft (from base_id) when none is given.
+
+        Sessions live with the snapshot, so a reload or eviction drops them
+        and their ids stop resolving. Raises KeyError for an unknown session
+        or base product, and TypeError or ValueError for a patch the rules
+        cannot evaluate; the session is then left as it was (a new one is
+        not kept).
+        """
+        # The shared lock guards only the session table; each session's
+        # own lock serialises the edits to its draft
+        with self._sessions_lock:
+            created = not session_id
+            if created:
+                base = None
+                if base_id:
+                    base = self.products.get(base_id)
+                    if base is None:
+                        raise KeyError(f"Unknown product: {base_id}")
+                session_id = uuid.uuid4().hex
+                session = self.sessions[session_id] = WhatIf(self.visas, base)
+                while len(self.sessions) > MAX_SESSIONS:
+                    self.sessions.popitem(last=False)
+            else:
+                session = self.sessions.get(session_id)
+                if session is None:
+                    raise KeyError(f"Unknown session: {session_id}")
+            self.sessions.move_to_end(session_id)
+        with session.lock:
+            try:
+                mappings = session.what_if(patch)
+            except (TypeError, ValueError):
+                if created:
+                    with self._sessions_lock:
+                        self.sessions.pop(session_id, None)
+                raise
+            return {"session": session_id, "rerun": session.rerun, "mappings": mappings}
+
+
+class Engine:
+    """Holds the current snapshot and swaps in a new one when facts change."""
+
+    def __init__(self):
+        stamps = facts_stamps()
+        self.snapshot = EngineSnapshot(load_dataset(), stamps)
+        self.reloads = 0
+        self.reload_error = None  # why the newest facts were not loaded, until a reload succeeds
+        self._failed_stamps = None  # stamps of that failed load; retried once the files change again
+        self._lock = threading.Lock()
+
+    def reload_if_changed(self) -> bool:
+        stamps = facts_stamps()
+        if stamps == self.snapshot.stamps or stamps == self._failed_stamps:
+            return False
+        with self._lock:
+            try:
+                snapshot = EngineSnapshot(load_dataset(), stamps)
+            except Exception as e:
+                # A half-written or malformed file; keep serving the last good snapshot
+                self._failed_stamps = stamps
+                self.reload_error = f"{type(e).__name__}: {e}"
+                print(f"[WARN] Reload skipped: {self.reload_error}", file=sys.stderr)
+                return False
+            self.snapshot = snapshot
+            self.reloads += 1
+            self.reload_error = None
+            self._failed_stamps = None
+        print(f"Reloaded facts: {len(snapshot.plans)} visas, {len(snapshot.products)} products")
+        return True
+
+    def watch(self, interval: float, stop: threading.Event) -> None:
+        while not stop.wait(interval):
+            try:
+                self.reload_if_changed()
+            except Exception:
+                # One failed pass must not end hot reload for the process
+                traceback.print_exc()
+
+
+class LatencyStats:
+    """Rolling request latencies per endpoint."""
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self.window = window
+        self.samples = {}
+        self.counts = {}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint: str, seconds: float) -> None:
+        with self._lock:
+            self.samples.setdefault(endpoint, deque(maxlen=self.window)).append(seconds)
+            self.counts[endpoint] = self.counts.get(endpoint, 0) + 1
+
+    def summary(self) -> dict:
+        with self._lock:
+            snapshot = {k: sorted(v) for k, v in self.samples.items()}
+            counts = dict(self.counts)
+        out = {}
+        for endpoint, values in snapshot.items():
+            out[endpoint] = {"count": counts[endpoint], "window": len(values)}
+            for label, q in (("p50_ms", 0.50), ("p90_ms", 0.90), ("p99_ms", 0.99)):
+                out[endpoint][label] = round(percentile(values, q) * 1000, 4)
+            out[endpoint]["max_ms"] = round(values[-1] * 1000, 4)
+        return out
+
+
+def percentile(sorted_values: list, q: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(q * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def endpoint_label(path: str) -> str:
+    """Stats key for a request path; unknown paths share one bucket."""
+    return path if path in ENDPOINTS else "other"
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive: no connection setup per request
+    server_version = "VisaFactEngine/1"
+
+    def do_GET(self):
+        start = time.perf_counter()
+        url = urlparse(self.path)
+        try:
+            self.get(url)
+        except OSError:
+            raise
+        except Exception as e:
+            self.internal_error(e)
+        self.server.stats.record(f"GET {endpoint_label(url.path)}", time.perf_counter() - start)
+
+    def get(self, url):
+        if url.path == "/evaluate":
+            query = parse_qs(url.query)
+            visa_id = (query.get("visa") or [""])[0]
+            product_id = (query.get("product") or [""])[0]
+            if not visa_id or not product_id:
+                self.send_json(400, {"error": "visa and product query parameters are required"})
+            else:
+                try:
+                    self.send_json(200, self.server.engine.snapshot.evaluate(visa_id, product_id))
+                except KeyError as e:
+                    self.send_json(404, {"error": e.args[0]})
+                except (TypeError, ValueError) as e:
+                    # The ids are fine; the facts they name are not
+                    self.send_json(500, {"error": f"Cannot evaluate {visa_id} x {product_id}: {e}"})
+        elif url.path == "/health":
+            snapshot = self.server.engine.snapshot
+            self.send_json(200, {
+                "status": "ok",
+                "visas": len(snapshot.plans),
+                "products": len(snapshot.products),
+                "loaded_at": snapshot.loaded_at,
+                "reloads": self.server.engine.reloads,
+                "reload_error": self.server.engine.reload_error,
+            })
+        elif url.path == "/stats":
+            self.send_json(200, self.server.stats.summary())
+        elif url.path == "/metrics" and instrumentation.ACTIVE is not None:
+            self.send_text(200, instrumentation.ACTIVE.to_prometheus(), "text/plain; version=0.0.4")
+        else:
+            self.send_json(404, {"error": f"Unknown path: {url.path}"})
+
+    def do_POST(self):
+        start = time.perf_counter()
+        try:
+            url = urlparse(self.path)
+            if url.path == "/evaluate":
+                self.evaluate_batch()
+            elif url.path == "/what_if":
+                self.what_if()
+            else:
+                self.send_json(404, {"error": f"Unknown path: {url.path}"})
+        except OSError:
+            raise
+        except Exception as e:
+            self.internal_error(e)
+        finally:
+            self.server.stats.record(f"POST {endpoint_label(urlparse(self.path).path)}", time.perf_counter() - start)
+
+    def read_body(self):
+        """Parsed JSON body, or None after sending 400 or 413 for a bad length."""
+        header = self.headers.get("Content-Length") or "0"
+        try:
+            length = int(header)
+        except ValueError:
+            length = -1
+        if length < 0:
+            # Nothing says where the body ends; read(-1) would wait for the client to close
+            self.send_json(400, {"error": f"Invalid Content-Length: {header}"})
+            self.close_connection = True
+            return None
+        if length > MAX_BODY:
+            self.send_json(413, {"error": f"Body exceeds {MAX_BODY} bytes"})
+            self.close_connection = True
+            return None
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def evaluate_batch(self):
+        try:
+            body = self.read_body()
+            if body is None:
+                return
+            pairs = body["pairs"]
+            if not isinstance(pairs, list):
+                raise ValueError("pairs must be a list")
+        except (ValueError, KeyError, TypeError) as e:
+            self.send_json(400, {"error": f"Expected {{\"pairs\": [...]}}: {e}"})
+            return
+        if len(pairs) > MAX_BATCH:
+            self.send_json(413, {"error": f"At most {MAX_BATCH} pairs per request"})
+            return
+
+        snapshot = self.server.engine.snapshot  # one snapshot for the whole batch
+        results = []
+        for pair in pairs:
+            try:
+                visa_id, product_id = pair["visa"], pair["product"]
+            except (KeyError, TypeError):
+                results.append({"error": "Each pair needs visa and product"})
+                continue
+            try:
+                results.append(snapshot.evaluate(visa_id, product_id))
+            except KeyError as e:
+                results.append({"error": e.args[0]})
+            except (TypeError, ValueError) as e:
+                results.append({"error": f"Cannot evaluate {visa_id} x {product_id}: {e}"})
+        self.send_json(200, {"results": results})
+
+    def what_if(self):
+        try:
+            body = self.read_body()
+            if body is None:
+                return
+            patch = body["patch"]
+            if not isinstance(patch, dict):
+                raise ValueError("patch must be an object")
+        except (ValueError, KeyError, TypeError) as e:
+            self.send_json(400, {"error": f"Expected {{\"patch\": {{...}}}}: {e}"})
+            return
+        try:
+            self.send_json(200, self.server.engine.snapshot.what_if(body.get("session"), body.get("base"), patch))
+        except KeyError as e:
+            self.send_json(404, {"error": e.args[0]})
+        except (TypeError, ValueError) as e:
+            self.send_json(400, {"error": f"Patch cannot be evaluated: {e}"})
+
+    def internal_error(self, e: Exception) -> None:
+        """500 with a JSON body for an error no handler expected; the traceback goes to stderr."""
+        traceback.print_exc()
+        self.send_json(500, {"error": f"Internal error: {type(e).__name__}: {e}"})
+
+    def send_json(self, status: int, payload) -> None:
+        self.send_text(status, json.dumps(payload), "application/json")
+
+    def send_text(self, status: int, text: str, content_type: str) -> None:
+        data = text.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+def make_server(host: str, port: int, engine: Engine = None, verbose: bool = False) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    server.engine = engine or Engine()
+    server.stats = LatencyStats()
+    server.verbose = verbose
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--reload-interval", type=float, default=1.0, help="Seconds between facts file checks (0 disables)")
+    parser.add_argument("--verbose", action="store_true", help="Log every request")
+    parser.add_argument("--profile-rules", action="store_true", help="Collect per-rule counters and expose them at /metrics")
+    args = parser.parse_args()
+
+    if args.profile_rules:
+        instrumentation.enable()
+
+    server = make_server(args.host, args.port, verbose=args.verbose)
+    stop = threading.Event()
+    if args.reload_interval > 0:
+        threading.Thread(target=server.engine.watch, args=(args.reload_interval, stop), daemon=True).start()
+
+    snapshot = server.engine.snapshot
+    host, port = server.server_address[:2]
+    print(f"Serving {len(snapshot.plans)} visas x {len(snapshot.products)} products on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
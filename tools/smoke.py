@@ -3,6 +3,10 @@ import os
 import sys
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from tools.index_format import expand_index
+
 ROOT = Path(os.environ.get("SMOKE_ROOT", Path(__file__).parent.parent))
 INDEX_PATH = Path(os.environ.get("SMOKE_INDEX_PATH", ROOT / "data" / "ui_index.json"))
 
@@ -16,7 +20,7 @@ def main() -> None:
     if not INDEX_PATH.exists():
         fail(f"Missing ui_index.json at {INDEX_PATH}")
 
-    data = json.loads(INDEX_PATH.read_text(encoding="utf-8"))
+    data = expand_index(json.loads(INDEX_PATH.read_text(encoding="utf-8")))
     mappings = data.get("mappings", [])
     sources_by_id = data.get("sources_by_id", {})
 
@@ -0,0 +1,199 @@
+"""Content-addressed object store shared by all snapshots.
+
+Every file is stored once under objects/<sha[:2]>/<sha[2:]> and made
+read-only. A snapshot directory is a tree of hardlinks to those objects
+(plain copies where the filesystem cannot link) plus a manifest.json.
+Input hashes are cached by path, size and mtime, so an unchanged file is
+neither re-read nor copied again on the next snapshot.
+"""
+import hashlib
+import json
+import os
+import shutil
+import stat
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Tuple
+
+from tools.dataset import RACY_WINDOW_NS
+from tools.hashing import CHUNK_SIZE
+
+ROOT = Path(__file__).parent.parent
+HASH_CACHE = ROOT / "data" / ".cache" / "snapshot_hashes.json"
+
+# Snapshot ids that would collide with the store or the release root
+RESERVED = {"objects", "releases"}
+
+
+def make_writable(func, path, _exc_info) -> None:
+    """shutil.rmtree onerror hook: clear read-only (Windows) and retry."""
+    os.chmod(path, stat.S_IWRITE | stat.S_IREAD)
+    func(path)
+
+
+def remove_tree(path: Path) -> None:
+    if path.exists():
+        shutil.rmtree(path, onerror=make_writable)
+
+
+def cache_key(path: Path) -> str:
+    # abspath is string-only; resolve() would cost syscalls per file
+    return os.path.abspath(path)
+
+
+class HashCache:
+    """sha256 of input files keyed by absolute path, valid while size and mtime match."""
+
+    def __init__(self, path: Path = HASH_CACHE):
+        self.path = path
+        self.dirty = False
+        try:
+            self.entries: Dict[str, list] = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def get(self, path: Path, st: os.stat_result):
+        entry = self.entries.get(cache_key(path))
+        if entry and entry[0] == st.st_size and entry[1] == st.st_mtime_ns:
+            return entry[2]
+        return None
+
+    def put(self, path: Path, st: os.stat_result, digest: str) -> None:
+        key = cache_key(path)
+        if time.time_ns() - st.st_mtime_ns > RACY_WINDOW_NS:
+            self.entries[key] = [st.st_size, st.st_mtime_ns, digest]
+            self.dirty = True
+        elif self.entries.pop(key, None) is not None:
+            self.dirty = True
+
+    def save(self) -> None:
+        live = {k: v for k, v in self.entries.items() if os.path.exists(k)}
+        if not self.dirty and len(live) == len(self.entries):
+            return
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_name(self.path.name + ".tmp")
+            tmp.write_text(json.dumps(live, separators=(",", ":")), encoding="utf-8")
+            os.replace(tmp, self.path)
+        except OSError:
+            pass
+        self.entries = live
+        self.dirty = False
+
+
+class ObjectStore:
+    """Read-only blobs named by their sha256."""
+
+    def __init__(self, root: Path, hashes: HashCache = None):
+        self.root = root
+        self.hashes = hashes if hashes is not None else HashCache()
+        self.stats = {"linked": 0, "copied": 0, "stored": 0, "hashed": 0}
+        self._root = str(root)
+        self._dirs = set()  # directories known to exist, so each is created once per run
+        self._view = memoryview(bytearray(CHUNK_SIZE))
+
+    def object_path(self, digest: str) -> Path:
+        return self.root / digest[:2] / digest[2:]
+
+    def _mkdir(self, path: str) -> None:
+        if path not in self._dirs:
+            os.makedirs(path, exist_ok=True)
+            self._dirs.add(path)
+
+    def ingest(self, src: Path) -> Tuple[str, int]:
+        """Store src if its content is new. Returns (sha256, size).
+
+        A file whose stat matches the hash cache and whose object exists is
+        not read at all; otherwise it is hashed while being copied in.
+        Paths are handled as strings: this runs once per snapshot file.
+        """
+        st = os.stat(src)
+        digest = self.hashes.get(src, st)
+        if digest is not None and os.path.exists(os.path.join(self._root, digest[:2], digest[2:])):
+            return digest, st.st_size
+
+        self._mkdir(self._root)
+        tmp = os.path.join(self._root, f".tmp-{os.getpid()}-{os.path.basename(src)}")
+        sha = hashlib.sha256()
+        # One reused buffer: read(CHUNK_SIZE) would allocate a megabyte per small file
+        view = self._view
+        with open(src, "rb", buffering=0) as fin, open(tmp, "wb") as fout:
+            while True:
+                n = fin.readinto(view)
+                if not n:
+                    break
+                sha.update(view[:n])
+                fout.write(view[:n])
+        digest = sha.hexdigest()
+        self.stats["hashed"] += 1
+        self.hashes.put(src, st, digest)
+
+        folder = os.path.join(self._root, digest[:2])
+        target = os.path.join(folder, digest[2:])
+        if os.path.exists(target):
+            os.unlink(tmp)
+        else:
+            self._mkdir(folder)
+            os.chmod(tmp, stat.S_IREAD | stat.S_IRGRP | stat.S_IROTH)
+            os.replace(tmp, target)
+            self.stats["stored"] += 1
+        return digest, st.st_size
+
+    def materialize(self, digest: str, dst) -> None:
+        """Hardlink the object at dst, or copy it where links are unsupported."""
+        self._mkdir(os.path.dirname(dst))
+        src = os.path.join(self._root, digest[:2], digest[2:])
+        try:
+            os.link(src, dst)
+            self.stats["linked"] += 1
+        except OSError:
+            shutil.copyfile(src, dst)
+            self.stats["copied"] += 1
+
+    def build(self, snapshot_dir: Path, inputs: Iterable[Tuple[Path, str]]) -> list:
+        """Write snapshot_dir from (source path, relative path) pairs.
+
+        The tree is assembled next to snapshot_dir and swapped in at the
+        end. Returns manifest entries in path order.
+        """
+        staging = snapshot_dir.with_name(f".{snapshot_dir.name}.building")
+        remove_tree(staging)
+        self._dirs.clear()  # a previous build's staging tree has been moved away
+        files = []
+        for src, rel in sorted(inputs, key=lambda item: item[1]):
+            digest, size = self.ingest(src)
+            self.materialize(digest, os.path.join(staging, rel))
+            files.append({"path": rel, "sha256": digest, "size": size})
+        self.hashes.save()
+
+        staging.mkdir(parents=True, exist_ok=True)
+        remove_tree(snapshot_dir)
+        os.replace(staging, snapshot_dir)
+        return files
+
+    def prune(self, manifests: Iterable[Path]) -> int:
+        """Delete objects no manifest references. Returns how many were removed."""
+        live = set()
+        for manifest in manifests:
+            data = json.loads(manifest.read_text(encoding="utf-8"))
+            live.update(entry["sha256"] for entry in data.get("files", []))
+        removed = 0
+        if not self.root.exists():
+            return removed
+        for path in self.root.glob("*/*"):
+            if path.parent.name + path.name not in live:
+                os.chmod(path, stat.S_IWRITE | stat.S_IREAD)
+                path.unlink()
+                removed += 1
+        return removed
+
+
+def tree_inputs(src: Path, prefix: str) -> list:
+    """(path, prefix/relative path) for every file under src."""
+    if not src.exists():
+        return []
+    return [
+        (path, f"{prefix}/{path.relative_to(src).as_posix()}")
+        for path in src.rglob("*")
+        if path.is_file()
+    ]
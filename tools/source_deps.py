@@ -0,0 +1,159 @@
+"""Reverse dependency index: source_id -> visa requirements, product and insurer evidence, mappings.
+
+build_index.py writes the index as a shard next to the UI manifest
+(manifest["source_deps"]). Querying it answers "what depends on this
+source" with a lookup instead of a scan of every facts and mapping file.
+
+    py tools/source_deps.py BLS_ES_DNV_LONDON_2026
+    py tools/source_deps.py --needs-review --json
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Iterator, Tuple
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from tools.authorizations import provider_key
+from tools.index_format import load_manifest, load_shard
+
+ROOT = Path(__file__).parent.parent
+SHARDS = ROOT / "data" / "ui_index"
+SOURCE_STATUS = ROOT / "data" / "source_status.json"
+
+
+def cited_sources(node, path: str = "") -> Iterator[Tuple[str, str]]:
+    """(JSON path, source_id) for every object under node that names a source."""
+    if isinstance(node, dict):
+        if isinstance(node.get("source_id"), str):
+            yield path, node["source_id"]
+        for key, value in node.items():
+            yield from cited_sources(value, f"{path}.{key}" if path else key)
+    elif isinstance(node, list):
+        for i, value in enumerate(node):
+            yield from cited_sources(value, f"{path}[{i}]")
+
+
+def mapping_id(mapping: dict) -> str:
+    """Mapping file stem, as written by build_mappings.py."""
+    return f"{mapping.get('visa_id', '')}__{mapping.get('product_id', '')}"
+
+
+def build_source_deps(visas: list, products: list, mappings: list, insurers: list = ()) -> dict:
+    """Inverted index keyed by source_id.
+
+    visas maps visa id -> requirement keys citing the source (empty when the
+    visa only lists it under sources); products maps product id -> evidence
+    paths in its product file, and insurers maps provider -> evidence paths
+    in its insurer file (data/insurers); mappings lists every mapping whose
+    visa, product or product's insurer depends on the source, and
+    cited_by_mappings those whose reasons quote it.
+
+    products are the files as written: the registry facts the dataset
+    applies to them are indexed under their insurer, not under each product.
+    """
+    deps = {}
+
+    def entry(source_id: str) -> dict:
+        if source_id not in deps:
+            deps[source_id] = {"visas": {}, "products": {}, "insurers": {}, "mappings": set(), "cited_by_mappings": set()}
+        return deps[source_id]
+
+    visa_sources = {}
+    for visa in visas:
+        visa_id = visa.get("id", "")
+        used = visa_sources.setdefault(visa_id, set())
+        for _, source_id in cited_sources(visa.get("sources", [])):
+            entry(source_id)["visas"].setdefault(visa_id, set())
+            used.add(source_id)
+        for req in visa.get("requirements", []):
+            for _, source_id in cited_sources(req):
+                entry(source_id)["visas"].setdefault(visa_id, set()).add(req.get("key", ""))
+                used.add(source_id)
+
+    insurer_sources = {}
+    for insurer in insurers:
+        provider = insurer.get("provider", "")
+        used = insurer_sources.setdefault(provider_key(provider), set())
+        for path, source_id in cited_sources(insurer):
+            entry(source_id)["insurers"].setdefault(provider, []).append(path)
+            used.add(source_id)
+
+    product_sources = {}
+    for product in products:
+        product_id = product.get("id", "")
+        used = product_sources.setdefault(product_id, set())
+        used |= insurer_sources.get(provider_key(product.get("provider")), set())
+        for path, source_id in cited_sources(product):
+            entry(source_id)["products"].setdefault(product_id, []).append(path)
+            used.add(source_id)
+
+    for mapping in mappings:
+        mid = mapping_id(mapping)
+        cited = {source_id for _, source_id in cited_sources(mapping.get("reasons", []))}
+        upstream = visa_sources.get(mapping.get("visa_id"), set()) | product_sources.get(mapping.get("product_id"), set())
+        for source_id in upstream | cited:
+            entry(source_id)["mappings"].add(mid)
+        for source_id in cited:
+            entry(source_id)["cited_by_mappings"].add(mid)
+
+    return {
+        source_id: {
+            "visas": {k: sorted(v) for k, v in sorted(item["visas"].items())},
+            "products": dict(sorted(item["products"].items())),
+            "insurers": dict(sorted(item["insurers"].items())),
+            "mappings": sorted(item["mappings"]),
+            "cited_by_mappings": sorted(item["cited_by_mappings"]),
+        }
+        for source_id, item in sorted(deps.items())
+    }
+
+
+def load_source_deps(shards: Path = SHARDS) -> dict:
+    """The index from the current sharded build."""
+    return load_shard(shards, load_manifest(shards).get("source_deps"), "source_deps shard")
+
+
+def print_text(source_id: str, item) -> None:
+    print(source_id)
+    if item is None:
+        print("  not cited by any visa, product, insurer or mapping")
+        return
+    for visa_id, keys in item["visas"].items():
+        print(f"  visa {visa_id}: {', '.join(keys) if keys else '(listed source)'}")
+    for product_id, paths in item["products"].items():
+        print(f"  product {product_id}: {', '.join(paths)}")
+    for provider, paths in item["insurers"].items():
+        print(f"  insurer {provider}: {', '.join(paths)}")
+    print(f"  mappings: {len(item['mappings'])} affected, {len(item['cited_by_mappings'])} cite it in reasons")
+    for mid in item["mappings"]:
+        print(f"    {mid}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("source_ids", nargs="*", help="Source ids to look up")
+    parser.add_argument("--needs-review", action="store_true", help="Also look up needs_review_source_ids from data/source_status.json")
+    parser.add_argument("--index-dir", default=str(SHARDS), help="Sharded ui_index directory")
+    parser.add_argument("--json", action="store_true", help="Print the matching entries as JSON")
+    args = parser.parse_args()
+
+    source_ids = list(args.source_ids)
+    if args.needs_review and SOURCE_STATUS.exists():
+        status = json.loads(SOURCE_STATUS.read_text(encoding="utf-8"))
+        source_ids += [s for s in status.get("needs_review_source_ids", []) if s not in source_ids]
+    if not source_ids and not args.needs_review:
+        parser.error("give at least one source id or --needs-review")
+
+    deps = load_source_deps(Path(args.index_dir))
+    if args.json:
+        print(json.dumps({source_id: deps.get(source_id) for source_id in source_ids}, indent=2))
+    else:
+        for source_id in source_ids:
+            print_text(source_id, deps.get(source_id))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+"""Minimal spec changes that would turn each visa x product verdict GREEN.
+
+Every rule in tools/rules/ states its pass condition as Constraints (see
+Rule.constraints). A visa compiles to the set of constraints of its
+active rules; identical constraints from different visas are shared, so
+each product is tested once per distinct constraint and a pair's
+failures are a set intersection. A failing constraint names the one
+field change that satisfies it. Changes on the same field are merged,
+and nothing is re-evaluated.
+
+Pairs that need exactly one change are aggregated into a ranking of the
+single spec changes that unlock the most routes.
+
+    py tools/spec_changes.py
+    py tools/spec_changes.py --product SAFETYWING_NOMAD_2026 --json
+"""
+import argparse
+import copy
+import json
+import sys
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from tools.dataset import load_dataset
+from tools.engine import RULES
+from tools.rules.base import NOT_REQUIRED_OP, UNREACHABLE_OP, index_requirements, spec_path
+
+
+def change_label(field: str, op: str, target) -> str:
+    """deductible.amount -> 0, overall_limit >= 30000, payment_cadence -> annual."""
+    value = json.dumps(target) if not isinstance(target, str) else target
+    return f"{field} {'>=' if op == 'at_least' else '->'} {value}"
+
+
+class ConstraintSet:
+    """Distinct constraints across all compiled visas."""
+
+    def __init__(self):
+        self.by_key = {}
+
+    def compile(self, visa: dict):
+        """Keys of the visa's constraints.
+
+        When no change can make the visa GREEN, returns the op of the
+        constraint that says so instead: NOT_REQUIRED_OP or UNREACHABLE_OP.
+        """
+        reqs = index_requirements(visa)
+        keys = []
+        for rule in RULES:
+            found = rule.constraints(visa, reqs)
+            for constraint in found or []:
+                if constraint.field is None:
+                    return constraint.op
+                self.by_key.setdefault(constraint.key, constraint)
+                keys.append(constraint.key)
+        return frozenset(keys)
+
+    def failing(self, product: dict, keys) -> dict:
+        """key -> "missing" or "violation" for each constraint in keys the product does not meet."""
+        failed = {}
+        for key in keys:
+            constraint = self.by_key[key]
+            if not constraint.holds(product):
+                failed[key] = "missing" if constraint.missing(product) else "violation"
+        return failed
+
+    def merge(self, keys: frozenset):
+        """One change per field for the failed keys, or None when two need different values.
+
+        Each change lists the constraint keys it satisfies; the result does
+        not depend on the product, so callers can share it.
+        """
+        merged = {}
+        for constraint in sorted((self.by_key[key] for key in keys), key=lambda c: (c.field, c.rule)):
+            entry = merged.get(constraint.field)
+            if entry is None:
+                merged[constraint.field] = {
+                    "field": constraint.field,
+                    "op": constraint.op,
+                    "target": constraint.target,
+                    "rules": [constraint.rule],
+                    "keys": [constraint.key],
+                }
+                continue
+            if entry["op"] == constraint.op == "at_least":
+                entry["target"] = max(entry["target"], constraint.target)
+            elif entry["op"] != constraint.op or entry["target"] != constraint.target:
+                return None
+            entry["rules"].append(constraint.rule)
+            entry["keys"].append(constraint.key)
+        for entry in merged.values():
+            entry["change"] = change_label(entry["field"], entry["op"], entry["target"])
+        return list(merged.values())
+
+
+def apply_changes(product: dict, changes: list) -> dict:
+    """Copy of product with the changes written into its specs."""
+    changed = copy.deepcopy(product)
+    for change in changes:
+        parts = spec_path(change["field"])
+        node = changed.setdefault("specs", {})
+        for part in parts[:-1]:
+            if not isinstance(node.get(part), dict):
+                node[part] = {}
+            node = node[part]
+        node[parts[-1]] = change["target"]
+    return changed
+
+
+def explain(visas: list, products: list) -> dict:
+    """Per-pair minimal changes and the ranking of single changes."""
+    constraints = ConstraintSet()
+    plans = [(visa["id"], constraints.compile(visa)) for visa in visas]
+    not_required = sorted(visa_id for visa_id, keys in plans if keys == NOT_REQUIRED_OP)
+    unreachable = sorted(visa_id for visa_id, keys in plans if keys == UNREACHABLE_OP)
+    plans = [(visa_id, keys) for visa_id, keys in plans if isinstance(keys, frozenset)]
+    all_keys = frozenset().union(*(keys for _, keys in plans))
+
+    pairs = []
+    green = 0
+    conflicts = []
+    ranking = {}
+    by_product = {}
+    templates = {}
+    for product in products:
+        product_id = product["id"]
+        # Each distinct constraint is tested once per product
+        failing = constraints.failing(product, all_keys)
+        failing_keys = failing.keys()
+        unlocks = {}
+        changes_for = {}
+        for visa_id, keys in plans:
+            failed = keys & failing_keys
+            if not failed:
+                green += 1
+                continue
+            failed = frozenset(failed)
+            changes = changes_for.get(failed)
+            if changes is None and failed not in changes_for:
+                if failed not in templates:
+                    templates[failed] = constraints.merge(failed)
+                template = templates[failed]
+                changes = None if template is None else [
+                    {
+                        "field": t["field"], "op": t["op"], "target": t["target"],
+                        "kind": failing[t["keys"][0]], "rules": t["rules"], "change": t["change"],
+                    }
+                    for t in template
+                ]
+                changes_for[failed] = changes
+            if changes is None:
+                conflicts.append({"visa_id": visa_id, "product_id": product_id})
+                continue
+            pairs.append({"visa_id": visa_id, "product_id": product_id, "changes": changes})
+            if len(changes) == 1:
+                label = changes[0]["change"]
+                unlocks.setdefault(label, []).append(visa_id)
+                entry = ranking.setdefault(label, {"change": label, "pairs": 0, "visas": set(), "products": set()})
+                entry["pairs"] += 1
+                entry["visas"].add(visa_id)
+                entry["products"].add(product_id)
+        if unlocks:
+            by_product[product_id] = [
+                {"change": label, "visas": sorted(visa_ids)}
+                for label, visa_ids in sorted(unlocks.items(), key=lambda item: (-len(item[1]), item[0]))
+            ]
+
+    ranked = sorted(ranking.values(), key=lambda e: (-e["pairs"], -len(e["visas"]), e["change"]))
+    return {
+        "visas": len(visas),
+        "products": len(products),
+        "green_pairs": green,
+        "not_required_visas": not_required,
+        "unreachable_visas": unreachable,
+        "constraints": len(constraints.by_key),
+        "ranking": [
+            {"change": e["change"], "pairs": e["pairs"], "visas": sorted(e["visas"]), "products": len(e["products"])}
+            for e in ranked
+        ],
+        "by_product": dict(sorted(by_product.items())),
+        "conflicts": conflicts,
+        "pairs": pairs,
+    }
+
+
+def print_text(report: dict, top: int) -> None:
+    print(
+        f"{report['visas']} visas x {report['products']} products: {report['green_pairs']} GREEN, "
+        f"{len(report['pairs'])} reachable with spec changes, "
+        f"{len(report['not_required_visas'])} visas do not require insurance, "
+        f"{len(report['unreachable_visas'])} visas no spec change can satisfy"
+    )
+    print("Single changes ranked by routes unlocked:")
+    for entry in report["ranking"][:top]:
+        print(f"  {entry['change']}: {entry['pairs']} pairs, {len(entry['visas'])} visas, {entry['products']} products")
+    for pair in report["pairs"]:
+        changes = "; ".join(
+            change["change"] + (" (missing)" if change["kind"] == "missing" else "")
+            for change in pair["changes"]
+        )
+        print(f"{pair['visa_id']} x {pair['product_id']}: {changes}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--visa", action="append", help="Only these visa ids (repeatable)")
+    parser.add_argument("--product", action="append", help="Only these product ids (repeatable)")
+    parser.add_argument("--top", type=int, default=20, help="Ranking entries to print")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    parser.add_argument("--output", default="", help="Also write the JSON report here")
+    args = parser.parse_args()
+
+    dataset = load_dataset()
+    visas = [v for v in dataset.visas if not args.visa or v["id"] in args.visa]
+    products = [p for p in dataset.products if not args.product or p["id"] in args.product]
+
+    report = explain(visas, products)
+    if args.output:
+        out_path = Path(args.output)
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        out_path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_text(report, args.top)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Content-addressed static data assets: hashed names, precompression, cache headers."""
+import argparse
+import gzip
+import hashlib
+from pathlib import Path
+
+import brotli
+
+ROOT = Path(__file__).parent.parent
+HEADERS = ROOT / "ops" / "headers" / "_headers"
+
+HASH_LENGTH = 12
+COMPRESSIBLE = {".json", ".html", ".css", ".js", ".md", ".txt", ".svg"}
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+POINTER = "public, max-age=60, must-revalidate"
+
+# (path pattern, Cache-Control). Hashed files never change under a name;
+# current.json points at the latest manifest and must stay fresh.
+CACHE_RULES = [
+    ("/data/ui_index/current.json", POINTER),
+    ("/data/ui_index/manifest.*", IMMUTABLE),
+    ("/data/ui_index/source_deps.*", IMMUTABLE),
+    ("/data/ui_index/visas/*", IMMUTABLE),
+    ("/data/ui_index/buckets/*", IMMUTABLE),
+    ("/data/ui_index/sources/*", IMMUTABLE),
+    ("/snapshots/:snapshot/ui_index/current.json", POINTER),
+    ("/snapshots/:snapshot/ui_index/manifest.*", IMMUTABLE),
+    ("/snapshots/:snapshot/ui_index/source_deps.*", IMMUTABLE),
+    ("/snapshots/:snapshot/ui_index/visas/*", IMMUTABLE),
+    ("/snapshots/:snapshot/ui_index/buckets/*", IMMUTABLE),
+    ("/snapshots/:snapshot/ui_index/sources/*", IMMUTABLE),
+]
+
+BEGIN_MARKER = "# BEGIN generated cache rules (tools/static_assets.py)"
+END_MARKER = "# END generated cache rules"
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+
+
+def hashed_name(stem: str, data: bytes, suffix: str = ".json") -> str:
+    """File name that changes whenever the content does."""
+    return f"{stem}.{content_hash(data)}{suffix}"
+
+
+def compressed_siblings(path: Path) -> list:
+    """The .gz and .br files precompress() writes for path."""
+    return [path.with_name(path.name + ".gz"), path.with_name(path.name + ".br")]
+
+
+def precompress(path: Path) -> list:
+    """Write .gz and .br siblings next to path."""
+    data = path.read_bytes()
+    gz, br = compressed_siblings(path)
+    gz.write_bytes(gzip.compress(data, compresslevel=9, mtime=0))
+    br.write_bytes(brotli.compress(data, quality=11))
+    return [gz, br]
+
+
+def precompress_tree(folder: Path) -> int:
+    """Precompress every compressible file under folder. Returns files processed."""
+    count = 0
+    for path in sorted(folder.rglob("*")):
+        if path.is_file() and path.suffix.lower() in COMPRESSIBLE:
+            precompress(path)
+            count += 1
+    return count
+
+
+def render_cache_rules() -> str:
+    lines = [BEGIN_MARKER]
+    for pattern, cache_control in CACHE_RULES:
+        lines.append(pattern)
+        lines.append(f"  Cache-Control: {cache_control}")
+    lines.append(END_MARKER)
+    return "\n".join(lines) + "\n"
+
+
+def with_cache_rules(headers: str) -> str:
+    """Return headers text with the generated block inserted or replaced."""
+    block = render_cache_rules()
+    start = headers.find(BEGIN_MARKER)
+    end = headers.find(END_MARKER)
+    if start != -1 and end != -1:
+        end = headers.find("\n", end)
+        end = len(headers) if end == -1 else end + 1
+        return headers[:start] + block + headers[end:]
+    if headers and not headers.endswith("\n"):
+        headers += "\n"
+    return headers + block
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--write-headers", action="store_true", help="Regenerate cache rules in ops/headers/_headers")
+    parser.add_argument("--check-headers", action="store_true", help="Fail if ops/headers/_headers is out of date")
+    args = parser.parse_args()
+
+    current = HEADERS.read_text(encoding="utf-8")
+    expected = with_cache_rules(current)
+    if args.write_headers:
+        HEADERS.write_text(expected, encoding="utf-8")
+        print(f"Cache rules written to {HEADERS}")
+    elif args.check_headers:
+        if current != expected:
+            print(f"ERROR: {HEADERS} is out of date. Run py tools/static_assets.py --write-headers")
+            raise SystemExit(1)
+        print("Cache rules up to date")
+    else:
+        print(render_cache_rules(), end="")
+
+
+if __name__ == "__main__":
+    main()
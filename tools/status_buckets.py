@@ -0,0 +1,88 @@
+"""Per-visa status buckets: which products pass a visa, ranked.
+
+build_index.py writes one small shard per visa (visa_list[].buckets in the
+UI manifest) mapping each status to [product_id, missing field count]
+pairs, fewest missing fields first. "Which products are GREEN for this
+visa" is then one fetch of that shard, however large the catalogue.
+
+    py tools/status_buckets.py ES_DNV_BLS_LONDON_2026
+    py tools/status_buckets.py ES_DNV_BLS_LONDON_2026 --status GREEN --json
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from tools.index_format import load_manifest, load_shard
+
+ROOT = Path(__file__).parent.parent
+SHARDS = ROOT / "data" / "ui_index"
+
+# Display order: the statuses a user would act on first
+STATUSES = ["GREEN", "YELLOW", "UNKNOWN", "RED", "NOT_REQUIRED"]
+
+
+def missing_count(mapping: dict) -> int:
+    return len(mapping.get("missing") or mapping.get("missing_evidence") or [])
+
+
+def empty_buckets() -> dict:
+    return {status: [] for status in STATUSES}
+
+
+def build_status_buckets(mappings: list) -> dict:
+    """visa_id -> status -> [[product_id, missing count], ...].
+
+    Every status is present; each bucket is sorted by missing count, then
+    product id. Unrecognised statuses are filed under UNKNOWN.
+    """
+    buckets = {}
+    for m in mappings:
+        status = str(m.get("status") or "UNKNOWN").upper()
+        if status not in STATUSES:
+            status = "UNKNOWN"
+        visa = buckets.setdefault(m.get("visa_id", ""), empty_buckets())
+        visa[status].append([m.get("product_id", ""), missing_count(m)])
+    for visa in buckets.values():
+        for entries in visa.values():
+            entries.sort(key=lambda entry: (entry[1], entry[0]))
+    return dict(sorted(buckets.items()))
+
+
+def status_counts(buckets: dict) -> dict:
+    return {status: len(buckets.get(status, [])) for status in STATUSES}
+
+
+def load_status_buckets(visa_id: str, shards: Path = SHARDS) -> dict:
+    """The buckets shard for one visa from the current sharded build."""
+    for visa in load_manifest(shards).get("visa_list", []):
+        if visa.get("id") == visa_id:
+            return load_shard(shards, visa.get("buckets"), "status buckets")
+    raise SystemExit(f"Unknown visa id: {visa_id}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("visa_id", help="Visa id to list products for")
+    parser.add_argument("--status", action="append", choices=STATUSES, help="Only these statuses (repeatable)")
+    parser.add_argument("--index-dir", default=str(SHARDS), help="Sharded ui_index directory")
+    parser.add_argument("--json", action="store_true", help="Print the buckets as JSON")
+    args = parser.parse_args()
+
+    buckets = load_status_buckets(args.visa_id, Path(args.index_dir))
+    selected = {status: buckets.get(status, []) for status in (args.status or STATUSES)}
+    if args.json:
+        print(json.dumps(selected, indent=2))
+        return
+    print(args.visa_id)
+    for status, entries in selected.items():
+        print(f"  {status}: {len(entries)}")
+        for product_id, missing in entries:
+            print(f"    {product_id}" + (f" ({missing} missing)" if missing else ""))
+
+
+if __name__ == "__main__":
+    main()
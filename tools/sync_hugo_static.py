@@ -1,20 +1,128 @@
-﻿import os
+﻿"""Mirror ui/, data and sources into static/ for Hugo.
+
+By default only files whose size, mtime or content differ are copied and
+only files removed from the source are deleted, so unchanged files keep
+their timestamps and hugo server does not rebuild them. --full deletes
+and recopies every tree.
+"""
+import argparse
+import os
 import shutil
 import sys
 from pathlib import Path
 
-ROOT = Path(os.environ.get("SYNC_ROOT", Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent.parent))
 
+from tools.hashing import sha256_file
+from tools.snapshot_store import remove_tree
+from tools.static_assets import COMPRESSIBLE, compressed_siblings, precompress
 
-def copy_tree(src: Path, dst: Path) -> None:
-    if dst.exists():
-        shutil.rmtree(dst)
-    shutil.copytree(src, dst)
+ROOT = Path(os.environ.get("SYNC_ROOT", Path(__file__).parent.parent))
 
 
-def copy_file(src: Path, dst: Path) -> None:
+class SyncStats:
+    def __init__(self):
+        self.copied = 0
+        self.bytes_copied = 0
+        self.unchanged = 0
+        self.deleted = 0
+        self.compressed = 0
+
+    def summary(self) -> str:
+        return (
+            f"{self.copied} copied ({self.bytes_copied / 1024 / 1024:.2f} MB), "
+            f"{self.deleted} deleted, {self.unchanged} unchanged, {self.compressed} precompressed"
+        )
+
+
+def same_file(src: Path, src_stat: os.stat_result, dst: Path) -> bool:
+    """True when dst already holds src's content (size+mtime, else sha256)."""
+    try:
+        dst_stat = dst.stat()
+    except OSError:
+        return False
+    if not dst.is_file() or dst_stat.st_size != src_stat.st_size:
+        return False
+    if dst_stat.st_mtime_ns == src_stat.st_mtime_ns:
+        return True
+    # Same size, different mtime (fresh checkout, touched file): compare content
+    if sha256_file(src) != sha256_file(dst):
+        return False
+    os.utime(dst, ns=(dst_stat.st_atime_ns, src_stat.st_mtime_ns))
+    return True
+
+
+def make_parent(dst: Path) -> None:
+    """Create dst's parent, replacing any file that sits where a directory should."""
+    for parent in reversed(dst.parents):
+        if parent.exists() and not parent.is_dir():
+            parent.unlink()
     dst.parent.mkdir(parents=True, exist_ok=True)
-    shutil.copy2(src, dst)
+
+
+def sync_file(src: Path, dst: Path, stats: SyncStats, compress: bool = False) -> bool:
+    """Copy src to dst unless it is already there. Returns True if dst changed.
+
+    Copies are plain writable files carrying src's mtime, written to a
+    temporary name and renamed into place.
+    """
+    src_stat = src.stat()
+    changed = not same_file(src, src_stat, dst)
+    if changed:
+        if dst.is_dir():
+            remove_tree(dst)
+        make_parent(dst)
+        tmp = dst.with_name(f".{dst.name}.sync")
+        shutil.copyfile(src, tmp)
+        os.utime(tmp, ns=(src_stat.st_atime_ns, src_stat.st_mtime_ns))
+        os.replace(tmp, dst)
+        stats.copied += 1
+        stats.bytes_copied += src_stat.st_size
+    else:
+        stats.unchanged += 1
+    if compress and dst.suffix.lower() in COMPRESSIBLE:
+        if changed or not all(p.exists() for p in compressed_siblings(dst)):
+            precompress(dst)
+            stats.compressed += 1
+    return changed
+
+
+def sync_tree(src: Path, dst: Path, stats: SyncStats, skip=(), compress: bool = False) -> None:
+    """Make dst mirror src. skip names top-level entries of src to leave out.
+
+    With compress, compressible files get .gz/.br siblings, which are kept
+    as long as the file they belong to is.
+    """
+    expected = set()
+    for folder, dirs, files in os.walk(src):
+        if Path(folder) == src:
+            dirs[:] = [d for d in dirs if d not in skip]
+            files = [f for f in files if f not in skip]
+        dirs.sort()
+        for name in sorted(files):
+            path = Path(folder) / name
+            rel = path.relative_to(src)
+            target = dst / rel
+            sync_file(path, target, stats, compress)
+            expected.add(rel)
+            if compress and target.suffix.lower() in COMPRESSIBLE:
+                expected.update(p.relative_to(dst) for p in compressed_siblings(target))
+
+    if not dst.exists():
+        return
+    for folder, dirs, files in os.walk(dst, topdown=False):
+        for name in files:
+            path = Path(folder) / name
+            if path.relative_to(dst) not in expected:
+                path.unlink()
+                stats.deleted += 1
+        if Path(folder) != dst and not os.listdir(folder):
+            os.rmdir(folder)
+
+
+def snapshot_skip(root: Path) -> set:
+    """The object store and half-built snapshots at the top of data/snapshots."""
+    return {name for name in os.listdir(root) if name == "objects" or name.startswith(".")}
 
 
 def fail(message: str) -> None:
@@ -23,8 +131,18 @@ def fail(message: str) -> None:
 
 
 def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--full", action="store_true", help="Delete and recopy every tree instead of syncing changes")
+    args = parser.parse_args()
+
     static = ROOT / "static"
     static.mkdir(exist_ok=True)
+    stats = SyncStats()
+
+    def mirror(src: Path, dst: Path, **kwargs) -> None:
+        if args.full:
+            remove_tree(dst)
+        sync_tree(src, dst, stats, **kwargs)
 
     ui_src = ROOT / "ui"
     if not ui_src.exists():
@@ -32,29 +150,35 @@ def main() -> None:
     css_src = ui_src / "style.css"
     if not css_src.exists():
         fail("Missing ui/style.css. Run npm run build:css before sync.")
-    copy_tree(ui_src, static / "ui")
+    mirror(ui_src, static / "ui")
 
     index_src = ROOT / "data" / "ui_index.json"
     if not index_src.exists():
         fail("Missing data/ui_index.json")
-    copy_file(index_src, static / "data" / "ui_index.json")
+    sync_file(index_src, static / "data" / "ui_index.json", stats, compress=True)
+
+    shards_src = ROOT / "data" / "ui_index"
+    if shards_src.exists():
+        mirror(shards_src, static / "data" / "ui_index", compress=True)
 
     sources_src = ROOT / "sources"
     release = os.environ.get("RELEASE_BUILD", "").lower() in {"1", "true", "yes"}
     if sources_src.exists():
-        copy_tree(sources_src, static / "sources")
+        mirror(sources_src, static / "sources")
     elif release:
         fail("Missing sources/ directory in release mode")
 
     snapshots_src = ROOT / "data" / "snapshots"
     if snapshots_src.exists():
-        copy_tree(snapshots_src, static / "snapshots")
+        # Snapshot files are read-only hardlinks into the object store; sync
+        # publishes plain writable copies so static/ never aliases the store
+        mirror(snapshots_src, static / "snapshots", skip=snapshot_skip(snapshots_src), compress=True)
 
     headers_src = ROOT / "ops" / "headers" / "_headers"
     if headers_src.exists():
-        copy_file(headers_src, static / "_headers")
+        sync_file(headers_src, static / "_headers", stats)
 
-    print("Synced UI/data/sources into static/ for Hugo")
+    print(f"Synced UI/data/sources into static/ for Hugo: {stats.summary()}")
 
 
 if __name__ == "__main__":
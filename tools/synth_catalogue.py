@@ -0,0 +1,200 @@
+"""Seeded synthetic catalogue: schema-valid visa, product and insurer facts, offers and sources.
+
+Used by tools/benchmark.py to exercise the engine and build pipeline at
+scales the real catalogue has not reached yet. The same seed and sizes
+always produce byte-identical files.
+"""
+import argparse
+import hashlib
+import json
+import random
+from pathlib import Path
+
+COUNTRIES = [
+    ("ES", "Spain"),
+    ("PT", "Portugal"),
+    ("DE", "Germany"),
+    ("MT", "Malta"),
+    ("CR", "Costa Rica"),
+    ("TH", "Thailand"),
+]
+
+# (requirement key, op, value generator, probability the visa lists it)
+REQUIREMENTS = [
+    ("insurance.mandatory", "==", lambda r: r.random() > 0.05, 1.0),
+    ("insurance.travel_insurance_accepted", "==", lambda r: False, 0.4),
+    ("insurance.authorized_in_spain", "==", lambda r: True, 0.5),
+    ("insurance.no_deductible", "==", lambda r: True, 0.5),
+    ("insurance.comprehensive", "==", lambda r: True, 0.6),
+    ("insurance.covers_public_health_system_risks", "==", lambda r: True, 0.4),
+    ("insurance.unlimited_coverage", "==", lambda r: True, 0.3),
+    ("insurance.no_copayment", "==", lambda r: True, 0.5),
+    ("insurance.no_moratorium", "==", lambda r: True, 0.4),
+    ("insurance.min_coverage", ">=", lambda r: r.choice([30000, 50000, 100000]), 0.5),
+    ("insurance.monthly_payments_accepted", "==", lambda r: False, 0.4),
+    ("insurance.must_cover_full_period", "==", lambda r: True, 0.5),
+]
+
+PRODUCT_TYPES = ["health insurance", "travel insurance", "travel medical", "expat health"]
+CADENCES = ["monthly", "every_4_weeks", "annual", "single"]
+RETRIEVED_AT = "2026-01-01T00:00:00Z"
+DATE = "2026-01-01"
+
+
+def maybe(rng: random.Random, value, missing: float = 0.1):
+    """value, or None with probability missing (exercises UNKNOWN paths)."""
+    return None if rng.random() < missing else value
+
+
+def write_json(path: Path, payload) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(payload, indent=2, ensure_ascii=False), encoding="utf-8")
+
+
+def write_source(root: Path, source_id: str, text: str) -> dict:
+    """Write a source document and its .meta.json; return the meta."""
+    local_path = f"sources/{source_id}.md"
+    data = text.encode("utf-8")
+    (root / local_path).parent.mkdir(parents=True, exist_ok=True)
+    (root / local_path).write_bytes(data)
+    meta = {
+        "source_id": source_id,
+        "url": f"https://example.invalid/{source_id.lower()}",
+        "retrieved_at": RETRIEVED_AT,
+        "sha256": hashlib.sha256(data).hexdigest(),
+        "local_path": local_path,
+        "synthetic": True,
+    }
+    write_json(root / "sources" / f"{source_id}.meta.json", meta)
+    return meta
+
+
+def make_visa(rng: random.Random, index: int, source: dict) -> dict:
+    code, country = COUNTRIES[index % len(COUNTRIES)]
+    requirements = []
+    for key, op, value, probability in REQUIREMENTS:
+        if key == "insurance.mandatory" or rng.random() < probability:
+            requirements.append({
+                "key": key,
+                "op": op,
+                "value": value(rng),
+                "evidence": [{
+                    "source_id": source["source_id"],
+                    "locator": f"section {len(requirements) + 1}",
+                    "excerpt": f"Synthetic requirement text for {key} (visa {index}).",
+                }],
+            })
+    return {
+        "id": f"{code}_SYNTH_{index:04d}",
+        "country": country,
+        "visa_name": f"Synthetic Visa {index}",
+        "route": f"Route {index}",
+        "authority": f"Synthetic Authority {index % 7}",
+        "last_verified": DATE,
+        "sources": [{k: source[k] for k in ("source_id", "url", "retrieved_at", "sha256", "local_path")}],
+        "requirements": requirements,
+    }
+
+
+def make_product(rng: random.Random, index: int, source: dict) -> dict:
+    evidence = {
+        "source_id": source["source_id"],
+        "locator": f"page {index % 40 + 1}",
+        "excerpt": f"Synthetic policy wording for product {index}.",
+    }
+    unlimited = rng.random() < 0.3
+    specs = {
+        "type": maybe(rng, rng.choice(PRODUCT_TYPES)),
+        "overall_limit": maybe(rng, None if unlimited else rng.choice([25000, 50000, 250000, 1000000, 10000000])),
+        "currency": "EUR",
+        "deductible": maybe(rng, {"amount": rng.choice([0, 0, 250, 1000]), "currency": "EUR"}),
+        "copay": maybe(rng, rng.random() < 0.3),
+        "payment_cadence": maybe(rng, rng.choice(CADENCES)),
+        "contract_commitment_months": maybe(rng, rng.choice([1, 12])),
+        "comprehensive": maybe(rng, rng.random() < 0.6),
+        "covers_public_health_system_risks": maybe(rng, rng.random() < 0.5),
+        "unlimited": maybe(rng, unlimited),
+        "moratorium_days": maybe(rng, rng.choice([0, 0, 30, 180])),
+        "jurisdiction_facts": {
+            "ES": {"authorized": maybe(rng, rng.random() < 0.5), "evidence": [evidence]},
+        },
+    }
+    return {
+        "id": f"SYNTH_PRODUCT_{index:05d}",
+        "provider": f"SynthProvider{index % 50:02d}",
+        "product_name": f"Synthetic Product {index}",
+        "effective_date": DATE,
+        "policy_version": "2026",
+        "specs": specs,
+        "evidence": [evidence],
+    }
+
+
+def make_insurer(rng: random.Random, provider: str, source: dict) -> dict:
+    """Registry entries for provider in a few jurisdictions, some undecided."""
+    authorizations = {}
+    for code, _ in rng.sample(COUNTRIES, 3):
+        authorizations[code] = {
+            "authorized": maybe(rng, rng.random() < 0.7),
+            "evidence": [{
+                "source_id": source["source_id"],
+                "locator": f"register entry {code}",
+                "excerpt": f"Synthetic authorization record for {provider} in {code}.",
+            }],
+        }
+    return {"provider": provider, "last_verified": DATE, "authorizations": authorizations}
+
+
+def generate(root: Path, visas: int, products: int, seed: int = 0) -> dict:
+    """Write a synthetic catalogue under root (data/ and sources/). Returns counts."""
+    rng = random.Random(seed)
+
+    for index in range(visas):
+        source = write_source(root, f"SYNTH_VISA_SOURCE_{index:04d}", f"Synthetic visa source {index}\n")
+        visa = make_visa(rng, index, source)
+        code = visa["id"][:2]
+        write_json(root / "data" / "visas" / code / "SYNTH" / f"route-{index:04d}" / DATE / "visa_facts.json", visa)
+
+    providers = {}
+    offers = []
+    for index in range(products):
+        provider = f"SynthProvider{index % 50:02d}"
+        if provider not in providers:
+            providers[provider] = write_source(root, f"SYNTH_{provider.upper()}", f"Synthetic policy wording for {provider}\n")
+        product = make_product(rng, index, providers[provider])
+        write_json(root / "data" / "products" / provider / f"product-{index:05d}" / DATE / "product_facts.json", product)
+        if index % 5 == 0:
+            offers.append({
+                "product_id": product["id"],
+                "affiliate_url": f"https://example.invalid/products/{index}",
+                "label": f"View Synthetic Product {index}",
+                "disclosure": "Synthetic link for benchmarking.",
+            })
+    write_json(root / "data" / "offers" / "offers.json", {"offers": offers})
+
+    # Every other provider has a registry file; its own stream keeps the products as they were
+    insurer_rng = random.Random(f"{seed}:insurers")
+    insurers = sorted(providers)[::2]
+    for provider in insurers:
+        write_json(root / "data" / "insurers" / provider / "insurer_facts.json", make_insurer(insurer_rng, provider, providers[provider]))
+
+    return {
+        "visas": visas, "products": products, "insurers": len(insurers),
+        "offers": len(offers), "sources": visas + len(providers),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--out", required=True, help="Directory to write data/ and sources/ into")
+    parser.add_argument("--visas", type=int, default=50)
+    parser.add_argument("--products", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    counts = generate(Path(args.out), args.visas, args.products, args.seed)
+    print(f"Synthetic catalogue written to {args.out}: {counts}")
+
+
+if __name__ == "__main__":
+    main()
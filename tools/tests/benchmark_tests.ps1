@@ -0,0 +1,65 @@
+$ErrorActionPreference = "Stop"
+$failed = $false
+
+function Assert-True {
+  param([bool]$Condition, [string]$Message)
+  if (-not $Condition) { Write-Host "FAIL: $Message" -ForegroundColor Red; $script:failed = $true }
+  else { Write-Host "PASS: $Message" -ForegroundColor Green }
+}
+
+$root = Split-Path -Parent (Split-Path -Parent $PSScriptRoot)
+$work = Join-Path ([System.IO.Path]::GetTempPath()) ("benchmark_" + [System.Guid]::NewGuid().ToString())
+New-Item -ItemType Directory -Path $work | Out-Null
+$baseline = Join-Path $work "baseline.json"
+$report = Join-Path $work "report.json"
+
+try {
+  # Same seed, same catalogue
+  $genA = Join-Path $work "a"
+  $genB = Join-Path $work "b"
+  $proc = Start-Process -FilePath "py" -ArgumentList @("tools/synth_catalogue.py", "--out", $genA, "--visas", "3", "--products", "20", "--seed", "7") -WorkingDirectory $root -Wait -PassThru -NoNewWindow
+  Assert-True ($proc.ExitCode -eq 0) "synthetic catalogue generates"
+  $proc = Start-Process -FilePath "py" -ArgumentList @("tools/synth_catalogue.py", "--out", $genB, "--visas", "3", "--products", "20", "--seed", "7") -WorkingDirectory $root -Wait -PassThru -NoNewWindow
+  $filesA = Get-ChildItem -Path $genA -Recurse -File
+  $same = $true
+  foreach ($f in $filesA) {
+    $other = Join-Path $genB ($f.FullName.Substring($genA.Length))
+    if (-not (Test-Path $other) -or (Get-FileHash $f.FullName).Hash -ne (Get-FileHash $other).Hash) { $same = $false; break }
+  }
+  Assert-True ($same -and $filesA.Count -gt 0) "synthetic catalogue is deterministic for a seed"
+
+  $proc = Start-Process -FilePath "py" -ArgumentList @("tools/benchmark.py", "--visas", "3", "--products", "20", "--baseline", $baseline, "--update-baseline") -WorkingDirectory $root -Wait -PassThru -NoNewWindow
+  Assert-True ($proc.ExitCode -eq 0) "benchmark writes a baseline"
+  Assert-True (Test-Path $baseline) "baseline file exists"
+
+  $proc = Start-Process -FilePath "py" -ArgumentList @("tools/benchmark.py", "--visas", "3", "--products", "20", "--baseline", $baseline, "--threshold", "100", "--output", $report) -WorkingDirectory $root -Wait -PassThru -NoNewWindow
+  Assert-True ($proc.ExitCode -eq 0) "benchmark compares against the baseline"
+  $data = Get-Content -Raw -Path $report | ConvertFrom-Json
+  foreach ($stage in @("evaluate", "build_mappings", "build_index", "build_snapshot")) {
+    Assert-True ($null -ne $data.stages.$stage.seconds) "report times $stage"
+    Assert-True ($null -ne $data.stages.$stage.baseline_ratio) "report compares $stage with the baseline"
+  }
+
+  Assert-True ($data.catalogue.insurers -gt 0) "synthetic catalogue includes insurer files"
+  if ($null -ne $data.stages.validate) {
+    Assert-True ($data.stages.validate.count -eq (3 + 20 + $data.catalogue.insurers + 1)) "validate counts visa, product, insurer and offers files"
+  }
+
+  # A baseline that is impossibly fast must fail the run
+  $fast = Get-Content -Raw -Path $baseline | ConvertFrom-Json
+  foreach ($p in $fast.stages.PSObject.Properties) { $p.Value.seconds = 0.000001 }
+  $fast | ConvertTo-Json -Depth 10 | Set-Content -Path $baseline
+  $proc = Start-Process -FilePath "py" -ArgumentList @("tools/benchmark.py", "--visas", "3", "--products", "20", "--baseline", $baseline) -WorkingDirectory $root -Wait -PassThru -NoNewWindow
+  Assert-True ($proc.ExitCode -ne 0) "benchmark fails on a regression"
+
+  # ...unless it was measured on other hardware, which is not compared
+  $fast.hardware.cpus = -1
+  $fast | ConvertTo-Json -Depth 10 | Set-Content -Path $baseline
+  $proc = Start-Process -FilePath "py" -ArgumentList @("tools/benchmark.py", "--visas", "3", "--products", "20", "--baseline", $baseline) -WorkingDirectory $root -Wait -PassThru -NoNewWindow
+  Assert-True ($proc.ExitCode -eq 0) "benchmark skips a baseline from other hardware"
+} finally {
+  Remove-Item -Recurse -Force $work -ErrorAction SilentlyContinue
+}
+
+if ($failed) { Write-Error "Benchmark tests failed."; exit 1 }
+Write-Host "All checks passed." -ForegroundColor Green
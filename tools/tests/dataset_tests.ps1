@@ -0,0 +1,54 @@
+$ErrorActionPreference = "Stop"
+$failed = $false
+
+function Assert-True {
+  param([bool]$Condition, [string]$Message)
+  if (-not $Condition) { Write-Host "FAIL: $Message" -ForegroundColor Red; $script:failed = $true }
+  else { Write-Host "PASS: $Message" -ForegroundColor Green }
+}
+
+$root = Split-Path -Parent (Split-Path -Parent $PSScriptRoot)
+
+# A cached load must match a fresh parse, and an edited file must be re-read
+$tmp = Join-Path ([System.IO.Path]::GetTempPath()) ("dataset_check_" + [System.Guid]::NewGuid().ToString() + ".py")
+$datasetScript = @'
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+work = Path(tempfile.mkdtemp())
+os.environ["DATASET_CACHE"] = str(work / "dataset.pickle")
+sys.path.insert(0, str(Path.cwd()))
+from tools import dataset
+
+fresh = dataset.load_dataset()
+if not (work / "dataset.pickle").exists():
+    sys.exit("cache file not written")
+cached = dataset.load_dataset()
+for name in ("visas", "products", "offers", "sources_by_id", "offers_by_product"):
+    if getattr(fresh, name) != getattr(cached, name):
+        sys.exit(f"cached {name} differs from a fresh parse")
+if [r.sha256 for r in fresh.visa_records] != [r.sha256 for r in cached.visa_records]:
+    sys.exit("cached content hashes differ")
+
+folder = work / "items"
+folder.mkdir()
+item = folder / "item.json"
+item.write_text(json.dumps({"id": "A"}), encoding="utf-8")
+os.utime(item, ns=(0, 0))
+if dataset.load_records(folder)[0].data != {"id": "A"}:
+    sys.exit("first read wrong")
+item.write_text(json.dumps({"id": "B"}), encoding="utf-8")
+os.utime(item, ns=(10**9, 10**9))
+if dataset.load_records(folder)[0].data != {"id": "B"}:
+    sys.exit("edited file served from cache")
+'@
+Set-Content -Path $tmp -Value $datasetScript -Encoding UTF8
+$proc = Start-Process -FilePath "py" -ArgumentList $tmp -WorkingDirectory $root -Wait -PassThru -NoNewWindow
+Remove-Item $tmp -ErrorAction SilentlyContinue
+Assert-True ($proc.ExitCode -eq 0) "dataset cache matches a fresh parse and tracks edits"
+
+if ($failed) { Write-Error "Dataset tests failed."; exit 1 }
+Write-Host "All checks passed." -ForegroundColor Green
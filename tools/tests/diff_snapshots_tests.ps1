@@ -0,0 +1,74 @@
+$ErrorActionPreference = "Stop"
+$failed = $false
+
+function Assert-True {
+  param([bool]$Condition, [string]$Message)
+  if (-not $Condition) { Write-Host "FAIL: $Message" -ForegroundColor Red; $script:failed = $true }
+  else { Write-Host "PASS: $Message" -ForegroundColor Green }
+}
+
+$root = Split-Path -Parent (Split-Path -Parent $PSScriptRoot)
+
+# Two snapshots that differ in one product: only that product's pairs are evaluated
+$tmp = Join-Path ([System.IO.Path]::GetTempPath()) ("diff_check_" + [System.Guid]::NewGuid().ToString() + ".py")
+$diffScript = @'
+import json
+import shutil
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path.cwd()))
+from tools.snapshot_store import HashCache, ObjectStore, tree_inputs
+from tools.diff_snapshots import diff
+
+work = Path(tempfile.mkdtemp())
+data = work / "data"
+shutil.copytree("data/visas", data / "visas")
+shutil.copytree("data/products", data / "products")
+store = ObjectStore(work / "objects", HashCache(work / "hashes.json"))
+
+
+def snapshot(name):
+    inputs = tree_inputs(data / "visas", "visas") + tree_inputs(data / "products", "products")
+    files = store.build(work / name, inputs)
+    (work / name / "manifest.json").write_text(json.dumps({"snapshot_id": name, "files": files}), encoding="utf-8")
+    return work / name
+
+
+old = snapshot("old")
+if diff(old, old)["evaluated_pairs"] != 0:
+    sys.exit("identical snapshots must evaluate nothing")
+
+# Drop a product's overall limit so some verdicts lose their evidence
+for path in sorted((data / "products").rglob("product_facts.json")):
+    product = json.loads(path.read_text(encoding="utf-8"))
+    if product["specs"].get("overall_limit"):
+        break
+product["specs"]["overall_limit"] = None
+path.write_text(json.dumps(product), encoding="utf-8")
+new = snapshot("new")
+
+report = diff(old, new)
+visas = len(list((data / "visas").rglob("visa_facts.json")))
+if report["changed_products"] != [product["id"]] or report["changed_visas"]:
+    sys.exit(f"wrong changed ids: {report['changed_products']} {report['changed_visas']}")
+if report["evaluated_pairs"] != visas:
+    sys.exit(f"expected {visas} pairs, evaluated {report['evaluated_pairs']}")
+if any(c["product_id"] != product["id"] for c in report["changes"]):
+    sys.exit("changes reported for an unchanged product")
+if not any("specs.overall_limit" in c["new_missing"] for c in report["changes"]):
+    sys.exit(f"missing overall_limit not reported: {report['changes']}")
+
+proc = subprocess.run([sys.executable, "tools/diff_snapshots.py", str(old), str(new), "--json"], capture_output=True, text=True)
+if proc.returncode != 0 or json.loads(proc.stdout)["changes"] != report["changes"]:
+    sys.exit(f"CLI output differs: {proc.stderr}")
+'@
+Set-Content -Path $tmp -Value $diffScript -Encoding UTF8
+$proc = Start-Process -FilePath "py" -ArgumentList $tmp -WorkingDirectory $root -Wait -PassThru -NoNewWindow
+Remove-Item $tmp -ErrorAction SilentlyContinue
+Assert-True ($proc.ExitCode -eq 0) "diff_snapshots re-evaluates only changed facts and reports new UNKNOWN fields"
+
+if ($failed) { Write-Error "Snapshot diff tests failed."; exit 1 }
+Write-Host "All checks passed." -ForegroundColor Green
@@ -15,6 +15,15 @@ try {
 
   $headers = Join-Path $root "static/_headers"
   Assert-True (Test-Path $headers) "static/_headers exists"
+
+  $check = Start-Process -FilePath "python" -ArgumentList "tools/static_assets.py --check-headers" -Wait -PassThru
+  Assert-True ($check.ExitCode -eq 0) "generated cache rules in ops/headers/_headers are up to date"
+  $headerText = Get-Content -Raw -Path $headers
+  Assert-True ($headerText -match "/data/ui_index/visas/\*\s+Cache-Control: public, max-age=31536000, immutable") "visa shards are served immutable"
+  Assert-True ($headerText -match "/data/ui_index/current.json\s+Cache-Control: public, max-age=60") "index pointer has a short TTL"
+
+  $gz = Join-Path $root "static/data/ui_index.json.gz"
+  Assert-True (Test-Path $gz) "ui_index.json is precompressed"
 } finally {
   Pop-Location
 }
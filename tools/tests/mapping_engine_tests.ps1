@@ -17,6 +17,16 @@ Write-Host "Mapping engine rule tests..." -ForegroundColor Cyan
 $proc = Start-Process -FilePath "py" -ArgumentList "tools/build_mappings.py" -Wait -PassThru -NoNewWindow
 Assert-True ($proc.ExitCode -eq 0) "build_mappings.py runs successfully"
 
+# A second run with unchanged inputs must not rewrite any mapping
+$rerun = & py tools/build_mappings.py 2>&1 | Out-String
+Assert-True ($LASTEXITCODE -eq 0) "build_mappings.py reruns successfully"
+Assert-True ($rerun -match "Mappings: 0 written") "Unchanged inputs rewrite no mappings ($($rerun.Trim()))"
+
+# Parallel evaluation must produce byte-identical mappings
+$parallel = & py tools/build_mappings.py --force --jobs 2 2>&1 | Out-String
+Assert-True ($LASTEXITCODE -eq 0) "build_mappings.py --jobs 2 runs successfully"
+Assert-True ($parallel -match "Mappings: 0 written") "Parallel build matches serial output ($($parallel.Trim()))"
+
 # Check Spain DNV vs SafetyWing mapping has RED status (unauthorized)
 $mapping = Get-Content "data/mappings/ES_DNV_BLS_LONDON_2026__SAFETYWING_NOMAD_2026.json" | ConvertFrom-Json
 Assert-True ($mapping.status -eq "RED") "SafetyWing unauthorized in Spain produces RED"
@@ -34,6 +44,333 @@ $mapping = Get-Content "data/mappings/ES_DNV_BLS_LONDON_2026__GENERIC_EXPAT_COMP
 $hasPublicRisk = $mapping.missing | Where-Object { $_ -eq "specs.covers_public_health_system_risks" }
 Assert-True ($null -ne $hasPublicRisk) "Missing public health system risks coverage is tracked"
 
+# Compiled visa plans must evaluate exactly like the per-rule checks they skip
+$tmp = Join-Path ([System.IO.Path]::GetTempPath()) ("plan_check_" + [System.Guid]::NewGuid().ToString() + ".py")
+$planScript = @'
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path.cwd()))
+from tools.engine import RULES, compile_visa, evaluate
+
+def load(folder):
+    return [json.loads(p.read_text(encoding="utf-8")) for p in sorted(Path(folder).rglob("*.json"))]
+
+visas = load("data/visas")
+products = load("data/products")
+for visa in visas:
+    plan = compile_visa(visa)
+    planned = {id(rule) for rule, _ in plan.checks}
+    for product in products:
+        if plan.evaluate(product) != evaluate(visa, product):
+            sys.exit(f"plan mismatch: {visa['id']} x {product['id']}")
+        for rule in RULES:
+            if id(rule) not in planned and rule.check(visa, product) is not None:
+                sys.exit(f"skipped rule applies: {rule.name} for {visa['id']}")
+'@
+Set-Content -Path $tmp -Value $planScript -Encoding UTF8
+$proc = Start-Process -FilePath "py" -ArgumentList $tmp -Wait -PassThru -NoNewWindow
+Remove-Item $tmp -ErrorAction SilentlyContinue
+Assert-True ($proc.ExitCode -eq 0) "Compiled visa plans match per-rule evaluation"
+
+# Generated evaluators (rules.table) must match the per-rule loop, malformed specs included
+$tmp = Join-Path ([System.IO.Path]::GetTempPath()) ("generated_check_" + [System.Guid]::NewGuid().ToString() + ".py")
+$generatedScript = @'
+import random
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path.cwd()))
+from tools.dataset import load_dataset
+from tools.engine import compile_visa
+from tools.synth_catalogue import make_product, make_visa
+
+dataset = load_dataset()
+rng = random.Random(5)
+source = {"source_id": "SYNTH", "url": "https://example.invalid", "retrieved_at": "2026-01-01", "sha256": "0", "local_path": "x"}
+visas = dataset.visas + [make_visa(rng, i, source) for i in range(30)]
+for i, code in enumerate(["PT", "es", "ES", 7, "", True, ["ES", "PT"], "es-ES"]):
+    visa = make_visa(rng, i, source)
+    visa["id"] = f"AUTH_{i}_{visa['id']}"
+    visa["requirements"].append({"key": "insurance.authorized_in", "op": "==", "value": code, "evidence": []})
+    visas.append(visa)
+products = dataset.products + [make_product(rng, i, source) for i in range(300)]
+products += [
+    {"id": "NO_SPECS"},
+    {"id": "LIST_SPECS", "specs": []},
+    {"id": "FLAT_DEDUCTIBLE", "specs": {"deductible": 100, "jurisdiction_facts": {"ES": None}}},
+    {"id": "ODD_TYPES", "specs": {"type": 7, "payment_cadence": ["monthly"], "copay": "yes", "comprehensive": 0}},
+    {"id": "PT_ONLY", "specs": {"jurisdiction_facts": {"PT": {"authorized": False}}}},
+]
+for visa in visas:
+    generated = compile_visa(visa)
+    looped = compile_visa(visa, generate=False)
+    if "evaluate" not in vars(generated) or "evaluate" in vars(looped):
+        sys.exit(f"no generated evaluator for {visa['id']}")
+    for product in products:
+        if generated.evaluate(product) != looped.evaluate(product):
+            sys.exit(f"generated evaluator differs: {visa['id']} x {product['id']}")
+
+# Rules outside the table are merged by engine.merge, the step combine() uses
+unlimited = next(v for v in visas if any(r["key"] == "insurance.unlimited_coverage" for r in v["requirements"]))
+if "status = MERGE(status, result, reasons, missing)" not in compile_visa(unlimited).evaluate.source:
+    sys.exit("generated evaluator does not merge bound check results with engine.merge")
+'@
+Set-Content -Path $tmp -Value $generatedScript -Encoding UTF8
+$proc = Start-Process -FilePath "py" -ArgumentList $tmp -Wait -PassThru -NoNewWindow
+Remove-Item $tmp -ErrorAction SilentlyContinue
+Assert-True ($proc.ExitCode -eq 0) "Generated visa evaluators match the per-rule loop"
+
+# insurance.authorized_in checks any jurisdiction, and the insurer registry
+# decides the verdict for every product from that insurer
+$tmp = Join-Path ([System.IO.Path]::GetTempPath()) ("authorized_in_check_" + [System.Guid]::NewGuid().ToString() + ".py")
+$authorizedScript = @'
+import copy
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path.cwd()))
+from tools.authorizations import AuthorizationRegistry
+from tools.dataset import Dataset, FileCache, INSURERS, PRODUCTS, VISAS, load_authorizations, scan
+from tools.engine import compile_visa, evaluate
+from tools.spec_changes import explain
+
+cache = FileCache()
+visa_records, product_records, insurer_records = scan(cache, VISAS), scan(cache, PRODUCTS), scan(cache, INSURERS)
+dataset = Dataset(visa_records, product_records, [], [], insurer_records)
+spain = dataset.visas_by_id["ES_DNV_BLS_LONDON_2026"]
+
+# authorized_in "ES" is the generic form of authorized_in_spain
+generic = copy.deepcopy(spain)
+for req in generic["requirements"]:
+    if req["key"] == "insurance.authorized_in_spain":
+        req.update(key="insurance.authorized_in", value="ES")
+for product in dataset.products:
+    if evaluate(spain, product) != evaluate(generic, product):
+        sys.exit(f"authorized_in ES differs from authorized_in_spain for {product['id']}")
+
+portugal = copy.deepcopy(generic)
+for req in portugal["requirements"]:
+    if req["key"] == "insurance.authorized_in":
+        req["value"] = "PT"
+result = evaluate(portugal, {"id": "P", "specs": {"jurisdiction_facts": {"PT": {"authorized": False}}}})
+if result["status"] != "RED" or not any(r["text"] == "Insurer not authorized to operate in Portugal" for r in result["reasons"]):
+    sys.exit(f"authorized_in PT not enforced: {result}")
+if "specs.jurisdiction_facts.PT.authorized" not in evaluate(portugal, {"id": "P", "specs": {}})["missing"]:
+    sys.exit("missing PT authorization is not UNKNOWN")
+# A value that names no jurisdiction fails closed: UNKNOWN, never a silent pass
+denied = {"id": "P", "specs": {"jurisdiction_facts": {"ES": {"authorized": False}, "PT": {"authorized": False}}}}
+for value in (True, ["ES", "PT"], "es-ES"):
+    odd = copy.deepcopy(portugal)
+    for req in odd["requirements"]:
+        if req["key"] == "insurance.authorized_in":
+            req["value"] = value
+    result = evaluate(odd, denied)
+    if result["status"] == "GREEN" or "requirements.insurance.authorized_in" not in result["missing"]:
+        sys.exit(f"authorized_in {value!r} did not fail closed: {result}")
+    if result != compile_visa(odd).evaluate(denied) or explain([odd], [denied])["unreachable_visas"] != [odd["id"]]:
+        sys.exit(f"authorized_in {value!r} is not UNKNOWN in every evaluator")
+
+changes = explain([portugal], [{"id": "P", "provider": "X", "specs": {"jurisdiction_facts": {"PT": {"authorized": False}}}}])["pairs"]
+if not changes or "jurisdiction_facts.PT.authorized" not in [c["field"] for c in changes[0]["changes"]]:
+    sys.exit(f"spec changes do not name the PT authorization: {changes}")
+
+# One registry edit reaches every product of the insurer, whatever the product files say
+plan = compile_visa(spain)
+safetywing = [p for p in dataset.products if p.get("provider") == "SafetyWing"]
+if not safetywing or not all("not authorized" in str(plan.evaluate(p)["reasons"]) for p in safetywing):
+    sys.exit("SafetyWing should fail the Spain authorization with the shipped registry")
+if dataset.authorizations.lookup("safetywing", "es")["authorized"] is not False:
+    sys.exit("registry lookup by provider and jurisdiction failed")
+twin = copy.deepcopy(product_records[[r.data["id"] for r in product_records].index(safetywing[0]["id"])])
+twin = twin._replace(data={**twin.data, "id": "SAFETYWING_TWIN"})
+edited = [
+    r._replace(data={**r.data, "authorizations": {"ES": {"authorized": True, "evidence": []}}})
+    if r.data["provider"] == "SafetyWing" else r
+    for r in insurer_records
+]
+updated = Dataset(visa_records, product_records + [twin], [], [], edited)
+for product_id in (safetywing[0]["id"], "SAFETYWING_TWIN"):
+    if "not authorized" in str(plan.evaluate(updated.products_by_id[product_id])["reasons"]):
+        sys.exit(f"registry update did not reach {product_id}")
+before = {r.data["id"]: r.sha256 for r in dataset.product_records}
+after = {r.data["id"]: r.sha256 for r in updated.product_records}
+if before[safetywing[0]["id"]] == after[safetywing[0]["id"]] or before["DKV_VISADO_2026"] != after["DKV_VISADO_2026"]:
+    sys.exit("product hashes must change with their insurer's registry entry only")
+if any(json.loads(r.path.read_text(encoding="utf-8")) != r.data for r in product_records):
+    sys.exit("registry facts leaked into cached product files")
+
+# A product file read directly is pre-registry; apply() makes it the Dataset's product
+for registry, loaded in ((load_authorizations(cache), dataset), (updated.authorizations, updated)):
+    for record in product_records:
+        if evaluate(spain, registry.apply(record.data)) != evaluate(spain, loaded.products_by_id[record.data["id"]]):
+            sys.exit(f"raw product plus registry differs from the Dataset product for {record.data['id']}")
+raw = next(r.data for r in product_records if r.data["provider"] == "SafetyWing")
+if evaluate(spain, raw) == evaluate(spain, updated.products_by_id[raw["id"]]):
+    sys.exit("the edited registry should change the SafetyWing verdict of its raw product file")
+
+# An undecided registry entry never overrides a product's own decided fact
+undecided = AuthorizationRegistry([{"provider": "X", "authorizations": {"ES": {"authorized": None, "evidence": []}, "PT": {"authorized": None, "evidence": []}}}])
+decided = AuthorizationRegistry([{"provider": "X", "authorizations": {"ES": {"authorized": False, "evidence": []}}}])
+product = {"id": "X1", "provider": "X", "specs": {"jurisdiction_facts": {"ES": {"authorized": True}}}}
+facts = undecided.apply(product)["specs"]["jurisdiction_facts"]
+if facts["ES"]["authorized"] is not True or facts["PT"]["authorized"] is not None:
+    sys.exit(f"an undecided registry entry replaced a decided product fact: {facts}")
+if decided.apply(product)["specs"]["jurisdiction_facts"]["ES"]["authorized"] is not False:
+    sys.exit("a decided registry entry did not override the product's fact")
+if plan.evaluate(undecided.apply(product)) != plan.evaluate(product):
+    sys.exit("an undecided registry entry changed a verdict")
+'@
+Set-Content -Path $tmp -Value $authorizedScript -Encoding UTF8
+$proc = Start-Process -FilePath "py" -ArgumentList $tmp -WorkingDirectory $root -Wait -PassThru -NoNewWindow
+Remove-Item $tmp -ErrorAction SilentlyContinue
+Assert-True ($proc.ExitCode -eq 0) "authorized_in checks any jurisdiction and follows the insurer registry"
+
+# Columnar batch evaluator must match the scalar engine exactly
+$tmp = Join-Path ([System.IO.Path]::GetTempPath()) ("matrix_check_" + [System.Guid]::NewGuid().ToString() + ".py")
+$matrixScript = @'
+import copy
+import itertools
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path.cwd()))
+try:
+    from tools.matrix import evaluate_matrix
+except ImportError:
+    sys.exit(3)
+from tools.engine import compile_visa, evaluate
+
+def load(folder):
+    return [json.loads(p.read_text(encoding="utf-8")) for p in sorted(Path(folder).rglob("*.json"))]
+
+visas = load("data/visas")
+products = load("data/products")
+
+# Variants exercising RED/UNKNOWN/YELLOW branches the catalogue does not hit
+overrides = {
+    "copay": [True, None],
+    "deductible": [{"amount": 150}, None, {"amount": "high"}],
+    "moratorium_days": [0, None, "30 days"],
+    "payment_cadence": ["every_4_weeks", None],
+    "unlimited": [False, True],
+    "overall_limit": [25000, None, "lots"],
+    "type": ["Travel Medical", None],
+    "comprehensive": [False],
+    "jurisdiction_facts": [{"ES": {"authorized": False}}, {}],
+}
+for base, (field, values) in itertools.product(products[:3], list(overrides.items())):
+    for value in values:
+        variant = copy.deepcopy(base)
+        variant["id"] = f"{base['id']}__{field}_{len(products)}"
+        variant["specs"][field] = value
+        products.append(variant)
+
+# A requirement that is not a number leaves its rule UNKNOWN, not a type error
+bad_visas = []
+for visa in visas:
+    if any(r["key"] == "insurance.min_coverage" for r in visa["requirements"]):
+        bad = copy.deepcopy(visa)
+        bad["id"] += "__text_min_coverage"
+        for req in bad["requirements"]:
+            if req["key"] == "insurance.min_coverage":
+                req["value"] = "50000 EUR"
+        bad_visas.append(bad)
+if not bad_visas:
+    sys.exit("no visa with a minimum coverage requirement")
+visas += bad_visas
+
+matrix = evaluate_matrix(visas, products)
+for visa, row in zip(visas, matrix):
+    plan = compile_visa(visa)
+    for product, result in zip(products, row):
+        expected = json.dumps(evaluate(visa, product))
+        if json.dumps(result) != expected:
+            sys.exit(f"matrix mismatch: {visa['id']} x {product['id']}")
+        if json.dumps(plan.evaluate(product)) != expected:
+            sys.exit(f"generated evaluator mismatch: {visa['id']} x {product['id']}")
+
+for visa in bad_visas:
+    for product in products:
+        result = evaluate(visa, product)
+        if result["status"] != "NOT_REQUIRED" and "requirements.insurance.min_coverage" not in result["missing"]:
+            sys.exit(f"text requirement not UNKNOWN: {visa['id']} x {product['id']}")
+lots = [p for p in products if p["specs"].get("overall_limit") == "lots"]
+visa = next(v for v in visas if v["id"] + "__text_min_coverage" == bad_visas[0]["id"])
+if "specs.overall_limit" not in evaluate(visa, lots[0])["missing"]:
+    sys.exit("text overall_limit not treated as missing")
+'@
+Set-Content -Path $tmp -Value $matrixScript -Encoding UTF8
+$proc = Start-Process -FilePath "py" -ArgumentList $tmp -Wait -PassThru -NoNewWindow
+Remove-Item $tmp -ErrorAction SilentlyContinue
+if ($proc.ExitCode -eq 3) {
+  Write-Host "SKIP: numpy not available for matrix equivalence check" -ForegroundColor Yellow
+} else {
+  Assert-True ($proc.ExitCode -eq 0) "evaluate_matrix matches evaluate for every visa/product pair"
+}
+
+# Rule instrumentation must not change results, and both evaluators must count alike
+$tmp = Join-Path ([System.IO.Path]::GetTempPath()) ("profile_check_" + [System.Guid]::NewGuid().ToString() + ".py")
+$profileScript = @'
+import json
+import random
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path.cwd()))
+from tools import instrumentation
+from tools.engine import compile_visa, evaluate
+from tools.synth_catalogue import make_product, make_visa
+
+rng = random.Random(3)
+source = {"source_id": "S", "url": "u", "retrieved_at": "r", "sha256": "x", "local_path": "p"}
+visas = [make_visa(rng, i, source) for i in range(30)]
+products = [make_product(rng, i, source) for i in range(300)]
+
+plain = [evaluate(v, p) for v in visas for p in products]
+stats = instrumentation.enable()
+plans = [compile_visa(v) for v in visas]
+profiled = [plan.evaluate(p) for plan in plans for p in products]
+instrumentation.disable()
+if plain != profiled:
+    sys.exit("instrumented evaluation changed results")
+scalar = stats.to_dict()
+calls = sum(r["calls"] for r in scalar.values())
+if calls == 0 or any(sum(r["outcomes"].values()) != r["calls"] for r in scalar.values()):
+    sys.exit("outcome counts do not add up to calls")
+if scalar["MandatoryInsurance"]["terminal"] == 0:
+    sys.exit("terminal short-circuits not counted")
+if "visafact_rule_calls_total" not in stats.to_prometheus():
+    sys.exit("prometheus export missing counters")
+json.loads(stats.to_json())
+
+try:
+    from tools.matrix import evaluate_matrix
+except ImportError:
+    print("SKIP: numpy not installed")
+    sys.exit(0)
+strip = lambda d: {k: {f: v[f] for f in ("binds", "skipped_binds", "calls", "outcomes", "terminal")} for k, v in d.items()}
+columnar = instrumentation.enable()
+evaluate_matrix(visas, products)
+instrumentation.disable()
+if strip(columnar.to_dict()) != strip(scalar):
+    sys.exit("columnar counters differ from per-product counters")
+'@
+Set-Content -Path $tmp -Value $profileScript -Encoding UTF8
+$proc = Start-Process -FilePath "py" -ArgumentList $tmp -Wait -PassThru -NoNewWindow
+Remove-Item $tmp -ErrorAction SilentlyContinue
+Assert-True ($proc.ExitCode -eq 0) "Rule instrumentation counts calls and outcomes without changing results"
+
+$profilePath = Join-Path ([System.IO.Path]::GetTempPath()) ("rules_" + [System.Guid]::NewGuid().ToString() + ".prom")
+$proc = Start-Process -FilePath "py" -ArgumentList @("tools/build_mappings.py", "--profile-rules", $profilePath) -Wait -PassThru -NoNewWindow
+Assert-True ($proc.ExitCode -eq 0) "build_mappings --profile-rules runs"
+$prom = Get-Content -Raw -Path $profilePath
+Remove-Item $profilePath -ErrorAction SilentlyContinue
+Assert-True ($prom -match 'visafact_rule_terminal_total\{rule="MandatoryInsurance"\}') "Prometheus profile reports terminal short-circuits"
+
 if ($failed) {
   Write-Error "One or more checks failed."
   exit 1
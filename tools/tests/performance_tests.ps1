@@ -22,6 +22,17 @@ Assert-True ($uiSize -lt 102400) "ui/index.html under 100KB ($uiSize bytes)"
 $indexSize = (Get-Item "data/ui_index.json").Length
 Assert-True ($indexSize -lt 512000) "ui_index.json under 500KB ($indexSize bytes)"
 
+# Sharded index: first paint only pays for the manifest plus one visa shard
+$pointerPath = "data/ui_index/current.json"
+Assert-True (Test-Path $pointerPath) "sharded index pointer exists"
+if (Test-Path $pointerPath) {
+  $pointer = Get-Content -Raw -Path $pointerPath | ConvertFrom-Json
+  $manifestSize = (Get-Item (Join-Path "data/ui_index" $pointer.manifest)).Length
+  Assert-True ($manifestSize -lt 102400) "sharded index manifest under 100KB ($manifestSize bytes)"
+  $largestShard = Get-ChildItem -Path "data/ui_index/visas" -Filter "*.json" | Sort-Object Length -Descending | Select-Object -First 1
+  Assert-True ($null -ne $largestShard -and $largestShard.Length -lt 204800) "largest visa shard under 200KB ($($largestShard.Length) bytes)"
+}
+
 if ($failed) {
   Write-Error "One or more checks failed."
   exit 1
@@ -0,0 +1,202 @@
+$ErrorActionPreference = "Stop"
+$failed = $false
+
+function Assert-True {
+  param([bool]$Condition, [string]$Message)
+  if (-not $Condition) { Write-Host "FAIL: $Message" -ForegroundColor Red; $script:failed = $true }
+  else { Write-Host "PASS: $Message" -ForegroundColor Green }
+}
+
+$root = Split-Path -Parent (Split-Path -Parent $PSScriptRoot)
+
+$proc = Start-Process -FilePath "py" -ArgumentList "tools/build_mappings.py" -WorkingDirectory $root -Wait -PassThru -NoNewWindow
+Assert-True ($proc.ExitCode -eq 0) "build_mappings runs"
+
+# The service must answer exactly what build_mappings wrote, singly and in batches
+$tmp = Join-Path ([System.IO.Path]::GetTempPath()) ("serve_check_" + [System.Guid]::NewGuid().ToString() + ".py")
+$serveScript = @'
+import http.client
+import json
+import sys
+import threading
+import urllib.request
+from pathlib import Path
+
+sys.path.insert(0, str(Path.cwd()))
+import tools.serve
+from tools.serve import make_server
+
+server = make_server("127.0.0.1", 0)
+threading.Thread(target=server.serve_forever, daemon=True).start()
+base = f"http://127.0.0.1:{server.server_address[1]}"
+
+def get(path):
+    try:
+        with urllib.request.urlopen(base + path) as res:
+            return res.status, json.loads(res.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+pairs = []
+for path in sorted(Path("data/mappings").glob("*.json")):
+    expected = json.loads(path.read_text(encoding="utf-8"))
+    status, got = get(f"/evaluate?visa={expected['visa_id']}&product={expected['product_id']}")
+    if status != 200 or got != expected:
+        sys.exit(f"GET /evaluate differs from {path}")
+    pairs.append((expected, {"visa": expected["visa_id"], "product": expected["product_id"]}))
+
+request = urllib.request.Request(
+    base + "/evaluate",
+    data=json.dumps({"pairs": [p for _, p in pairs] + [{"visa": "NOPE", "product": "NOPE"}]}).encode("utf-8"),
+    headers={"Content-Type": "application/json"},
+)
+with urllib.request.urlopen(request) as res:
+    results = json.loads(res.read())["results"]
+if results[:-1] != [e for e, _ in pairs] or "error" not in results[-1]:
+    sys.exit("POST /evaluate batch differs from data/mappings")
+if get("/evaluate?visa=NOPE&product=NOPE")[0] != 404 or get("/evaluate")[0] != 400:
+    sys.exit("bad requests not rejected")
+
+# Numbers given as text are UNKNOWN facts, not evaluation errors
+server.engine.snapshot.products["TEXT"] = {"id": "TEXT", "specs": {"overall_limit": "lots", "deductible": {"amount": "x"}}}
+answers = [get(f"/evaluate?visa={e['visa_id']}&product=TEXT") for e, _ in pairs]
+if not all(status == 200 and "status" in body for status, body in answers):
+    sys.exit("text numbers did not evaluate")
+del server.engine.snapshot.products["TEXT"]
+
+# An evaluation that raises gets a JSON error, not a dropped connection
+class BrokenPlan:
+    def evaluate(self, product):
+        raise TypeError("cannot compare")
+
+server.engine.snapshot.plans["BROKEN"] = BrokenPlan()
+status, body = get(f"/evaluate?visa=BROKEN&product={pairs[0][1]['product']}")
+if status != 500 or "error" not in body:
+    sys.exit("an evaluation error did not answer 500 with a JSON body")
+request = urllib.request.Request(
+    base + "/evaluate",
+    data=json.dumps({"pairs": [pairs[0][1], {"visa": "BROKEN", "product": pairs[0][1]["product"]}, {"visa": "X"}, 7]}).encode("utf-8"),
+    headers={"Content-Type": "application/json"},
+)
+with urllib.request.urlopen(request) as res:
+    results = json.loads(res.read())["results"]
+if len(results) != 4 or results[0] != pairs[0][0] or not all("error" in r for r in results[1:]):
+    sys.exit("POST /evaluate did not report per-pair evaluation errors")
+del server.engine.snapshot.plans["BROKEN"]
+def post(path, payload):
+    request = urllib.request.Request(base + path, data=json.dumps(payload).encode("utf-8"), headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(request) as res:
+            return res.status, json.loads(res.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+# A draft starting from a catalogue product answers what the catalogue does, then follows its edits
+expected, pair = pairs[0]
+status, draft = post("/what_if", {"base": pair["product"], "patch": {}})
+if status != 200 or draft["mappings"][pair["visa"]] != expected:
+    sys.exit("POST /what_if on an unchanged base differs from data/mappings")
+status, edited = post("/what_if", {"session": draft["session"], "patch": {"payment_cadence": "monthly"}})
+if status != 200 or edited["session"] != draft["session"] or set(edited["mappings"]) != set(draft["mappings"]):
+    sys.exit("POST /what_if did not continue the session")
+if post("/what_if", {"base": "NOPE", "patch": {}})[0] != 404 or post("/what_if", {"patch": []})[0] != 400:
+    sys.exit("bad what_if requests not rejected")
+count = len(server.engine.snapshot.sessions)
+status, missing = post("/what_if", {"session": "expired", "patch": {"payment_cadence": "monthly"}})
+if status != 404 or "error" not in missing or len(server.engine.snapshot.sessions) != count:
+    sys.exit("an unknown what_if session was not rejected with 404")
+
+# A patch the rules cannot evaluate answers 400 and keeps the sessions as they were
+class Rejecting(tools.serve.WhatIf):
+    def what_if(self, patch):
+        if "unreadable" in patch:
+            raise ValueError("cannot evaluate unreadable")
+        return super().what_if(patch)
+
+sessions = server.engine.snapshot.sessions
+sessions[draft["session"]].__class__ = Rejecting
+status, rejected = post("/what_if", {"session": draft["session"], "patch": {"unreadable": 1}})
+if status != 400 or "error" not in rejected:
+    sys.exit(f"a what_if patch that cannot be evaluated was not rejected with 400: {status}")
+status, after = post("/what_if", {"session": draft["session"], "patch": {"payment_cadence": "monthly"}})
+if status != 200 or after["mappings"] != edited["mappings"]:
+    sys.exit("a rejected what_if patch changed the session")
+count = len(sessions)
+original, tools.serve.WhatIf = tools.serve.WhatIf, Rejecting
+status, _ = post("/what_if", {"patch": {"unreadable": 1}})
+tools.serve.WhatIf = original
+if status != 400 or len(sessions) != count:
+    sys.exit("a rejected first patch kept its new session")
+
+# A slow draft holds only its own session: other sessions are answered meanwhile
+entered, gate = threading.Event(), threading.Event()
+
+class Blocking(original):
+    def what_if(self, patch):
+        if "wait" in patch:
+            entered.set()
+            gate.wait(10)
+            patch = {}
+        return super().what_if(patch)
+
+sessions[draft["session"]].__class__ = Blocking
+slow = threading.Thread(target=post, args=("/what_if", {"session": draft["session"], "patch": {"wait": 1}}))
+slow.start()
+entered.wait(30)
+status, other = post("/what_if", {"base": pair["product"], "patch": {"payment_cadence": "monthly"}})
+answered_first = slow.is_alive()
+gate.set()
+slow.join()
+if status != 200 or not answered_first:
+    sys.exit("a slow what_if session blocked another session")
+# A Content-Length that is not a length answers 400 instead of reading until the client leaves
+for length in ("abc", "-1"):
+    conn = http.client.HTTPConnection("127.0.0.1", server.server_address[1], timeout=10)
+    conn.putrequest("POST", "/evaluate")
+    conn.putheader("Content-Length", length)
+    conn.endheaders()
+    res = conn.getresponse()
+    if res.status != 400 or "error" not in json.loads(res.read()):
+        sys.exit(f"Content-Length {length} was not rejected with 400")
+    conn.close()
+# A malformed facts file keeps the last good snapshot, and the watcher outlives any failed pass
+engine = server.engine
+good = engine.snapshot
+real_stamps, real_load = tools.serve.facts_stamps, tools.serve.load_dataset
+for n, failure in enumerate((AttributeError("'list' object has no attribute 'get'"), KeyError("id"))):
+    tools.serve.facts_stamps = lambda n=n: {"changed": n}
+    def broken(failure=failure):
+        raise failure
+    tools.serve.load_dataset = broken
+    if engine.reload_if_changed() or engine.snapshot is not good or not engine.reload_error:
+        sys.exit(f"a reload failing with {type(failure).__name__} replaced the snapshot")
+    if get("/health")[1].get("reload_error") != engine.reload_error:
+        sys.exit("/health does not report the failed reload")
+passes = []
+def failing_stamps():
+    passes.append(1)
+    raise OSError("facts directory vanished")
+tools.serve.facts_stamps = failing_stamps
+stop = threading.Event()
+watcher = threading.Thread(target=engine.watch, args=(0.01, stop), daemon=True)
+watcher.start()
+while len(passes) < 3 and watcher.is_alive():
+    stop.wait(0.01)
+alive = watcher.is_alive()
+stop.set()
+watcher.join(10)
+tools.serve.facts_stamps, tools.serve.load_dataset = real_stamps, real_load
+if not alive or engine.snapshot is not good:
+    sys.exit("the watcher thread stopped after a failed pass")
+status, stats = get("/stats")
+if stats["GET /evaluate"]["count"] < len(pairs) or "p99_ms" not in stats["GET /evaluate"]:
+    sys.exit("latency stats missing")
+server.shutdown()
+'@
+Set-Content -Path $tmp -Value $serveScript -Encoding UTF8
+$proc = Start-Process -FilePath "py" -ArgumentList $tmp -WorkingDirectory $root -Wait -PassThru -NoNewWindow
+Remove-Item $tmp -ErrorAction SilentlyContinue
+Assert-True ($proc.ExitCode -eq 0) "evaluation service matches data/mappings, keeps what-if drafts and reports latency"
+
+if ($failed) { Write-Error "Serve tests failed."; exit 1 }
+Write-Host "All checks passed." -ForegroundColor Green
@@ -45,6 +45,55 @@ try {
   Assert-True ($manifest.snapshot_id -eq $snapshotId) "manifest snapshot_id matches"
   $uiEntry = $manifest.files | Where-Object { $_.path -eq "ui_index.json" }
   Assert-True ($null -ne $uiEntry) "manifest includes ui_index.json entry"
+  Assert-True (Test-Path (Join-Path $snapshotRoot "objects")) "snapshot files are stored in the object store"
+
+  $proc2 = Start-Process -FilePath "py" -ArgumentList "tools/build_snapshot.py" -WorkingDirectory $root -Wait -PassThru
+  Assert-True ($proc2.ExitCode -eq 0) "build_snapshot.py rebuilds an existing snapshot"
+  $proc3 = Start-Process -FilePath "py" -ArgumentList @("tools/verify_snapshot_manifest.py", "--snapshot-dir", $snapshotDir) -WorkingDirectory $root -Wait -PassThru
+  Assert-True ($proc3.ExitCode -eq 0) "rebuilt snapshot verifies"
+
+  $tmp = Join-Path ([System.IO.Path]::GetTempPath()) ("snapshot_store_" + [System.Guid]::NewGuid().ToString() + ".py")
+  $storeScript = @'
+import os
+import stat
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path.cwd()))
+from tools.snapshot_store import HashCache, ObjectStore
+
+work = Path(tempfile.mkdtemp())
+src = work / "src"
+(src / "a").mkdir(parents=True)
+(src / "a" / "one.json").write_text("{}", encoding="utf-8")
+(src / "two.json").write_text("{}", encoding="utf-8")
+(src / "three.json").write_text("[]", encoding="utf-8")
+inputs = [(p, p.relative_to(src).as_posix()) for p in src.rglob("*.json")]
+
+store = ObjectStore(work / "objects", HashCache(work / "hashes.json"))
+files = store.build(work / "s1", inputs)
+if store.stats["stored"] != 2 or len(files) != 3:
+    sys.exit(f"identical files must share one object: {store.stats}")
+obj = store.object_path(files[-1]["sha256"])
+if store.stats["linked"] and os.stat(work / "s1" / "two.json").st_ino != os.stat(obj).st_ino:
+    sys.exit("snapshot file is not a link to its object")
+if os.stat(obj).st_mode & stat.S_IWUSR:
+    sys.exit("objects must be read-only")
+
+(src / "three.json").write_text("[1]", encoding="utf-8")
+store.build(work / "s1", inputs)
+if store.stats["stored"] != 3:
+    sys.exit(f"changed file must add one object: {store.stats}")
+removed = store.prune([])
+if removed != 3 or any((work / "objects").glob("*/*")):
+    sys.exit(f"prune without manifests must remove every object, removed {removed}")
+'@
+  Set-Content -Path $tmp -Value $storeScript -Encoding UTF8
+  $procStore = Start-Process -FilePath "py" -ArgumentList @($tmp) -WorkingDirectory $root -Wait -PassThru -NoNewWindow
+  Remove-Item $tmp -ErrorAction SilentlyContinue
+  Assert-True ($procStore.ExitCode -eq 0) "object store dedupes, links read-only objects and prunes"
 } finally {
   try {
     Remove-SnapshotDir -Path $snapshotRoot
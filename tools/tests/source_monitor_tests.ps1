@@ -68,6 +68,77 @@ try {
   Remove-Item -LiteralPath $out1, $out2, $statusPath, $reportPath -Force -ErrorAction SilentlyContinue
 }
 
+# Live mode against a local server: retries a 503, then revalidates with ETags
+$tmp = Join-Path ([System.IO.Path]::GetTempPath()) ("source_monitor_" + [System.Guid]::NewGuid().ToString() + ".py")
+$httpScript = @'
+import hashlib
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path.cwd()))
+from tools.check_source_changes import STATE, check_sources
+
+# The validator store belongs to the repository, wherever the tool runs from
+if not STATE.is_absolute() or STATE != Path.cwd() / "data" / ".cache" / "source_validators.json":
+    sys.exit("STATE depends on the working directory")
+
+BODY = b"official wording\n" * 1000
+ETAG = '"v1"'
+seen = {"bodies": 0, "not_modified": 0, "flaky": 0}
+
+class Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == "/flaky" and seen["flaky"] == 0:
+            seen["flaky"] += 1
+            self.send_response(503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if self.headers.get("If-None-Match") == ETAG:
+            seen["not_modified"] += 1
+            self.send_response(304)
+            self.send_header("ETag", ETAG)
+            self.end_headers()
+            return
+        seen["bodies"] += 1
+        self.send_response(200)
+        self.send_header("ETag", ETAG)
+        self.send_header("Content-Length", str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+    def log_message(self, *args):
+        pass
+
+server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+threading.Thread(target=server.serve_forever, daemon=True).start()
+base = f"http://127.0.0.1:{server.server_address[1]}"
+digest = hashlib.sha256(BODY).hexdigest()
+sources = [{"source_id": f"S{i}", "url": f"{base}/page{i}", "sha256": digest} for i in range(8)]
+sources.append({"source_id": "FLAKY", "url": f"{base}/flaky", "sha256": digest})
+sources.append({"source_id": "MOVED", "url": f"{base}/moved", "sha256": "0" * 64})
+
+state = {}
+changed, counts = check_sources(sources, state=state, jobs=8, per_host=2, backoff=0.01)
+if [c["source_id"] for c in changed] != ["MOVED"] or counts["errors"]:
+    sys.exit(f"first run: {changed} {counts}")
+if seen["bodies"] != 10 or seen["flaky"] != 1:
+    sys.exit(f"first run should download every body once after one retry: {seen}")
+
+changed, counts = check_sources(sources, state=state, jobs=8, per_host=2, backoff=0.01)
+if [c["source_id"] for c in changed] != ["MOVED"] or counts["not_modified"] != 10:
+    sys.exit(f"second run should be all 304s: {changed} {counts}")
+if seen["bodies"] != 10:
+    sys.exit(f"304 responses must not download bodies: {seen}")
+server.shutdown()
+'@
+Set-Content -Path $tmp -Value $httpScript -Encoding UTF8
+$procHttp = Start-Process -FilePath "py" -ArgumentList @($tmp) -WorkingDirectory $root -Wait -PassThru -NoNewWindow
+Remove-Item $tmp -ErrorAction SilentlyContinue
+Assert-True ($procHttp.ExitCode -eq 0) "conditional requests skip downloads of unchanged sources"
+
 if ($failed) {
   Write-Error "One or more checks failed."
   exit 1
@@ -0,0 +1,100 @@
+$ErrorActionPreference = "Stop"
+$failed = $false
+
+function Assert-True {
+  param([bool]$Condition, [string]$Message)
+  if (-not $Condition) { Write-Host "FAIL: $Message" -ForegroundColor Red; $script:failed = $true }
+  else { Write-Host "PASS: $Message" -ForegroundColor Green }
+}
+
+$root = Split-Path -Parent (Split-Path -Parent $PSScriptRoot)
+
+# Constraints must agree with the engine: GREEN exactly when nothing fails,
+# and applying the suggested changes must make the pair GREEN
+$tmp = Join-Path ([System.IO.Path]::GetTempPath()) ("spec_changes_check_" + [System.Guid]::NewGuid().ToString() + ".py")
+$specScript = @'
+import json
+import random
+import subprocess
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path.cwd()))
+from tools.dataset import load_dataset
+from tools.engine import compile_visa
+from tools.spec_changes import apply_changes, explain
+from tools.synth_catalogue import make_product, make_visa
+
+
+def check(visas, products, label):
+    report = explain(visas, products)
+    pairs = {(p["visa_id"], p["product_id"]): p["changes"] for p in report["pairs"]}
+    conflicts = {(c["visa_id"], c["product_id"]) for c in report["conflicts"]}
+    for visa in visas:
+        plan = compile_visa(visa)
+        for product in products:
+            key = (visa["id"], product["id"])
+            status = plan.evaluate(product)["status"]
+            if visa["id"] in report["not_required_visas"]:
+                ok = status == "NOT_REQUIRED"
+            elif visa["id"] in report["unreachable_visas"]:
+                ok = status not in ("GREEN", "NOT_REQUIRED") and key not in pairs
+            elif key in pairs:
+                ok = status != "GREEN" and plan.evaluate(apply_changes(product, pairs[key]))["status"] == "GREEN"
+            elif key in conflicts:
+                ok = status != "GREEN"
+            else:
+                ok = status == "GREEN"
+            if not ok:
+                sys.exit(f"{label}: constraints disagree with the engine for {key} ({status}, {pairs.get(key)})")
+    singles = sum(1 for changes in pairs.values() if len(changes) == 1)
+    if sum(entry["pairs"] for entry in report["ranking"]) != singles:
+        sys.exit(f"{label}: ranking does not count every single-change pair")
+    return report
+
+
+dataset = load_dataset()
+report = check(dataset.visas, dataset.products, "catalogue")
+
+rng = random.Random(7)
+source = {"source_id": "SYNTH", "url": "https://example.invalid", "retrieved_at": "2026-01-01", "sha256": "0", "local_path": "x"}
+check([make_visa(rng, i, source) for i in range(20)], [make_product(rng, i, source) for i in range(300)], "synthetic")
+
+# A requirement the rule cannot compare is unreachable, not "does not require insurance"
+visa = json.loads(json.dumps(dataset.visas[0]))
+visa["id"] = "XX_STRING_MIN_COVERAGE"
+visa["requirements"] = [r for r in visa["requirements"] if r["key"] not in ("insurance.mandatory", "insurance.min_coverage")]
+visa["requirements"].append({"key": "insurance.min_coverage", "value": "30000 EUR", "evidence": []})
+string_report = check([visa], dataset.products, "string min_coverage")
+if string_report["unreachable_visas"] != [visa["id"]] or string_report["not_required_visas"]:
+    sys.exit("a non-numeric min_coverage is not reported as unreachable")
+
+# A non-bool unlimited with no numeric limit passes the rule, so it needs no change
+unlimited_visas = [
+    v for v in dataset.visas
+    if any(r["key"] == "insurance.unlimited_coverage" and r["value"] is True for r in v["requirements"])
+]
+products = []
+for i, limit in enumerate((None, "see policy")):
+    product = json.loads(json.dumps(dataset.products[0]))
+    product["id"] = f"XX_UNLIMITED_YES_{i}"
+    product["specs"]["unlimited"] = "yes"
+    product["specs"].pop("overall_limit", None)
+    if limit is not None:
+        product["specs"]["overall_limit"] = limit
+    products.append(product)
+unlimited_report = check(unlimited_visas, products, "non-bool unlimited")
+if not unlimited_visas or any(c["field"] == "unlimited" for p in unlimited_report["pairs"] for c in p["changes"]):
+    sys.exit("a non-bool unlimited with no numeric limit is asked to change unlimited")
+
+proc = subprocess.run([sys.executable, "tools/spec_changes.py", "--json"], capture_output=True, text=True)
+if proc.returncode != 0 or json.loads(proc.stdout)["ranking"] != report["ranking"]:
+    sys.exit(f"CLI output differs: {proc.stderr}")
+'@
+Set-Content -Path $tmp -Value $specScript -Encoding UTF8
+$proc = Start-Process -FilePath "py" -ArgumentList $tmp -WorkingDirectory $root -Wait -PassThru -NoNewWindow
+Remove-Item $tmp -ErrorAction SilentlyContinue
+Assert-True ($proc.ExitCode -eq 0) "spec change constraints agree with the engine and their changes reach GREEN"
+
+if ($failed) { Write-Error "Spec change tests failed."; exit 1 }
+Write-Host "All checks passed." -ForegroundColor Green
@@ -80,6 +80,27 @@ try {
   $env:SYNC_ROOT = $root4
   $proc4 = Start-Process -FilePath "py" -ArgumentList "tools/sync_hugo_static.py" -Wait -PassThru
   Assert-True ($proc4.ExitCode -eq 0) "sync succeeds when required inputs exist"
+
+  # Incremental sync: only changed files are rewritten, removed files are deleted
+  $staticIndex = Join-Path $root4 "static/ui/index.html"
+  $before = (Get-Item $staticIndex).LastWriteTimeUtc
+  Set-Content -Path (Join-Path $root4 "sources/test.txt") -Value "changed"
+  Set-Content -Path (Join-Path $root4 "sources/extra.txt") -Value "extra"
+  $proc5 = Start-Process -FilePath "py" -ArgumentList "tools/sync_hugo_static.py" -Wait -PassThru
+  Assert-True ($proc5.ExitCode -eq 0) "incremental sync succeeds"
+  Assert-True ((Get-Content -Raw -Path (Join-Path $root4 "static/sources/test.txt")).Trim() -eq "changed") "sync copies changed files"
+  Assert-True (Test-Path (Join-Path $root4 "static/sources/extra.txt")) "sync copies new files"
+  Assert-True ((Get-Item $staticIndex).LastWriteTimeUtc -eq $before) "sync leaves unchanged files untouched"
+  Assert-True (Test-Path (Join-Path $root4 "static/data/ui_index.json.gz")) "sync precompresses ui_index.json"
+  Assert-True (Test-Path (Join-Path $root4 "static/data/ui_index.json.br")) "sync writes a brotli sibling for ui_index.json"
+
+  Remove-Item -Path (Join-Path $root4 "sources/extra.txt")
+  $proc6 = Start-Process -FilePath "py" -ArgumentList "tools/sync_hugo_static.py" -Wait -PassThru
+  Assert-True ($proc6.ExitCode -eq 0) "sync succeeds after a source is removed"
+  Assert-True (-not (Test-Path (Join-Path $root4 "static/sources/extra.txt"))) "sync deletes removed files"
+
+  $proc7 = Start-Process -FilePath "py" -ArgumentList @("tools/sync_hugo_static.py", "--full") -Wait -PassThru
+  Assert-True ($proc7.ExitCode -eq 0) "full sync succeeds"
 }
 finally {
   @($root1, $root2, $root3, $root4, $rootCss) |
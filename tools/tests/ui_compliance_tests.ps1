@@ -113,6 +113,8 @@ Assert-True ($ui -like '*status === "RED"*') "UI hides CTA for RED"
 Assert-True ($ui -like "*data-cta-disclosure*") "CTA disclosure container exists"
 Assert-True ($ui -like "*Ad label*") "UI renders Ad label near CTA"
 Assert-True ($ui -like "*vf-region-select*") "UI has region selector"
+Assert-True ($ui -like "*compatBtn*") "UI has a compatible products view"
+Assert-True ($ui -like "*shards.buckets*") "compatible products view reads the per-visa buckets shard"
 
 $hasOffers = $index.PSObject.Properties.Name -contains "offers_by_product"
 Assert-True $hasOffers "ui_index.json contains offers_by_product"
@@ -32,6 +32,237 @@ foreach ($m in $data.mappings) {
 }
 Assert-True ($hasLastVerified) "mapping has last_verified"
 
+# Sharded index mirrors the monolithic one
+$pointer = Get-Content -Raw -Path (Join-Path $root "data/ui_index/current.json") | ConvertFrom-Json
+$manifestPath = Join-Path $root ("data/ui_index/" + $pointer.manifest)
+Assert-True ($pointer.manifest -match '^manifest\.[0-9a-f]{12}\.json$') "pointer names a content-hashed manifest"
+Assert-True (Test-Path $manifestPath) "sharded manifest exists"
+$manifest = Get-Content -Raw -Path $manifestPath | ConvertFrom-Json
+Assert-True ($manifest.format -eq "sharded") "manifest declares sharded format"
+Assert-True ($manifest.visa_list.Count -eq $data.visas.Count) "manifest lists every visa"
+Assert-True ($manifest.product_list.Count -eq $data.products.Count) "manifest lists every product"
+$shardMappings = 0
+foreach ($v in $manifest.visa_list) {
+  $shardPath = Join-Path $root ("data/ui_index/" + $v.shard)
+  Assert-True (Test-Path $shardPath) "visa shard exists for $($v.id)"
+  Assert-True ($v.shard -match '\.[0-9a-f]{12}\.json$') "visa shard name is content-hashed for $($v.id)"
+  if (Test-Path $shardPath) {
+    $shard = Get-Content -Raw -Path $shardPath | ConvertFrom-Json
+    $shardMappings += @($shard.mappings.PSObject.Properties).Count
+  }
+}
+Assert-True ($shardMappings -eq $data.mappings.Count) "visa shards hold every mapping"
+$sourceShardCount = @($manifest.source_shards.PSObject.Properties).Count
+Assert-True ($sourceShardCount -eq @($data.sources_by_id.PSObject.Properties).Count) "manifest lists every source shard"
+
+# Interned evidence must expand back to the mapping files exactly
+Assert-True ($data.format -eq "interned") "ui_index.json uses the interned format"
+$tmp = Join-Path ([System.IO.Path]::GetTempPath()) ("interned_check_" + [System.Guid]::NewGuid().ToString() + ".py")
+$internedScript = @'
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path.cwd()))
+from tools.index_format import expand_index, expand_mappings
+
+index = expand_index(json.loads(Path("data/ui_index.json").read_text(encoding="utf-8")))
+expanded = {}
+for m in index["mappings"]:
+    m = dict(m)
+    m.pop("last_verified", None)
+    expanded[(m["visa_id"], m["product_id"])] = m
+for path in sorted(Path("data/mappings").rglob("*.json")):
+    source = json.loads(path.read_text(encoding="utf-8"))
+    if expanded.get((source["visa_id"], source["product_id"])) != source:
+        sys.exit(f"interned mapping differs from {path}")
+
+pointer = json.loads(Path("data/ui_index/current.json").read_text(encoding="utf-8"))
+manifest = json.loads((Path("data/ui_index") / pointer["manifest"]).read_text(encoding="utf-8"))
+for visa in manifest["visa_list"]:
+    shard = json.loads((Path("data/ui_index") / visa["shard"]).read_text(encoding="utf-8"))
+    products = list(shard["mappings"])
+    mappings = expand_mappings(list(shard["mappings"].values()), shard["evidence_table"], shard["excerpt_table"])
+    for product_id, m in zip(products, mappings):
+        m = dict(m)
+        m.pop("last_verified", None)
+        if expanded.get((visa["id"], product_id)) != m:
+            sys.exit(f"interned shard mapping differs for {visa['id']} x {product_id}")
+'@
+Set-Content -Path $tmp -Value $internedScript -Encoding UTF8
+$proc = Start-Process -FilePath "py" -ArgumentList $tmp -WorkingDirectory $root -Wait -PassThru -NoNewWindow
+Remove-Item $tmp -ErrorAction SilentlyContinue
+Assert-True ($proc.ExitCode -eq 0) "interned index and shards expand losslessly to data/mappings"
+
+# Reverse dependency shard must agree with a full scan of facts and mappings
+Assert-True ($manifest.source_deps -match '^source_deps\.[0-9a-f]{12}\.json$') "manifest names a content-hashed source_deps shard"
+$tmp = Join-Path ([System.IO.Path]::GetTempPath()) ("source_deps_check_" + [System.Guid]::NewGuid().ToString() + ".py")
+$depsScript = @'
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path.cwd()))
+from tools.authorizations import provider_key
+from tools.source_deps import build_source_deps, load_source_deps
+
+deps = load_source_deps()
+
+
+def cites(obj, source_id):
+    return f'"source_id": "{source_id}"' in json.dumps(obj)
+
+
+visas = {v["id"]: v for v in (json.loads(p.read_text(encoding="utf-8")) for p in Path("data/visas").rglob("visa_facts.json"))}
+products = {p["id"]: p for p in (json.loads(f.read_text(encoding="utf-8")) for f in Path("data/products").rglob("product_facts.json"))}
+insurers = {i["provider"]: i for i in (json.loads(f.read_text(encoding="utf-8")) for f in Path("data/insurers").rglob("insurer_facts.json"))}
+by_key = {provider_key(provider): insurer for provider, insurer in insurers.items()}
+mappings = [json.loads(p.read_text(encoding="utf-8")) for p in sorted(Path("data/mappings").glob("*.json"))]
+source_ids = {m.stem.replace(".meta", "") for m in Path("sources").glob("*.meta.json")} | set(deps)
+
+for source_id in sorted(source_ids):
+    entry = deps.get(source_id, {"visas": {}, "products": {}, "insurers": {}, "mappings": []})
+    if sorted(v for v, visa in visas.items() if cites(visa, source_id)) != sorted(entry["visas"]):
+        sys.exit(f"visas differ for {source_id}")
+    if sorted(p for p, product in products.items() if cites(product, source_id)) != sorted(entry["products"]):
+        sys.exit(f"products differ for {source_id}")
+    if sorted(i for i, insurer in insurers.items() if cites(insurer, source_id)) != sorted(entry["insurers"]):
+        sys.exit(f"insurers differ for {source_id}")
+
+    def upstream(m):
+        product = products.get(m["product_id"], {})
+        insurer = by_key.get(provider_key(product.get("provider")), {})
+        return [m, visas.get(m["visa_id"], {}), product, insurer]
+
+    expected = sorted(
+        f"{m['visa_id']}__{m['product_id']}" for m in mappings
+        if any(cites(node, source_id) for node in upstream(m))
+    )
+    if expected != entry["mappings"]:
+        sys.exit(f"mappings differ for {source_id}")
+
+# A source only an insurer file cites reaches that insurer's mappings, not its products' entries
+insurer = {"provider": "Example Insurer", "authorizations": {"ES": {"authorized": True, "evidence": [{"source_id": "INSURER_ONLY"}]}}}
+product = {"id": "EXAMPLE", "provider": "example  insurer", "specs": {}}
+found = build_source_deps([], [product], [{"visa_id": "V", "product_id": "EXAMPLE"}], [insurer])["INSURER_ONLY"]
+if found["insurers"] != {"Example Insurer": ["authorizations.ES.evidence[0]"]} or found["products"] or found["mappings"] != ["V__EXAMPLE"]:
+    sys.exit(f"insurer evidence is not indexed under its insurer: {found}")
+
+source_id = next(iter(deps))
+proc = subprocess.run([sys.executable, "tools/source_deps.py", source_id, "--json"], capture_output=True, text=True)
+if proc.returncode != 0 or json.loads(proc.stdout) != {source_id: deps[source_id]}:
+    sys.exit(f"query CLI output differs: {proc.stderr}")
+'@
+Set-Content -Path $tmp -Value $depsScript -Encoding UTF8
+$proc = Start-Process -FilePath "py" -ArgumentList $tmp -WorkingDirectory $root -Wait -PassThru -NoNewWindow
+Remove-Item $tmp -ErrorAction SilentlyContinue
+Assert-True ($proc.ExitCode -eq 0) "source_deps index matches a full scan and the query CLI"
+
+# Status buckets must group every mapping of a visa, fewest missing fields first
+$tmp = Join-Path ([System.IO.Path]::GetTempPath()) ("status_buckets_check_" + [System.Guid]::NewGuid().ToString() + ".py")
+$bucketsScript = @'
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path.cwd()))
+from tools.status_buckets import STATUSES, load_status_buckets
+
+mappings = [json.loads(p.read_text(encoding="utf-8")) for p in sorted(Path("data/mappings").glob("*.json"))]
+pointer = json.loads(Path("data/ui_index/current.json").read_text(encoding="utf-8"))
+manifest = json.loads((Path("data/ui_index") / pointer["manifest"]).read_text(encoding="utf-8"))
+for visa in manifest["visa_list"]:
+    buckets = load_status_buckets(visa["id"])
+    if list(buckets) != STATUSES:
+        sys.exit(f"buckets for {visa['id']} do not list every status in order")
+    if visa["status_counts"] != {status: len(entries) for status, entries in buckets.items()}:
+        sys.exit(f"manifest status_counts differ for {visa['id']}")
+    expected = {status: [] for status in STATUSES}
+    for m in mappings:
+        if m["visa_id"] == visa["id"]:
+            expected[m["status"]].append([m["product_id"], len(m.get("missing", []))])
+    for status, entries in expected.items():
+        if sorted(entries, key=lambda e: (e[1], e[0])) != buckets[status]:
+            sys.exit(f"{status} bucket differs for {visa['id']}")
+
+visa_id = manifest["visa_list"][0]["id"]
+proc = subprocess.run([sys.executable, "tools/status_buckets.py", visa_id, "--status", "GREEN", "--json"], capture_output=True, text=True)
+if proc.returncode != 0 or json.loads(proc.stdout) != {"GREEN": load_status_buckets(visa_id)["GREEN"]}:
+    sys.exit(f"query CLI output differs: {proc.stderr}")
+'@
+Set-Content -Path $tmp -Value $bucketsScript -Encoding UTF8
+$proc = Start-Process -FilePath "py" -ArgumentList $tmp -WorkingDirectory $root -Wait -PassThru -NoNewWindow
+Remove-Item $tmp -ErrorAction SilentlyContinue
+Assert-True ($proc.ExitCode -eq 0) "status buckets match the mappings and the query CLI"
+
+# Batched history pass must agree with a per-file git log lookup
+$sample = $data.mappings | Select-Object -First 1
+$samplePath = "data/mappings/{0}__{1}.json" -f $sample.visa_id, $sample.product_id
+$expected = (& git -C $root log -1 --format=%cs -- $samplePath | Out-String).Trim()
+Assert-True ($sample.last_verified -eq $expected) "last_verified matches git log for $samplePath"
+
+# A client holding a previous manifest can still fetch its shards after a rebuild
+$tmp = Join-Path ([System.IO.Path]::GetTempPath()) ("shard_generations_check_" + [System.Guid]::NewGuid().ToString() + ".py")
+$generationsScript = @'
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+shards = Path("data/ui_index")
+pointer_path = shards / "current.json"
+
+
+def build():
+    proc = subprocess.run([sys.executable, "tools/build_index.py"], capture_output=True, text=True)
+    if proc.returncode != 0:
+        sys.exit(f"build_index failed: {proc.stderr}")
+    return json.loads(pointer_path.read_text(encoding="utf-8"))
+
+
+# Stand in for an older build whose visa shard no current build writes
+pointer = json.loads(pointer_path.read_text(encoding="utf-8"))
+manifest = json.loads((shards / pointer["manifest"]).read_text(encoding="utf-8"))
+old_shard = "visas/OLD_GENERATION.000000000000.json"
+(shards / old_shard).write_text((shards / manifest["visa_list"][0]["shard"]).read_text(encoding="utf-8"), encoding="utf-8")
+manifest["visa_list"][0]["shard"] = old_shard
+old_manifest = "manifest.000000000000.json"
+(shards / old_manifest).write_text(json.dumps(manifest), encoding="utf-8")
+pointer_path.write_text(json.dumps({"manifest": old_manifest}), encoding="utf-8")
+
+pointer = build()
+if pointer["previous_manifests"][:1] != [old_manifest] or not (shards / old_shard).exists():
+    sys.exit("the previous build's manifest or shards were deleted by the next build")
+# The manifest carries no build time, so an unchanged rebuild is not a new generation
+rebuilt = build()
+if rebuilt["manifest"] != pointer["manifest"] or rebuilt["previous_manifests"] != pointer["previous_manifests"]:
+    sys.exit("an unchanged rebuild wrote a new manifest generation")
+# Stand in for newer builds with different content until the old one falls out
+for generation in range(1, 3):
+    manifest = json.loads((shards / pointer["manifest"]).read_text(encoding="utf-8"))
+    manifest["generation"] = generation
+    newer = f"manifest.{generation:012d}.json"
+    (shards / newer).write_text(json.dumps(manifest), encoding="utf-8")
+    pointer_path.write_text(json.dumps({
+        "manifest": newer,
+        "previous_manifests": [pointer["manifest"], *pointer["previous_manifests"]],
+    }), encoding="utf-8")
+    pointer = build()
+if old_manifest in pointer["previous_manifests"] or (shards / old_manifest).exists() or (shards / old_shard).exists():
+    sys.exit("builds older than KEEP_GENERATIONS were not pruned")
+for rel in [pointer["manifest"], *pointer["previous_manifests"]]:
+    manifest = json.loads((shards / rel).read_text(encoding="utf-8"))
+    for visa in manifest["visa_list"]:
+        if not (shards / visa["shard"]).exists() or not (shards / visa["buckets"]).exists():
+            sys.exit(f"{rel} names a shard that was deleted")
+'@
+Set-Content -Path $tmp -Value $generationsScript -Encoding UTF8
+$proc = Start-Process -FilePath "py" -ArgumentList $tmp -WorkingDirectory $root -Wait -PassThru -NoNewWindow
+Remove-Item $tmp -ErrorAction SilentlyContinue
+Assert-True ($proc.ExitCode -eq 0) "rebuilds keep the shards of recent manifests and prune older ones"
+
 if ($failed) {
   Write-Error "One or more checks failed."
   exit 1
@@ -91,6 +91,88 @@ try {
   }
 }
 
+# Every schema violation is reported, and --json-output gives a structured report
+$badPath = Join-Path ([System.IO.Path]::GetTempPath()) ("bad_product_" + [System.Guid]::NewGuid().ToString() + ".json")
+$badProduct = Get-Content -Raw -Path "data/products/SafetyWing/Nomad-Insurance/2026-01-12/product_facts.json" | ConvertFrom-Json
+$badProduct.PSObject.Properties.Remove("id")
+$badProduct.provider = 42
+$badProduct | ConvertTo-Json -Depth 10 | Set-Content -Path $badPath -Encoding ASCII
+$output = & $pythonCmd "tools/validate.py" "--product" $badPath "--json-output" "-" 2>&1
+$exit = $LASTEXITCODE
+Remove-Item $badPath -ErrorAction SilentlyContinue
+$report = ($output -join "`n") | ConvertFrom-Json
+Assert-True ($exit -ne 0) "validate fails on a product with schema errors"
+Assert-True (-not $report.valid -and $report.files -eq 1) "json report lists the file as invalid"
+$schemaErrors = @($report.results[0].errors | Where-Object { $_.check -eq "schema" })
+Assert-True ($schemaErrors.Count -ge 2) "json report lists every schema error, not just the first"
+Assert-True (@($schemaErrors | Where-Object { $_.path -eq '$.provider' }).Count -eq 1) "schema errors carry their JSON path"
+
+# A product that fails the schema reports that error instead of crashing the source checks
+$oddPath = Join-Path ([System.IO.Path]::GetTempPath()) ("odd_product_" + [System.Guid]::NewGuid().ToString() + ".json")
+$oddProduct = Get-Content -Raw -Path "data/products/SafetyWing/Nomad-Insurance/2026-01-12/product_facts.json" | ConvertFrom-Json
+$oddProduct.specs.jurisdiction_facts = [pscustomobject]@{ ES = "yes" }
+$oddProduct | ConvertTo-Json -Depth 10 | Set-Content -Path $oddPath -Encoding ASCII
+$output = & $pythonCmd "tools/validate.py" "--product" $oddPath "--json-output" "-" 2>&1
+$exit = $LASTEXITCODE
+Remove-Item $oddPath -ErrorAction SilentlyContinue
+$report = ($output -join "`n") | ConvertFrom-Json
+Assert-True ($exit -eq 1) "validate exits 1, not with a traceback, on a schema-invalid product"
+Assert-True (@($report.results[0].errors | Where-Object { $_.check -eq "schema" -and $_.message -like "*is not of type 'object'*" }).Count -ge 1) "the schema-invalid product reports its schema error"
+
+# insurance.authorized_in must name one jurisdiction code
+$badVisaPath = Join-Path ([System.IO.Path]::GetTempPath()) ("bad_visa_" + [System.Guid]::NewGuid().ToString() + ".json")
+$badVisa = Get-Content -Raw -Path "data/visas/ES/DNV/bls-london/2026-01-12/visa_facts.json" | ConvertFrom-Json
+$badVisa.requirements += [pscustomobject]@{ key = "insurance.authorized_in"; op = "=="; value = $true; evidence = $badVisa.requirements[0].evidence }
+$badVisa | ConvertTo-Json -Depth 10 | Set-Content -Path $badVisaPath -Encoding ASCII
+$output = & $pythonCmd "tools/validate.py" "--visa" $badVisaPath "--json-output" "-" 2>&1
+$exit = $LASTEXITCODE
+Remove-Item $badVisaPath -ErrorAction SilentlyContinue
+$report = ($output -join "`n") | ConvertFrom-Json
+Assert-True ($exit -ne 0) "validate rejects an authorized_in value that is not a jurisdiction code"
+Assert-True (@($report.results[0].errors | Where-Object { $_.check -eq "schema" -and $_.path -like '*value' }).Count -ge 1) "the authorized_in error points at the requirement value"
+
+# Streaming digests must equal whole-file digests, including CRLF split across chunks
+$tmp = Join-Path ([System.IO.Path]::GetTempPath()) ("hash_check_" + [System.Guid]::NewGuid().ToString() + ".py")
+$hashScript = @'
+import hashlib
+import random
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path.cwd()))
+from tools import hashing
+
+def whole_text(path):
+    text = path.read_text(encoding="utf-8", errors="replace")
+    return hashlib.sha256(text.replace("\r\n", "\n").replace("\r", "\n").encode("utf-8")).hexdigest()
+
+rng = random.Random(0)
+pieces = [b"\r", b"\n", b"\r\n", b"a", b"\xc3\xa9", b"\xe2\x82\xac", b"\xff", b"\xc3", b"\xef\xbb\xbf"]
+work = Path(tempfile.mkdtemp())
+for chunk_size in (1, 2, 3, 7):
+    hashing.CHUNK_SIZE = chunk_size
+    for i in range(100):
+        path = work / f"f{i}.md"
+        path.write_bytes(b"".join(rng.choice(pieces) for _ in range(rng.randint(0, 40))))
+        if hashing.sha256_text(path) != whole_text(path):
+            sys.exit(f"text digest differs at chunk size {chunk_size}: {path.read_bytes()!r}")
+        if hashing.sha256_file(path) != hashlib.sha256(path.read_bytes()).hexdigest():
+            sys.exit(f"byte digest differs at chunk size {chunk_size}")
+
+service = hashing.HashService(workers=4)
+paths = sorted(work.glob("*.md"))
+many = service.digest_many(paths * 3, text=True)
+if len(many) != len(paths) or any(many[p] != whole_text(p) for p in paths):
+    sys.exit("digest_many differs from whole-file digests")
+'@
+Set-Content -Path $tmp -Value $hashScript -Encoding UTF8
+$output = & $pythonCmd $tmp 2>&1
+$exit = $LASTEXITCODE
+Remove-Item $tmp -ErrorAction SilentlyContinue
+Write-Host $output
+Assert-True ($exit -eq 0) "streaming source digests match whole-file digests"
+
 if ($failed) {
   Write-Error "One or more checks failed."
   exit 1
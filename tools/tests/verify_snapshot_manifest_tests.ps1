@@ -38,7 +38,14 @@ try {
   $proc2 = Start-Process -FilePath "py" -ArgumentList @("tools/verify_snapshot_manifest.py", "--snapshot-dir", $snapshotDir) -WorkingDirectory $root -Wait -PassThru
   Assert-True ($proc2.ExitCode -eq 0) "verify_snapshot_manifest.py passes on fresh snapshot"
 
-  Add-Content -Path (Join-Path $snapshotDir "ui_index.json") -Value " "
+  $procSerial = Start-Process -FilePath "py" -ArgumentList @("tools/verify_snapshot_manifest.py", "--snapshot-dir", $snapshotDir, "--jobs", "1") -WorkingDirectory $root -Wait -PassThru
+  Assert-True ($procSerial.ExitCode -eq 0) "verify_snapshot_manifest.py passes with a single hashing thread"
+
+  # Snapshot files are read-only links into the object store: replace, don't append
+  $corrupted = Join-Path $snapshotDir "ui_index.json"
+  $original = Get-Content -Raw -Path $corrupted
+  Remove-Item -LiteralPath $corrupted -Force
+  Set-Content -Path $corrupted -Value ($original + " ") -NoNewline
   $proc3 = Start-Process -FilePath "py" -ArgumentList @("tools/verify_snapshot_manifest.py", "--snapshot-dir", $snapshotDir) -WorkingDirectory $root -Wait -PassThru
   Assert-True ($proc3.ExitCode -ne 0) "verify_snapshot_manifest.py fails on mismatch"
 } finally {
@@ -69,5 +69,27 @@ if (Test-Path $pagesYmlPath) {
   Assert-True $false "pages.yml missing"
 }
 
+# Phase 5: Regeneration only rewrites changed pages and removes orphans
+$rootMd = Get-Content -Raw -Path $rootIndex
+if ($rootMd -match 'snapshot="([^"]+)"') {
+  $env:SNAPSHOT_ID = $Matches[1]
+  $orphanRoot = Join-Path $root "content/visas/zz-orphan"
+  $orphanDir = Join-Path $orphanRoot "test-visa/test-route"
+  New-Item -ItemType Directory -Force -Path $orphanDir | Out-Null
+  Set-Content -Path (Join-Path $orphanDir "index.md") -Value "orphan"
+  $before = (Get-Item $rootIndex).LastWriteTimeUtc
+  try {
+    $hubProc = Start-Process -FilePath "py" -ArgumentList @("tools/build_content_hubs.py", "--jobs", "2") -WorkingDirectory $root -Wait -PassThru
+    Assert-True ($hubProc.ExitCode -eq 0) "build_content_hubs.py reruns"
+    Assert-True ((Get-Item $rootIndex).LastWriteTimeUtc -eq $before) "unchanged pages are not rewritten"
+    Assert-True (-not (Test-Path $orphanRoot)) "pages for removed visas are deleted"
+  } finally {
+    Remove-Item Env:SNAPSHOT_ID -ErrorAction SilentlyContinue
+    Remove-Item -Recurse -Force $orphanRoot -ErrorAction SilentlyContinue
+  }
+} else {
+  Assert-True $false "Root visas index carries a snapshot id"
+}
+
 if ($failed) { Write-Error "Visa hub checks failed."; exit 1 }
 Write-Host "All checks passed." -ForegroundColor Green
@@ -0,0 +1,95 @@
+$ErrorActionPreference = "Stop"
+$failed = $false
+
+function Assert-True {
+  param([bool]$Condition, [string]$Message)
+  if (-not $Condition) { Write-Host "FAIL: $Message" -ForegroundColor Red; $script:failed = $true }
+  else { Write-Host "PASS: $Message" -ForegroundColor Green }
+}
+
+$root = Split-Path -Parent (Split-Path -Parent $PSScriptRoot)
+
+# After every edit the incremental results must equal a full evaluation of
+# the draft, and an edit must only re-run the rules that read its path
+$tmp = Join-Path ([System.IO.Path]::GetTempPath()) ("what_if_check_" + [System.Guid]::NewGuid().ToString() + ".py")
+$whatIfScript = @'
+import copy
+import random
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path.cwd()))
+from tools.dataset import load_dataset
+from tools.engine import compile_visa
+from tools.synth_catalogue import make_visa
+from tools.what_if import WhatIf
+
+
+class Unordered(float):
+    """A number the rules accept but cannot compare."""
+
+    def __lt__(self, other):
+        raise TypeError("unordered")
+
+    __gt__ = __lt__
+
+
+EDITS = [
+    ("payment_cadence", "monthly"), ("payment_cadence", "annual"),
+    ("deductible.amount", 250), ("deductible", {"amount": 0}),
+    ("overall_limit", 10), ("overall_limit", 100000), ("unlimited", True),
+    ("type", "travel"), ("type", "health insurance"),
+    ("jurisdiction_facts.ES.authorized", True), ("comprehensive", True), ("copay", False),
+    ("moratorium_days", 0), ("covers_public_health_system_risks", True),
+    ("overall_limit", None), ("payment_cadence", "monthly"),
+]
+
+
+def check(visas, base, label):
+    plans = [(visa["id"], compile_visa(visa)) for visa in visas]
+    session = WhatIf(visas, base)
+    for field, value in EDITS * 2:
+        mappings = session.what_if({field: value})
+        for visa_id, plan in plans:
+            if mappings[visa_id] != plan.evaluate(session.product):
+                sys.exit(f"{label}: {visa_id} differs from the engine after {field} = {value!r}")
+    # Repeating the last edit changes nothing; returning to an earlier value is memoized
+    session.what_if({"payment_cadence": "monthly"})
+    if session.rerun != 0:
+        sys.exit(f"{label}: an unchanged edit re-ran {session.rerun} rules")
+    session.what_if({"payment_cadence": "annual"})
+    if session.rerun != 0:
+        sys.exit(f"{label}: a previously seen value re-ran {session.rerun} rules")
+    session.what_if({"moratorium_days": 7})
+    if session.rerun > len(visas):
+        sys.exit(f"{label}: one edit re-ran {session.rerun} rules for {len(visas)} visas")
+    # A patch a rule raises on is rejected without changing the session
+    before = copy.deepcopy(session.product)
+    try:
+        session.what_if({"copay": True, "deductible.amount": Unordered(5), "overall_limit": Unordered(5)})
+    except TypeError:
+        if session.product != before:
+            sys.exit(f"{label}: a failed patch changed the draft")
+    else:
+        sys.exit(f"{label}: no rule raised on a number that cannot be compared")
+    mappings = session.what_if({"payment_cadence": "single"})
+    for visa_id, plan in plans:
+        if mappings[visa_id] != plan.evaluate(session.product):
+            sys.exit(f"{label}: {visa_id} differs from the engine after a failed patch")
+
+
+dataset = load_dataset()
+check(dataset.visas, None, "catalogue draft")
+check(dataset.visas, dataset.products[0], "catalogue base")
+
+rng = random.Random(11)
+source = {"source_id": "SYNTH", "url": "https://example.invalid", "retrieved_at": "2026-01-01", "sha256": "0", "local_path": "x"}
+check([make_visa(rng, i, source) for i in range(40)], None, "synthetic")
+'@
+Set-Content -Path $tmp -Value $whatIfScript -Encoding UTF8
+$proc = Start-Process -FilePath "py" -ArgumentList $tmp -WorkingDirectory $root -Wait -PassThru -NoNewWindow
+Remove-Item $tmp -ErrorAction SilentlyContinue
+Assert-True ($proc.ExitCode -eq 0) "what-if results match the engine and edits re-run only dependent rules"
+
+if ($failed) { Write-Error "What-if tests failed."; exit 1 }
+Write-Host "All checks passed." -ForegroundColor Green
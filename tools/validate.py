@@ -1,42 +1,158 @@
 import argparse
 import hashlib
 import json
+import os
 import re
 import sys
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from jsonschema import validate
-from jsonschema.exceptions import ValidationError
+from jsonschema import FormatChecker
+from jsonschema.validators import validator_for
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from tools.dataset import FileCache, scan, sources_by_id as index_sources
+from tools.hashing import HASHES
 
 ROOT = Path(__file__).parent.parent
 DATA = ROOT / "data"
 SCHEMAS = ROOT / "schemas"
 SOURCES = ROOT / "sources"
 
-visa_schema = json.loads((SCHEMAS / "visa_facts.schema.json").read_text(encoding="utf-8"))
-product_schema = json.loads((SCHEMAS / "product_facts.schema.json").read_text(encoding="utf-8"))
-offers_schema = json.loads((SCHEMAS / "offers.schema.json").read_text(encoding="utf-8"))
+RESULTS_CACHE = ROOT / "data" / ".cache" / "validate.json"
+
+SCHEMA_FILES = {
+    "VisaFacts": "visa_facts.schema.json",
+    "ProductFacts": "product_facts.schema.json",
+    "Offers": "offers.schema.json",
+    "InsurerFacts": "insurer_facts.schema.json",
+}
+
+# Below this many files a process pool costs more than it saves
+PARALLEL_THRESHOLD = 2000
+
+_validators = {}
+# Per-run results of the source checks, keyed by source_id
+_source_checks = {}
+
+def compiled_validator(label):
+    """One validator per schema: the schema is checked and compiled once per process."""
+    validator = _validators.get(label)
+    if validator is None:
+        schema = json.loads((SCHEMAS / SCHEMA_FILES[label]).read_text(encoding="utf-8"))
+        cls = validator_for(schema)
+        cls.check_schema(schema)
+        validator = _validators[label] = cls(schema, format_checker=FormatChecker())
+    return validator
+
+
+def error(message, check, path=""):
+    return {"check": check, "path": path, "message": message}
+
 
-errors = 0
+def schema_errors(label, data):
+    """Every schema violation in data, in document order."""
+    found = sorted(compiled_validator(label).iter_errors(data), key=lambda e: e.json_path)
+    return [
+        {**error(e.message, "schema", e.json_path), "validator": e.validator}
+        for e in found
+    ]
 
-def load_sources():
-    sources_by_id = {}
-    for path in SOURCES.rglob("*.meta.json"):
+
+def schema_errors_batch(items):
+    """Worker entry point: [(label, data), ...] -> [errors, ...]."""
+    return [schema_errors(label, data) for label, data in items]
+
+
+class ResultCache:
+    """Schema errors keyed by file sha256, valid while the schema text is unchanged.
+
+    Only schema results are cached: they depend on nothing but the file
+    and the schema. Source and offer checks always run.
+    """
+
+    def __init__(self, path: Path = RESULTS_CACHE):
+        self.path = path
+        self.schemas = {
+            label: hashlib.sha256((SCHEMAS / name).read_bytes()).hexdigest()
+            for label, name in SCHEMA_FILES.items()
+        }
         try:
-            meta = json.loads(path.read_text(encoding="utf-8"))
-            source_id = meta.get("source_id")
-            if source_id:
-                sources_by_id[source_id] = meta
-        except Exception:
-            continue
-    return sources_by_id
+            cached = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            cached = {}
+        self.entries = {
+            label: entries for label, entries in cached.get("entries", {}).items()
+            if cached.get("schemas", {}).get(label) == self.schemas.get(label)
+        }
+        self.seen = {label: {} for label in SCHEMA_FILES}
+
+    def get(self, label, sha256):
+        if not sha256:
+            return None
+        found = self.entries.get(label, {}).get(sha256)
+        if found is not None:
+            self.seen[label][sha256] = found
+        return found
+
+    def put(self, label, sha256, errors):
+        if sha256:
+            self.seen[label][sha256] = errors
+
+    def save(self):
+        """Write back the entries for files seen in this run."""
+        if self.seen == self.entries:
+            return
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_name(self.path.name + ".tmp")
+            tmp.write_text(json.dumps({"schemas": self.schemas, "entries": self.seen}, separators=(",", ":")), encoding="utf-8")
+            os.replace(tmp, self.path)
+        except OSError:
+            pass
+
+
+def load_sources(cache):
+    return index_sources(scan(cache, SOURCES, "*.meta.json"))
+
 
 def sha256_for_path(path: Path) -> str:
-    suffix = path.suffix.lower()
-    if suffix in {".md", ".txt", ".json"}:
-        text = path.read_text(encoding="utf-8", errors="replace")
-        normalized = text.replace("\r\n", "\n").replace("\r", "\n")
-        return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
-    return hashlib.sha256(path.read_bytes()).hexdigest()
+    # Memoized per file, so each source is hashed once however often it is cited
+    return HASHES.digest(path, text=True)
+
+
+def product_evidence(data):
+    items = list(data.get("evidence", []))
+    specs = data.get("specs", {})
+    for facts in (specs.get("jurisdiction_facts") or {}).values():
+        items.extend(facts.get("evidence", []))
+    return items
+
+
+def insurer_evidence(data):
+    items = []
+    for facts in (data.get("authorizations") or {}).values():
+        items.extend(facts.get("evidence", []))
+    return items
+
+
+# Labels whose evidence must cite existing, unmodified sources
+EVIDENCE = {"ProductFacts": product_evidence, "InsurerFacts": insurer_evidence}
+
+
+def prefetch_source_hashes(items, sources_by_id):
+    """Hash every source file the [(label, data), ...] items cite, in parallel, before checking them."""
+    source_ids = set()
+    for label, data in items:
+        if isinstance(data, dict):
+            source_ids.update(ev.get("source_id") for ev in EVIDENCE[label](data))
+    paths = set()
+    for source_id in source_ids:
+        meta = sources_by_id.get(source_id) or {}
+        if meta.get("local_path") and (ROOT / meta["local_path"]).exists():
+            paths.add(ROOT / meta["local_path"])
+    HASHES.digest_many(sorted(paths), text=True)
+
 
 BANNED_OFFER_WORDS = [
     "best",
@@ -50,113 +166,191 @@ BANNED_OFFER_WORDS = [
 ]
 
 
-def check_offer_language(data, path):
-    global errors
-    for offer in data.get("offers", []):
+def check_offer_language(data):
+    errors = []
+    for i, offer in enumerate(data.get("offers", [])):
         text = (offer.get("label", "") + " " + offer.get("disclosure", "")).lower()
         for word in BANNED_OFFER_WORDS:
             if re.search(rf"\b{re.escape(word)}\b", text):
-                print(f"[ERROR] Offers: {path}")
-                print("  ", f"Banned word in offer: {word}")
-                errors += 1
+                errors.append(error(f"Banned word in offer: {word}", "offer_language", f"$.offers[{i}]"))
                 break
+    return errors
 
-def check_product_sources(data, path, sources_by_id):
-    global errors
-    evidence_items = []
-    evidence_items.extend(data.get("evidence", []))
-    specs = data.get("specs", {})
-    for facts in (specs.get("jurisdiction_facts") or {}).values():
-        evidence_items.extend(facts.get("evidence", []))
+def check_source(source_id, sources_by_id):
+    """Error message for one cited source, or None. Memoized per source_id for the run."""
+    if source_id in _source_checks:
+        return _source_checks[source_id]
+    meta = sources_by_id.get(source_id)
+    local_path = meta.get("local_path") if meta else None
+    message = None
+    if not meta:
+        message = f"Missing source metadata for source_id: {source_id}"
+    elif not meta.get("sha256"):
+        message = f"Missing sha256 for source_id: {source_id}"
+    elif not local_path:
+        message = f"Missing local_path for source_id: {source_id}"
+    elif not (ROOT / local_path).exists():
+        message = f"Local source file not found for source_id: {source_id} ({local_path})"
+    else:
+        try:
+            digest = sha256_for_path(ROOT / local_path)
+        except Exception as e:
+            message = f"Failed to read local source file for source_id: {source_id} ({e})"
+        else:
+            if digest.lower() != str(meta["sha256"]).lower():
+                message = f"SHA256 mismatch for source_id: {source_id}"
+    _source_checks[source_id] = message
+    return message
 
-    for ev in evidence_items:
+
+def check_product_sources(data, sources_by_id, label="ProductFacts"):
+    errors = []
+    kind = "insurer" if label == "InsurerFacts" else "product"
+    for ev in EVIDENCE[label](data):
         source_id = ev.get("source_id")
         if not source_id:
-            print(f"[ERROR] ProductFacts: {path}")
-            print("  ", "Missing source_id in product evidence.")
-            errors += 1
-            continue
-        meta = sources_by_id.get(source_id)
-        if not meta:
-            print(f"[ERROR] ProductFacts: {path}")
-            print("  ", f"Missing source metadata for source_id: {source_id}")
-            errors += 1
-            continue
-        sha = meta.get("sha256")
-        if not sha:
-            print(f"[ERROR] ProductFacts: {path}")
-            print("  ", f"Missing sha256 for source_id: {source_id}")
-            errors += 1
-            continue
-        local_path = meta.get("local_path")
-        if not local_path:
-            print(f"[ERROR] ProductFacts: {path}")
-            print("  ", f"Missing local_path for source_id: {source_id}")
-            errors += 1
+            errors.append(error(f"Missing source_id in {kind} evidence.", "sources"))
             continue
-        full_path = ROOT / local_path
-        if not full_path.exists():
-            print(f"[ERROR] ProductFacts: {path}")
-            print("  ", f"Local source file not found for source_id: {source_id} ({local_path})")
-            errors += 1
-            continue
-        try:
-            digest = sha256_for_path(full_path)
-        except Exception as e:
-            print(f"[ERROR] ProductFacts: {path}")
-            print("  ", f"Failed to read local source file for source_id: {source_id} ({e})")
-            errors += 1
-            continue
-        if digest.lower() != str(sha).lower():
-            print(f"[ERROR] ProductFacts: {path}")
-            print("  ", f"SHA256 mismatch for source_id: {source_id}")
-            errors += 1
+        message = check_source(source_id, sources_by_id)
+        if message:
+            errors.append(error(message, "sources"))
+    return errors
 
-def validate_file(path, schema, label, sources_by_id=None):
-    global errors
+def read_file(path):
+    """(data, None) or (None, parse error message)."""
     try:
-        data = json.loads(path.read_text(encoding="utf-8"))
-        validate(instance=data, schema=schema)
-        print(f"[OK] {label}: {path}")
-        if label == "ProductFacts" and sources_by_id is not None:
-            check_product_sources(data, path, sources_by_id)
-        if label == "Offers":
-            check_offer_language(data, path)
-    except ValidationError as e:
-        print(f"[ERROR] {label}: {path}")
-        print("  ", e.message)
-        errors += 1
+        return json.loads(path.read_text(encoding="utf-8")), None
     except Exception as e:
-        print(f"[ERROR] {label}: {path}")
-        print("  ", str(e))
-        errors += 1
-
-def validate_files(folder, schema, label, sources_by_id=None):
-    for path in folder.rglob("*.json"):
-        validate_file(path, schema, label, sources_by_id)
-
-parser = argparse.ArgumentParser()
-parser.add_argument("--visa", type=str, help="Path to a single VisaFacts JSON to validate")
-parser.add_argument("--product", type=str, help="Path to a single ProductFacts JSON to validate")
-parser.add_argument("--offers", type=str, help="Path to a single Offers JSON to validate")
-args = parser.parse_args()
-
-sources_by_id = load_sources()
-if args.visa:
-    validate_file(Path(args.visa), visa_schema, "VisaFacts")
-elif args.product:
-    validate_file(Path(args.product), product_schema, "ProductFacts", sources_by_id)
-elif args.offers:
-    validate_file(Path(args.offers), offers_schema, "Offers")
-else:
-    validate_files(DATA / "visas", visa_schema, "VisaFacts")
-    validate_files(DATA / "products", product_schema, "ProductFacts", sources_by_id)
-    if (DATA / "offers").exists():
-        validate_files(DATA / "offers", offers_schema, "Offers")
-
-if errors > 0:
-    print(f"\n[FAIL] {errors} error(s) found")
-    sys.exit(1)
-else:
-    print("\nAll data files valid.")
-    sys.exit(0)
+        return None, str(e)
+
+
+def validate_items(items, sources_by_id, jobs, cache=None):
+    """Validate [(label, path, data, parse_error, sha256), ...]. Returns one result per item.
+
+    Schema results come from cache when the file's sha256 is known there;
+    the rest are validated, in a process pool when jobs > 1. Source hash
+    and offer language checks stay in this process, where hashes are memoized.
+    """
+    found = {}
+    pending = []
+    for i, (label, _, data, parse_error, sha256) in enumerate(items):
+        if parse_error is not None:
+            continue
+        cached = cache.get(label, sha256) if cache is not None else None
+        if cached is not None:
+            found[i] = cached
+        else:
+            pending.append((i, label, data))
+
+    work = [(label, data) for _, label, data in pending]
+    if jobs > 1 and len(work) > 1:
+        chunk = max(1, len(work) // (jobs * 4))
+        batches = [work[i:i + chunk] for i in range(0, len(work), chunk)]
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            validated = [errs for batch in pool.map(schema_errors_batch, batches) for errs in batch]
+    else:
+        validated = schema_errors_batch(work)
+    for (i, label, _), errs in zip(pending, validated):
+        found[i] = errs
+        if cache is not None:
+            cache.put(label, items[i][4], errs)
+
+    # Only files that pass the schema get source checks; the evidence walk assumes their shape
+    cited = [
+        (label, data) for i, (label, _, data, parse_error, _) in enumerate(items)
+        if label in EVIDENCE and parse_error is None and not found[i]
+    ]
+    if cited and sources_by_id is not None:
+        prefetch_source_hashes(cited, sources_by_id)
+
+    results = []
+    for i, (label, path, data, parse_error, _) in enumerate(items):
+        if parse_error is not None:
+            errors = [error(parse_error, "parse")]
+        else:
+            errors = found[i]
+            if not errors and label in EVIDENCE and sources_by_id is not None:
+                errors = check_product_sources(data, sources_by_id, label)
+            elif not errors and label == "Offers":
+                errors = check_offer_language(data)
+        results.append({"label": label, "path": str(path), "valid": not errors, "errors": errors})
+    return results
+
+
+def print_result(result):
+    if result["valid"]:
+        print(f"[OK] {result['label']}: {result['path']}")
+        return
+    print(f"[ERROR] {result['label']}: {result['path']}")
+    for e in result["errors"]:
+        where = f"{e['path']}: " if e["check"] == "schema" and e["path"] != "$" else ""
+        print("  ", where + e["message"])
+
+
+def default_jobs(count):
+    return min(os.cpu_count() or 1, 8) if count >= PARALLEL_THRESHOLD else 1
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--visa", type=str, help="Path to a single VisaFacts JSON to validate")
+    parser.add_argument("--product", type=str, help="Path to a single ProductFacts JSON to validate")
+    parser.add_argument("--offers", type=str, help="Path to a single Offers JSON to validate")
+    parser.add_argument("--insurer", type=str, help="Path to a single InsurerFacts JSON to validate")
+    parser.add_argument("--jobs", type=int, default=0, help="Schema validation processes (default: parallel only for large catalogues)")
+    parser.add_argument("--no-cache", action="store_true", help="Revalidate every file against the schemas")
+    parser.add_argument("--json-output", default="", help="Also write a structured JSON report here ('-' for stdout instead of text)")
+    args = parser.parse_args()
+
+    cache = FileCache()
+    sources_by_id = load_sources(cache)
+    items = []
+    if args.visa or args.product or args.offers or args.insurer:
+        single = (("VisaFacts", args.visa), ("ProductFacts", args.product), ("Offers", args.offers), ("InsurerFacts", args.insurer))
+        for label, value in single:
+            if value:
+                path = Path(value)
+                items.append((label, path, *read_file(path), None))
+                break
+    else:
+        folders = [(DATA / "visas", "VisaFacts"), (DATA / "products", "ProductFacts")]
+        if (DATA / "offers").exists():
+            folders.append((DATA / "offers", "Offers"))
+        if (DATA / "insurers").exists():
+            folders.append((DATA / "insurers", "InsurerFacts"))
+        for folder, label in folders:
+            for record in scan(cache, folder):
+                items.append((label, record.path, record.data, record.error, record.sha256))
+    cache.save()
+
+    jobs = args.jobs or default_jobs(len(items))
+    results_cache = None if args.no_cache else ResultCache()
+    results = validate_items(items, sources_by_id, jobs, results_cache)
+    if results_cache is not None:
+        results_cache.save()
+    error_count = sum(len(r["errors"]) for r in results)
+
+    if args.json_output:
+        report = json.dumps({
+            "valid": error_count == 0,
+            "files": len(results),
+            "error_count": error_count,
+            "results": results,
+        }, indent=2)
+        if args.json_output == "-":
+            print(report)
+        else:
+            Path(args.json_output).write_text(report, encoding="utf-8")
+
+    if args.json_output != "-":
+        for result in results:
+            print_result(result)
+        if error_count > 0:
+            print(f"\n[FAIL] {error_count} error(s) found")
+        else:
+            print("\nAll data files valid.")
+    sys.exit(1 if error_count > 0 else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,30 @@
 import argparse
-import hashlib
 import json
 import sys
 from pathlib import Path
 
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
 
-def sha256(path: Path) -> str:
-    return hashlib.sha256(path.read_bytes()).hexdigest()
+from tools.hashing import HashService
 
 
-def verify(snapshot_dir: Path) -> int:
+def verify(snapshot_dir: Path, jobs: int = 0) -> int:
     manifest_path = snapshot_dir / "manifest.json"
     if not manifest_path.exists():
         print(f"[ERROR] Missing manifest: {manifest_path}")
         return 1
     manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
 
+    entries = manifest.get("files", [])
+    # Hash everything up front on a thread pool; report in manifest order below
+    hashes = HashService(jobs).digest_many(
+        snapshot_dir / e["path"] for e in entries
+        if e.get("path") and e.get("sha256") and (snapshot_dir / e["path"]).exists()
+    )
+
     errors = 0
-    for entry in manifest.get("files", []):
+    for entry in entries:
         rel = entry.get("path")
         expected = entry.get("sha256")
         if not rel or not expected:
@@ -29,7 +36,11 @@ def verify(snapshot_dir: Path) -> int:
             print(f"[ERROR] Missing file: {rel}")
             errors += 1
             continue
-        actual = sha256(path)
+        actual = hashes.get(path)
+        if not isinstance(actual, str):
+            print(f"[ERROR] Failed to read {rel}: {actual}")
+            errors += 1
+            continue
         if actual.lower() != str(expected).lower():
             print(f"[ERROR] SHA mismatch: {rel}")
             errors += 1
@@ -45,8 +56,9 @@ def verify(snapshot_dir: Path) -> int:
 def main() -> None:
     parser = argparse.ArgumentParser()
     parser.add_argument("--snapshot-dir", required=True)
+    parser.add_argument("--jobs", type=int, default=0, help="Hashing threads (default: based on CPU count)")
     args = parser.parse_args()
-    sys.exit(verify(Path(args.snapshot_dir)))
+    sys.exit(verify(Path(args.snapshot_dir), args.jobs))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,186 @@
+"""What-if evaluation of a draft product against every visa.
+
+A WhatIf session holds a draft product and, for every visa plan, each
+bound rule's last result. Rule results are memoized on the values of the
+spec paths that rule reads (Rule.reads), so what_if({path: value}) re-runs
+only the rules that read an edited path, and a rule whose inputs return
+to an earlier combination is answered from its memo. Visas where no rule
+returned a different result keep their previous mapping.
+
+    from tools.what_if import WhatIf
+    session = WhatIf(dataset.visas, base=dataset.products_by_id["SAFETYWING_NOMAD_2026"])
+    session.what_if({"payment_cadence": "annual"})
+"""
+import copy
+import json
+import threading
+from typing import Dict, Optional
+
+from tools import instrumentation
+from tools.engine import RULES, combine
+from tools.rules.base import index_requirements, spec_at, spec_path
+
+DRAFT_ID = "DRAFT"
+
+# Remembered input combinations per bound rule before its memo is reset
+MEMO_LIMIT = 256
+
+
+def freeze(value):
+    """Hashable memo key for a spec value; 0, 0.0 and False stay distinct."""
+    try:
+        hash(value)
+        return (type(value).__name__, value)
+    except TypeError:
+        return ("json", json.dumps(value, sort_keys=True))
+
+
+class BoundRule:
+    """One rule bound to one visa, with its result memo."""
+
+    __slots__ = ("check", "reads", "memo", "result")
+
+    def __init__(self, check, reads):
+        self.check = check
+        self.reads = reads
+        self.memo = {}
+        self.result = None
+
+    def run(self, product: dict, values: dict) -> bool:
+        """Refresh result for product. Returns True if the check itself ran.
+
+        values caches frozen spec values by path for the current edit, so
+        rules of different visas reading the same path look it up once.
+        """
+        key = []
+        for parts in self.reads:
+            value = values.get(parts, values)
+            if value is values:
+                value = values[parts] = freeze(spec_at(product, parts))
+            key.append(value)
+        key = tuple(key)
+        if key in self.memo:
+            self.result = self.memo[key]
+            return False
+        if len(self.memo) >= MEMO_LIMIT:
+            self.memo.clear()
+        self.result = self.memo[key] = self.check(product)
+        return True
+
+
+def overlaps(a: tuple, b: tuple) -> bool:
+    """True when one spec path is a prefix of (or equal to) the other."""
+    n = min(len(a), len(b))
+    return a[:n] == b[:n]
+
+
+class WhatIf:
+    """Incremental evaluation of one draft product against a set of visas."""
+
+    def __init__(self, visas: list, base: Optional[dict] = None):
+        self.product = copy.deepcopy(base) if base else {"id": DRAFT_ID, "specs": {}}
+        if not isinstance(self.product.get("specs"), dict):
+            self.product["specs"] = {}
+        self.visa_ids = []
+        self.rules = []  # per visa: [BoundRule, ...] in RULES order
+        self.dependents: Dict[tuple, list] = {}  # spec path -> [(visa index, BoundRule)]
+        inst = instrumentation.ACTIVE
+        for index, visa in enumerate(visas):
+            reqs = index_requirements(visa)
+            bound_rules = []
+            for rule in RULES:
+                check = rule.bind(visa, reqs)
+                if inst is not None:
+                    inst.record_bind(rule, check is not None)
+                    if check is not None:
+                        check = inst.wrap(rule, check)
+                if check is None:
+                    continue
+                bound = BoundRule(check, tuple(rule.reads(visa, reqs)))
+                bound_rules.append(bound)
+                for parts in bound.reads:
+                    self.dependents.setdefault(parts, []).append((index, bound))
+            self.visa_ids.append(visa["id"])
+            self.rules.append(bound_rules)
+
+        self.affected = {}  # edited path -> [(visa index, BoundRule)] reading it
+        self.lock = threading.Lock()  # held by callers sharing the session across threads
+        self.rerun = 0
+        values = {}
+        for bound_rules in self.rules:
+            for bound in bound_rules:
+                self.rerun += bound.run(self.product, values)
+        self.results = [self._combine(index) for index in range(len(self.rules))]
+
+    def _combine(self, index: int) -> dict:
+        return combine(self.visa_ids[index], self.product["id"], [bound.result for bound in self.rules[index]])
+
+    def _set(self, parts: tuple, value) -> bool:
+        """Write value at parts in the draft specs (None removes it). Returns True if it changed."""
+        node = self.product["specs"]
+        for part in parts[:-1]:
+            child = node.get(part)
+            if not isinstance(child, dict):
+                if value is None:
+                    return False
+                child = node[part] = {}
+            node = child
+        old = node.get(parts[-1])
+        if freeze(old) == freeze(value):
+            return False
+        if value is None:
+            node.pop(parts[-1], None)
+        else:
+            node[parts[-1]] = copy.deepcopy(value)
+        return True
+
+    def what_if(self, patch: Dict[str, object]) -> Dict[str, dict]:
+        """Apply {spec path: value} edits and return visa id -> mapping.
+
+        Only rules reading an edited path (or a path inside or above it)
+        are re-run; self.rerun counts how many actually executed. If a
+        rule raises on the patched draft, the draft and every rule result
+        are restored and the exception propagates: the session stays at
+        its previous state. Memo entries are kept, as they only map
+        inputs to results.
+        """
+        specs = copy.deepcopy(self.product["specs"])
+        previous = []  # (bound rule, result before this edit)
+        changed = set()
+        try:
+            edited = [spec_path(field) for field, value in patch.items() if self._set(spec_path(field), value)]
+            stale = {}
+            for path in edited:
+                for index, bound in self._affected(path):
+                    stale.setdefault(id(bound), (index, bound))
+
+            self.rerun = 0
+            values = {}
+            for index, bound in stale.values():
+                before = bound.result
+                previous.append((bound, before))
+                self.rerun += bound.run(self.product, values)
+                if bound.result is not before:
+                    changed.add(index)
+        except Exception:
+            for bound, before in previous:
+                bound.result = before
+            self.product["specs"] = specs
+            raise
+        for index in changed:
+            self.results[index] = self._combine(index)
+        return self.mappings()
+
+    def _affected(self, path: tuple) -> list:
+        """Bound rules reading path or a path inside or above it; cached per path."""
+        found = self.affected.get(path)
+        if found is None:
+            found = self.affected[path] = [
+                entry
+                for parts, bound_rules in self.dependents.items() if overlaps(parts, path)
+                for entry in bound_rules
+            ]
+        return found
+
+    def mappings(self) -> Dict[str, dict]:
+        return dict(zip(self.visa_ids, self.results))